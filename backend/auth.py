@@ -1,37 +1,88 @@
 from fastapi import HTTPException, Depends, APIRouter
 from fastapi.security import OAuth2PasswordBearer
-from passlib.context import CryptContext
-from contextlib import contextmanager
+from contextlib import asynccontextmanager
+from collections import OrderedDict
 from secrets import token_hex
 from jose import jwt, JWTError
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import Union
+import os
+import time
+
+from psycopg import AsyncConnection
+from psycopg.conninfo import make_conninfo
+from psycopg.types.string import TextLoader
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+import repo.keys as repo_keys
+
+# time to wait for a free connection before answering 503
+POOL_TIMEOUT_SECONDS = 5
+
+# connection budget of each database, shared by all workers of all backend nodes;
+# it has to stay below max_connections of the PostgreSQL servers
+DB_MAX_CONNECTIONS = int(os.environ.get("DB_MAX_CONNECTIONS", 90))
+BACKEND_NODES = int(os.environ.get("BACKEND_NODES", 1))
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+
+# each worker needs at least two connections, as some requests hold one while waiting for another
+POOL_MAX_SIZE = DB_MAX_CONNECTIONS // (BACKEND_NODES * WEB_CONCURRENCY)
+if POOL_MAX_SIZE < 2:
+    raise RuntimeError(
+        f"DB_MAX_CONNECTIONS={DB_MAX_CONNECTIONS} leaves {POOL_MAX_SIZE} connections to each of "
+        f"{BACKEND_NODES * WEB_CONCURRENCY} workers, at least 2 are needed"
+    )
+POOL_MIN_SIZE = min(2, POOL_MAX_SIZE)
+
+# all opened pools, so that the app can open and close them on startup and shutdown
+_pools: list[AsyncConnectionPool] = []
+
 
-from psycopg2.pool import PoolError
-from psycopg2.pool import ThreadedConnectionPool
+async def _configure_connection(conn: AsyncConnection):
+    # keep UUIDs as strings, the API exposes them as text
+    conn.adapters.register_loader("uuid", TextLoader)
 
 
 def mk_database(dbname, user, password, host, port):
-    conn_pool = ThreadedConnectionPool(
-        minconn=2, maxconn=100, dbname=dbname, user=user, password=password, host=host, port=port
+    conn_pool = AsyncConnectionPool(
+        make_conninfo(dbname=dbname, user=user, password=password, host=host, port=port),
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        timeout=POOL_TIMEOUT_SECONDS,
+        configure=_configure_connection,
+        open=False,
     )
+    _pools.append(conn_pool)
 
-    @contextmanager
-    def get_conn():
-        conn = None
+    @asynccontextmanager
+    async def get_conn():
         try:
-            conn = conn_pool.getconn()
-            with conn.cursor() as cursor:
-                yield conn, cursor
-        except PoolError:
+            conn = await conn_pool.getconn()
+        except PoolTimeout:
             raise HTTPException(status_code=503, detail="All database connections are busy")
+        try:
+            async with conn.cursor() as cursor:
+                yield conn, cursor
+            await conn.commit()
+        except BaseException:
+            await conn.rollback()
+            raise
         finally:
-            if conn is not None:
-                conn.commit()
-                conn_pool.putconn(conn)
+            await conn_pool.putconn(conn)
 
     return get_conn
 
 
+async def open_databases():
+    for pool in _pools:
+        await pool.open(wait=True)
+
+
+async def close_databases():
+    for pool in _pools:
+        await pool.close()
+
+
 get_db = mk_database(dbname="edhub", user="postgres", password="12345678", host="system_db", port="5432")
 
 
@@ -43,23 +94,90 @@ get_storage_db = mk_database(
 router = APIRouter()
 
 # setting for JWT and autorization
-SECRET_KEY = token_hex(32)
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
-pwd_hasher = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Signing keys are stored in the database, so that all workers of all backend nodes
+# accept each other's tokens. A new key is generated every SIGNING_KEY_ROTATION_HOURS,
+# the previous ones are kept for verification until the tokens signed with them expire.
+SIGNING_KEY_ROTATION_HOURS = 24
+SIGNING_KEYS_RELOAD_SECONDS = 60
+# unknown key IDs make us reload the keys, but not more often than this
+SIGNING_KEYS_MIN_RELOAD_SECONDS = 5
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+_signing_keys: dict[str, str] = {}
+_current_kid: Union[str, None] = None
+_signing_keys_loaded_at = float("-inf")
+
+
+async def _load_signing_keys(db_cursor):
+    global _signing_keys, _current_kid, _signing_keys_loaded_at
+    keys = await repo_keys.sql_select_signing_keys(db_cursor, SIGNING_KEY_ROTATION_HOURS, ACCESS_TOKEN_EXPIRE_MINUTES)
+    _signing_keys = {kid: secret for kid, secret, fresh in keys}
+    _current_kid = keys[0][0] if keys and keys[0][2] else None
+    _signing_keys_loaded_at = time.monotonic()
+
+
+# loading the signing keys and generating a new one if the newest is due for rotation
+async def rotate_signing_keys():
+    async with get_db() as (db_conn, db_cursor):
+        await repo_keys.sql_lock_signing_keys(db_cursor)
+        await _load_signing_keys(db_cursor)
+        if _current_kid is None:
+            await repo_keys.sql_insert_signing_key(db_cursor, token_hex(8), token_hex(32))
+            await _load_signing_keys(db_cursor)
+
+
+async def _reload_signing_keys():
+    async with get_db() as (db_conn, db_cursor):
+        await _load_signing_keys(db_cursor)
+
+
+async def create_access_token(user_email: str) -> str:
+    if _current_kid is None or time.monotonic() - _signing_keys_loaded_at > SIGNING_KEYS_RELOAD_SECONDS:
+        await _reload_signing_keys()
+        if _current_kid is None:
+            await rotate_signing_keys()
+
+    data = {
+        "email": user_email,
+        "exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
+    }
+    return jwt.encode(data, _signing_keys[_current_kid], algorithm=ALGORITHM, headers={"kid": _current_kid})
+
+
+async def _get_verification_key(kid: Union[str, None]) -> Union[str, None]:
+    if kid not in _signing_keys and time.monotonic() - _signing_keys_loaded_at > SIGNING_KEYS_MIN_RELOAD_SECONDS:
+        # the token may be signed with a key that another worker has just generated
+        await _reload_signing_keys()
+    return _signing_keys.get(kid)
+
+
+# validated tokens: token -> (user_email, expire_timestamp), least recently used first
+TOKEN_CACHE_SIZE = 10000
+_token_cache: OrderedDict[str, tuple[str, float]] = OrderedDict()
+
+# users known to exist: user_email -> monotonic time until which this is trusted.
+# The TTL bounds how long a user removed through another worker can keep using their token.
+USER_EXISTS_CACHE_TTL_SECONDS = 60
+_user_exists_cache: dict[str, float] = {}
+
+
+async def _decode_token(token: str) -> tuple[str, float]:
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        secret = await _get_verification_key(jwt.get_unverified_header(token).get("kid"))
+        if secret is None:
+            raise ValueError("Unknown token signing key")
+
+        payload = jwt.decode(token, secret, algorithms=[ALGORITHM])
         expire_timestamp = payload.get("exp")
         user_email = payload.get("email")
 
         # checking the fields
         if expire_timestamp is None or user_email is None:
             raise ValueError("Invalid token structure")
-        
+
         # checking token expiration time
         if datetime.utcnow() > datetime.fromtimestamp(expire_timestamp):
             raise ValueError("Token expired")
@@ -68,11 +186,52 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         detail = str(e) if str(e) else "Invalid token"
         raise HTTPException(status_code=401, detail=detail)
 
+    return user_email, expire_timestamp
+
+
+async def _validate_token(token: str) -> str:
+    cached = _token_cache.get(token)
+    if cached is not None:
+        user_email, expire_timestamp = cached
+        if time.time() < expire_timestamp:
+            _token_cache.move_to_end(token)
+            return user_email
+        del _token_cache[token]
+
+    user_email, expire_timestamp = await _decode_token(token)
+    _token_cache[token] = (user_email, expire_timestamp)
+    if len(_token_cache) > TOKEN_CACHE_SIZE:
+        _token_cache.popitem(last=False)
+    return user_email
+
+
+async def _user_exists(user_email: str) -> bool:
+    if _user_exists_cache.get(user_email, 0) > time.monotonic():
+        return True
+
+    async with get_db() as (db_conn, db_cursor):
+        await db_cursor.execute("SELECT EXISTS(SELECT 1 FROM users WHERE email = %s AND deleted IS NULL)", (user_email,))
+        user_exists = (await db_cursor.fetchone())[0]
+
+    if user_exists:
+        if len(_user_exists_cache) >= TOKEN_CACHE_SIZE:
+            _user_exists_cache.clear()
+        _user_exists_cache[user_email] = time.monotonic() + USER_EXISTS_CACHE_TTL_SECONDS
+    return user_exists
+
+
+# forget everything cached about the user, e.g. after the account was removed
+def invalidate_user(user_email: str):
+    _user_exists_cache.pop(user_email, None)
+    for token in [t for t, (email, _) in _token_cache.items() if email == user_email]:
+        del _token_cache[token]
+
+
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    user_email = await _validate_token(token)
+
     # checking whether such user exists
-    with get_db() as (db_conn, db_cursor):
-        db_cursor.execute("SELECT EXISTS(SELECT 1 FROM users WHERE email = %s)", (user_email,))
-        user_exists = db_cursor.fetchone()[0]
-        if not user_exists:
-            raise HTTPException(status_code=401, detail="User not exists")
+    if not await _user_exists(user_email):
+        raise HTTPException(status_code=401, detail="User not exists")
 
     return user_email
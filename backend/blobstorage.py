@@ -0,0 +1,148 @@
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from secrets import token_hex
+from typing import Union
+
+from auth import get_storage_db
+import repo.files as repo_files
+
+# backend receiving new uploads; blobs stored earlier stay where they are until migrated
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "postgres")
+
+# root of the filesystem backend, shared by all backend workers and nodes
+STORAGE_DIR = os.environ.get("STORAGE_DIR", "/var/lib/edhub/blobs")
+
+READ_CHUNK_SIZE = 256 * 1024
+
+
+class StorageBackend(ABC):
+    """
+    Keeps the contents of blobs.
+
+    Sizes and reference counts of all blobs are kept in the `blobs` table of the storage
+    database, together with the name of the backend holding the contents of each one.
+    """
+
+    name: str
+
+    @abstractmethod
+    async def write(self, storage_db_cursor, blob_hash: bytes, chunks):
+        """Store the contents of a new blob, given as an async iterator of chunks."""
+
+    @abstractmethod
+    def read(self, blob_hash: bytes, first: int, last: int):
+        """Async iterator over the contents from `first` to `last` inclusive."""
+
+    @abstractmethod
+    async def exists(self, storage_db_cursor, blob_hash: bytes, size: int) -> bool:
+        """Whether the contents of the blob are stored."""
+
+    @abstractmethod
+    async def delete(self, storage_db_cursor, blob_hash: bytes):
+        """Remove the contents of a blob; contents that are already gone are ignored."""
+
+    def local_path(self, blob_hash: bytes) -> Union[str, None]:
+        """Path of a file with the contents, if the backend has one, so it can be sent directly."""
+        return None
+
+
+class PostgresStorageBackend(StorageBackend):
+    name = "postgres"
+
+    async def write(self, storage_db_cursor, blob_hash: bytes, chunks):
+        await repo_files.sql_insert_blob_chunks(storage_db_cursor, blob_hash, chunks)
+
+    async def read(self, blob_hash: bytes, first: int, last: int):
+        # a storage connection is only taken for a single read, so slow clients do not hold one
+        offset = first
+        while offset <= last:
+            end = min(offset + READ_CHUNK_SIZE, last + 1)
+            async with get_storage_db() as (storage_db_conn, storage_db_cursor):
+                chunks = await repo_files.sql_select_blob_chunks(storage_db_cursor, blob_hash, offset, end)
+            if not chunks:
+                return
+            for pos, data in chunks:
+                piece = data[offset - pos:end - pos]
+                if not piece:
+                    return
+                yield piece
+                offset += len(piece)
+
+    async def exists(self, storage_db_cursor, blob_hash: bytes, size: int) -> bool:
+        # empty contents have no chunks
+        return size == 0 or await repo_files.sql_select_blob_chunks_exist(storage_db_cursor, blob_hash)
+
+    async def delete(self, storage_db_cursor, blob_hash: bytes):
+        await repo_files.sql_delete_blob_chunks(storage_db_cursor, blob_hash)
+
+
+class FilesystemStorageBackend(StorageBackend):
+    """
+    Stores every blob as a file named by its hash, in two levels of subdirectories
+    by the first bytes of the hash, so that no directory grows too large.
+    """
+
+    name = "filesystem"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def local_path(self, blob_hash: bytes) -> str:
+        name = blob_hash.hex()
+        return os.path.join(self.root, name[:2], name[2:4], name)
+
+    async def write(self, storage_db_cursor, blob_hash: bytes, chunks):
+        path = self.local_path(blob_hash)
+        await asyncio.to_thread(os.makedirs, os.path.dirname(path), exist_ok=True)
+
+        # written under a temporary name and renamed when complete, so a file at the path is never partial;
+        # if the storage transaction is rolled back after that, the file is left for the next upload of it
+        tmp_path = f"{path}.{token_hex(8)}.tmp"
+        file = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(file.write, chunk)
+            await asyncio.to_thread(file.flush)
+            await asyncio.to_thread(os.fsync, file.fileno())
+        except BaseException:
+            file.close()
+            os.unlink(tmp_path)
+            raise
+        file.close()
+        await asyncio.to_thread(os.replace, tmp_path, path)
+
+    async def read(self, blob_hash: bytes, first: int, last: int):
+        file = await asyncio.to_thread(open, self.local_path(blob_hash), "rb")
+        try:
+            await asyncio.to_thread(file.seek, first)
+            remaining = last - first + 1
+            while remaining > 0:
+                chunk = await asyncio.to_thread(file.read, min(READ_CHUNK_SIZE, remaining))
+                if not chunk:
+                    return
+                yield chunk
+                remaining -= len(chunk)
+        finally:
+            file.close()
+
+    async def exists(self, storage_db_cursor, blob_hash: bytes, size: int) -> bool:
+        return await asyncio.to_thread(os.path.exists, self.local_path(blob_hash))
+
+    async def delete(self, storage_db_cursor, blob_hash: bytes):
+        try:
+            await asyncio.to_thread(os.unlink, self.local_path(blob_hash))
+        except FileNotFoundError:
+            pass
+
+
+BACKENDS: dict[str, StorageBackend] = {
+    backend.name: backend for backend in (PostgresStorageBackend(), FilesystemStorageBackend(STORAGE_DIR))
+}
+
+if STORAGE_BACKEND not in BACKENDS:
+    raise RuntimeError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}, expected one of {', '.join(BACKENDS)}")
+
+
+def get_backend(name: str = STORAGE_BACKEND) -> StorageBackend:
+    return BACKENDS[name]
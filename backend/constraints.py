@@ -1,6 +1,6 @@
 from fastapi import HTTPException
-from typing import Union
-import repo.parents
+from typing import NamedTuple, Union
+from weakref import WeakKeyDictionary
 
 #
 # value_assert_ functions all return None if no problems were found and the
@@ -16,383 +16,381 @@ import repo.parents
 #
 
 
+# everything the checks need to know about a user in a course
+class CourseRoles(NamedTuple):
+    user_exists: bool
+    is_admin: bool
+    course_exists: bool
+    is_teacher: bool
+    is_student: bool
+    children: frozenset[str]
+
+    @property
+    def is_parent(self) -> bool:
+        return len(self.children) > 0
+
+
+# roles resolved during the request, keyed by the request's cursor:
+# cursor -> {(user_email, course_id): CourseRoles}
+_roles_cache: WeakKeyDictionary = WeakKeyDictionary()
+
+
+# getting all roles of the user in the course with a single query.
+# The result is memoized for the cursor, i.e. for the lifetime of the request,
+# until a repo function changing roles drops it with `forget_roles`.
+# course_id can be None to only resolve the user's existence and admin rights.
+async def resolve_roles(db_cursor, user_email: str, course_id: Union[str, None]) -> CourseRoles:
+    cache = _roles_cache.setdefault(db_cursor, {})
+    key = (user_email, course_id)
+    if key in cache:
+        return cache[key]
+
+    await db_cursor.execute(
+        """
+        SELECT
+            EXISTS(SELECT 1 FROM users WHERE email = %(email)s AND deleted IS NULL),
+            EXISTS(SELECT 1 FROM users WHERE email = %(email)s AND isadmin AND deleted IS NULL),
+            EXISTS(SELECT 1 FROM courses WHERE courseid = %(course)s AND deleted IS NULL),
+            EXISTS(SELECT 1 FROM teaches WHERE email = %(email)s AND courseid = %(course)s),
+            EXISTS(SELECT 1 FROM student_at WHERE email = %(email)s AND courseid = %(course)s),
+            ARRAY(SELECT studentemail FROM parent_of_at_course WHERE parentemail = %(email)s AND courseid = %(course)s)
+        """,
+        {"email": user_email, "course": course_id},
+    )
+    user_exists, is_admin, course_exists, is_teacher, is_student, children = await db_cursor.fetchone()
+    roles = CourseRoles(user_exists, is_admin, course_exists, is_teacher, is_student, frozenset(children))
+
+    cache[key] = roles
+    cache.setdefault((user_email, None), CourseRoles(user_exists, is_admin, False, False, False, frozenset()))
+    return roles
+
+
+# dropping the memoized roles; the repo functions writing users, courses, memberships or admin rights
+# call it, so that the checks made after them within the request see the change
+def forget_roles(db_cursor):
+    _roles_cache.pop(db_cursor, None)
+
+
 # checking whether the user exists in our LMS
-def value_assert_user_exists(db_cursor, user_email: str) -> Union[None, HTTPException]:
-    db_cursor.execute("SELECT EXISTS(SELECT 1 FROM users WHERE email = %s)", (user_email,))
-    user_exists = db_cursor.fetchone()[0]
-    if not user_exists:
+async def value_assert_user_exists(db_cursor, user_email: str) -> Union[None, HTTPException]:
+    roles = await resolve_roles(db_cursor, user_email, None)
+    if not roles.user_exists:
         return HTTPException(status_code=404, detail="No user with provided email")
     return None
 
 
 # checking whether the user exists in our LMS
-def assert_user_exists(db_cursor, user_email: str):
-    err = value_assert_user_exists(db_cursor, user_email)
+async def assert_user_exists(db_cursor, user_email: str):
+    err = await value_assert_user_exists(db_cursor, user_email)
     if err is not None:
         raise err
 
 
 # checking whether the user exists in our LMS
-def check_user_exists(db_cursor, user_email: str) -> bool:
-    return value_assert_user_exists(db_cursor, user_email) is None
+async def check_user_exists(db_cursor, user_email: str) -> bool:
+    return await value_assert_user_exists(db_cursor, user_email) is None
 
 
 # checking whether the course exists in our LMS
-def value_assert_course_exists(db_cursor, course_id: str) -> Union[None, HTTPException]:
-    db_cursor.execute("SELECT EXISTS(SELECT 1 FROM courses WHERE courseid = %s)", (course_id,))
-    course_exists = db_cursor.fetchone()[0]
+async def value_assert_course_exists(db_cursor, course_id: str) -> Union[None, HTTPException]:
+    await db_cursor.execute("SELECT EXISTS(SELECT 1 FROM courses WHERE courseid = %s AND deleted IS NULL)", (course_id,))
+    course_exists = (await db_cursor.fetchone())[0]
     if not course_exists:
         return HTTPException(status_code=404, detail="No course with provided ID")
     return None
 
 
 # checking whether the course exists in our LMS
-def assert_course_exists(db_cursor, course_id: str):
-    err = value_assert_course_exists(db_cursor, course_id)
+async def assert_course_exists(db_cursor, course_id: str):
+    err = await value_assert_course_exists(db_cursor, course_id)
     if err is not None:
         raise err
 
 
 # checking whether the course exists in our LMS
-def check_course_exists(db_cursor, course_id: str) -> bool:
-    return value_assert_course_exists(db_cursor, course_id) is None
+async def check_course_exists(db_cursor, course_id: str) -> bool:
+    return await value_assert_course_exists(db_cursor, course_id) is None
 
 
 # checking whether the material exists in the course
-def value_assert_material_exists(db_cursor, course_id: str, material_id: str) -> Union[None, HTTPException]:
+async def value_assert_material_exists(db_cursor, course_id: str, material_id: str) -> Union[None, HTTPException]:
     try:
         material_id = int(material_id)
     except ValueError:
         return HTTPException(status_code=400, detail="Material ID should be integer")
 
-    err = value_assert_course_exists(db_cursor, course_id)
-    if err is not None:
-        return err
-    db_cursor.execute(
-        "SELECT EXISTS(SELECT 1 FROM course_materials WHERE courseid = %s AND matid = %s)", (course_id, material_id)
+    await db_cursor.execute(
+        """
+        SELECT
+            EXISTS(SELECT 1 FROM courses WHERE courseid = %s AND deleted IS NULL),
+            EXISTS(SELECT 1 FROM course_materials WHERE courseid = %s AND matid = %s)
+        """,
+        (course_id, course_id, material_id),
     )
-    material_exists = db_cursor.fetchone()[0]
+    course_exists, material_exists = await db_cursor.fetchone()
+    if not course_exists:
+        return HTTPException(status_code=404, detail="No course with provided ID")
     if not material_exists:
         return HTTPException(status_code=404, detail="No material with provided ID in this course")
     return None
 
 
 # checking whether the material exists in the course
-def assert_material_exists(db_cursor, course_id: str, material_id: str):
-    err = value_assert_material_exists(db_cursor, course_id, material_id)
+async def assert_material_exists(db_cursor, course_id: str, material_id: str):
+    err = await value_assert_material_exists(db_cursor, course_id, material_id)
     if err is not None:
         raise err
 
 
 # checking whether the material exists in the course
-def check_material_exists(db_cursor, course_id: str, material_id: str) -> bool:
-    return value_assert_material_exists(db_cursor, course_id, material_id) is None
+async def check_material_exists(db_cursor, course_id: str, material_id: str) -> bool:
+    return await value_assert_material_exists(db_cursor, course_id, material_id) is None
 
 
 # checking whether the assignment exists in the course
-def value_assert_assignment_exists(db_cursor, course_id: str, assignment_id: str) -> Union[None, HTTPException]:
+async def value_assert_assignment_exists(db_cursor, course_id: str, assignment_id: str) -> Union[None, HTTPException]:
     try:
         assignment_id = int(assignment_id)
     except ValueError:
         return HTTPException(status_code=400, detail="Assignment ID should be integer")
 
-    err = value_assert_course_exists(db_cursor, course_id)
-    if err is not None:
-        return err
-    db_cursor.execute(
-        "SELECT EXISTS(SELECT 1 FROM course_assignments WHERE courseid = %s AND assid = %s)",
-        (course_id, assignment_id),
+    await db_cursor.execute(
+        """
+        SELECT
+            EXISTS(SELECT 1 FROM courses WHERE courseid = %s AND deleted IS NULL),
+            EXISTS(SELECT 1 FROM course_assignments WHERE courseid = %s AND assid = %s)
+        """,
+        (course_id, course_id, assignment_id),
     )
-    assignment_exists = db_cursor.fetchone()[0]
+    course_exists, assignment_exists = await db_cursor.fetchone()
+    if not course_exists:
+        return HTTPException(status_code=404, detail="No course with provided ID")
     if not assignment_exists:
         return HTTPException(status_code=404, detail="No assignment with provided ID in this course")
     return None
 
 
 # checking whether the assignment exists in the course
-def assert_assignment_exists(db_cursor, course_id: str, assignment_id: str):
-    err = value_assert_assignment_exists(db_cursor, course_id, assignment_id)
+async def assert_assignment_exists(db_cursor, course_id: str, assignment_id: str):
+    err = await value_assert_assignment_exists(db_cursor, course_id, assignment_id)
     if err is not None:
         raise err
 
 
 # checking whether the assignment exists in the course
-def check_assignment_exists(db_cursor, course_id: str, assignment_id: str) -> bool:
-    return value_assert_assignment_exists(db_cursor, course_id, assignment_id) is None
+async def check_assignment_exists(db_cursor, course_id: str, assignment_id: str) -> bool:
+    return await value_assert_assignment_exists(db_cursor, course_id, assignment_id) is None
+
+
+# checking whether both the user and the course of the resolved roles exist
+def _value_assert_user_and_course(roles: CourseRoles) -> Union[None, HTTPException]:
+    if not roles.user_exists:
+        return HTTPException(status_code=404, detail="No user with provided email")
+    if not roles.course_exists:
+        return HTTPException(status_code=404, detail="No course with provided ID")
+    return None
 
 
 # checking whether the user has general access to the course,
-def value_assert_course_access(db_cursor, user_email: str, course_id: str) -> Union[None, HTTPException]:
-    err = value_assert_user_exists(db_cursor, user_email)
+async def value_assert_course_access(db_cursor, user_email: str, course_id: str) -> Union[None, HTTPException]:
+    roles = await resolve_roles(db_cursor, user_email, course_id)
+    err = _value_assert_user_and_course(roles)
     if err is not None:
         return err
-    err = value_assert_course_exists(db_cursor, course_id)
-    if err is not None:
-        return err
-    db_cursor.execute(
-        """
-        SELECT EXISTS(
-            SELECT 1 FROM teaches WHERE email = %s AND courseid = %s
-            UNION
-            SELECT 1 FROM student_at WHERE email = %s AND courseid = %s
-            UNION
-            SELECT 1 FROM parent_of_at_course WHERE parentemail = %s AND courseid = %s
-            UNION
-            SELECT 1 FROM users WHERE email = %s AND isadmin
-        )
-    """,
-        (user_email, course_id, user_email, course_id, user_email, course_id, user_email),
-    )
-    has_access = db_cursor.fetchone()[0]
-    if not has_access:
+    if not (roles.is_teacher or roles.is_student or roles.is_parent or roles.is_admin):
         return HTTPException(status_code=403, detail="User does not have access to this course")
     return None
 
 
 # checking whether the user has general access to the course,
-def assert_course_access(db_cursor, user_email: str, course_id: str):
-    err = value_assert_course_access(db_cursor, user_email, course_id)
+async def assert_course_access(db_cursor, user_email: str, course_id: str):
+    err = await value_assert_course_access(db_cursor, user_email, course_id)
     if err is not None:
         raise err
 
 
 # checking whether the user has general access to the course,
-def check_course_access(db_cursor, user_email: str, course_id: str) -> bool:
-    return value_assert_course_access(db_cursor, user_email, course_id) is None
+async def check_course_access(db_cursor, user_email: str, course_id: str) -> bool:
+    return await value_assert_course_access(db_cursor, user_email, course_id) is None
 
 
 # checking whether the user has teacher access to the course
-def value_assert_teacher_access(db_cursor, teacher_email: str, course_id: str) -> Union[None, HTTPException]:
-    err = value_assert_user_exists(db_cursor, teacher_email)
-    if err is not None:
-        return err
-    err = value_assert_course_exists(db_cursor, course_id)
+async def value_assert_teacher_access(db_cursor, teacher_email: str, course_id: str) -> Union[None, HTTPException]:
+    roles = await resolve_roles(db_cursor, teacher_email, course_id)
+    err = _value_assert_user_and_course(roles)
     if err is not None:
         return err
-    db_cursor.execute(
-        """
-        SELECT EXISTS(
-            SELECT 1 FROM teaches WHERE email = %s AND courseid = %s
-            UNION
-            SELECT 1 FROM users WHERE email = %s AND isadmin
-        )
-    """,
-        (teacher_email, course_id, teacher_email),
-    )
-    has_access = db_cursor.fetchone()[0]
-    if not has_access:
+    if not (roles.is_teacher or roles.is_admin):
         return HTTPException(status_code=403, detail="User has no teacher rights in this course")
     return None
 
 
 # checking whether the user has teacher access to the course
-def assert_teacher_access(db_cursor, teacher_email: str, course_id: str):
-    err = value_assert_teacher_access(db_cursor, teacher_email, course_id)
+async def assert_teacher_access(db_cursor, teacher_email: str, course_id: str):
+    err = await value_assert_teacher_access(db_cursor, teacher_email, course_id)
     if err is not None:
         raise err
 
 
 # checking whether the user has teacher access to the course
-def check_teacher_access(db_cursor, teacher_email: str, course_id: str) -> bool:
-    return value_assert_teacher_access(db_cursor, teacher_email, course_id) is None
+async def check_teacher_access(db_cursor, teacher_email: str, course_id: str) -> bool:
+    return await value_assert_teacher_access(db_cursor, teacher_email, course_id) is None
 
 
 # checking whether the user has student access to the course
-def value_assert_student_access(db_cursor, student_email: str, course_id: str) -> Union[None, HTTPException]:
-    err = value_assert_user_exists(db_cursor, student_email)
-    if err is not None:
-        return err
-    err = value_assert_course_exists(db_cursor, course_id)
+async def value_assert_student_access(db_cursor, student_email: str, course_id: str) -> Union[None, HTTPException]:
+    roles = await resolve_roles(db_cursor, student_email, course_id)
+    err = _value_assert_user_and_course(roles)
     if err is not None:
         return err
-    db_cursor.execute(
-        """
-        SELECT EXISTS(
-            SELECT 1 FROM student_at WHERE email = %s AND courseid = %s
-            UNION
-            SELECT 1 FROM users WHERE email = %s AND isadmin
-        )
-    """,
-        (student_email, course_id, student_email),
-    )
-    has_access = db_cursor.fetchone()[0]
-    if not has_access:
+    if not (roles.is_student or roles.is_admin):
         return HTTPException(status_code=403, detail="User has no student rights in this course")
     return None
 
 
 # checking whether the user has student access to the course
-def assert_student_access(db_cursor, student_email: str, course_id: str):
-    err = value_assert_student_access(db_cursor, student_email, course_id)
+async def assert_student_access(db_cursor, student_email: str, course_id: str):
+    err = await value_assert_student_access(db_cursor, student_email, course_id)
     if err is not None:
         raise err
 
 
 # checking whether the user has student access to the course
-def check_student_access(db_cursor, student_email: str, course_id: str) -> bool:
-    return value_assert_student_access(db_cursor, student_email, course_id) is None
+async def check_student_access(db_cursor, student_email: str, course_id: str) -> bool:
+    return await value_assert_student_access(db_cursor, student_email, course_id) is None
 
 
 # checking whether the user has parent access to the course
-def value_assert_parent_access(db_cursor, parent_email: str, course_id: str) -> Union[None, HTTPException]:
-    err = value_assert_user_exists(db_cursor, parent_email)
-    if err is not None:
-        return err
-    err = value_assert_course_exists(db_cursor, course_id)
+async def value_assert_parent_access(db_cursor, parent_email: str, course_id: str) -> Union[None, HTTPException]:
+    roles = await resolve_roles(db_cursor, parent_email, course_id)
+    err = _value_assert_user_and_course(roles)
     if err is not None:
         return err
-    db_cursor.execute(
-        """
-        SELECT EXISTS(
-            SELECT 1 FROM parent_of_at_course WHERE parentemail = %s AND courseid = %s
-            UNION
-            SELECT 1 FROM users WHERE email = %s AND isadmin
-        )
-    """,
-        (parent_email, course_id, parent_email),
-    )
-    has_access = db_cursor.fetchone()[0]
-    if not has_access:
+    if not (roles.is_parent or roles.is_admin):
         return HTTPException(status_code=403, detail="User has no parental access in this course")
     return None
 
 
 # checking whether the user has parent access to the course
-def assert_parent_access(db_cursor, parent_email: str, course_id: str):
-    err = value_assert_parent_access(db_cursor, parent_email, course_id)
+async def assert_parent_access(db_cursor, parent_email: str, course_id: str):
+    err = await value_assert_parent_access(db_cursor, parent_email, course_id)
     if err is not None:
         raise err
 
 
 # checking whether the user has parent access to the course
-def check_parent_access(db_cursor, parent_email: str, course_id: str) -> bool:
-    return value_assert_parent_access(db_cursor, parent_email, course_id) is None
+async def check_parent_access(db_cursor, parent_email: str, course_id: str) -> bool:
+    return await value_assert_parent_access(db_cursor, parent_email, course_id) is None
 
 
 # checking whether the user has parent access with the student in the course
-def value_assert_parent_student_access(
+async def value_assert_parent_student_access(
     db_cursor, parent_email: str, student_email: str, course_id: str
 ) -> Union[None, HTTPException]:
-    err = value_assert_user_exists(db_cursor, parent_email)
-    if err is not None:
-        return err
-    err = value_assert_user_exists(db_cursor, student_email)
-    if err is not None:
-        return err
-    err = value_assert_course_exists(db_cursor, course_id)
-    if err is not None:
-        return err
-    db_cursor.execute(
-        """
-        SELECT EXISTS(
-            SELECT 1 FROM parent_of_at_course WHERE parentemail = %s AND studentemail = %s AND courseid = %s
-            UNION
-            SELECT 1 FROM users WHERE email = %s AND isadmin
-        )
-    """,
-        (parent_email, student_email, course_id, parent_email),
-    )
-    has_access = db_cursor.fetchone()[0]
-    if not has_access:
+    roles = await resolve_roles(db_cursor, parent_email, course_id)
+    if not roles.user_exists:
+        return HTTPException(status_code=404, detail="No user with provided email")
+    # a linked child surely exists, otherwise the student has to be looked up
+    if student_email not in roles.children:
+        err = await value_assert_user_exists(db_cursor, student_email)
+        if err is not None:
+            return err
+    if not roles.course_exists:
+        return HTTPException(status_code=404, detail="No course with provided ID")
+    if not (student_email in roles.children or roles.is_admin):
         return HTTPException(status_code=403, detail="User has no parental access to this student's course")
     return None
 
 
 # checking whether the user has parent access with the student in the course
-def assert_parent_student_access(db_cursor, parent_email: str, student_email: str, course_id: str):
-    err = value_assert_parent_student_access(db_cursor, parent_email, student_email, course_id)
+async def assert_parent_student_access(db_cursor, parent_email: str, student_email: str, course_id: str):
+    err = await value_assert_parent_student_access(db_cursor, parent_email, student_email, course_id)
     if err is not None:
         raise err
 
 
 # checking whether the user has parent access with the student in the course
-def check_parent_student_access(db_cursor, parent_email: str, student_email: str, course_id: str) -> bool:
-    return value_assert_parent_student_access(db_cursor, parent_email, student_email, course_id) is None
+async def check_parent_student_access(db_cursor, parent_email: str, student_email: str, course_id: str) -> bool:
+    return await value_assert_parent_student_access(db_cursor, parent_email, student_email, course_id) is None
 
 
 # checking if the submission exists
-def value_assert_submission_exists(
+async def value_assert_submission_exists(
     db_cursor, course_id: str, assignment_id: str, student_email: str
 ) -> Union[None, HTTPException]:
-    err = value_assert_assignment_exists(db_cursor, course_id, assignment_id)
+    err = await value_assert_assignment_exists(db_cursor, course_id, assignment_id)
     if err is not None:
         return err
     # check if the student is enrolled to course
-    if not check_student_access(db_cursor, student_email, course_id):
+    if not await check_student_access(db_cursor, student_email, course_id):
         raise HTTPException(status_code=403, detail="Provided user in not a student at this course")
-    db_cursor.execute(
+    await db_cursor.execute(
         "SELECT EXISTS(SELECT 1 FROM course_assignments_submissions WHERE courseid = %s AND assid = %s AND email = %s)",
         (course_id, int(assignment_id), student_email),
     )
-    submitted = db_cursor.fetchone()[0]
+    submitted = (await db_cursor.fetchone())[0]
     if not submitted:
         return HTTPException(status_code=404, detail="The given student has not made a submission to this assignment")
     return None
 
 
 # checking if the submission exists
-def assert_submission_exists(db_cursor, course_id: str, assignment_id: str, student_email: str):
-    err = value_assert_submission_exists(db_cursor, course_id, assignment_id, student_email)
+async def assert_submission_exists(db_cursor, course_id: str, assignment_id: str, student_email: str):
+    err = await value_assert_submission_exists(db_cursor, course_id, assignment_id, student_email)
     if err is not None:
         raise err
 
 
 # checking if the submission exists
-def check_submission_exists(db_cursor, course_id: str, assignment_id: str, student_email: str) -> bool:
-    return value_assert_submission_exists(db_cursor, course_id, assignment_id, student_email) is None
+async def check_submission_exists(db_cursor, course_id: str, assignment_id: str, student_email: str) -> bool:
+    return await value_assert_submission_exists(db_cursor, course_id, assignment_id, student_email) is None
 
 
-def value_assert_parent_of_all(db_cursor, parent_email: str,
+async def value_assert_parent_of_all(db_cursor, parent_email: str,
                                student_emails: list[str], course_id: str) -> Union[None, HTTPException]:
-    err = value_assert_user_exists(db_cursor, parent_email)
-    if err is not None:
-        return err
-    err = value_assert_course_exists(db_cursor, course_id)
+    roles = await resolve_roles(db_cursor, parent_email, course_id)
+    err = _value_assert_user_and_course(roles)
     if err is not None:
         return err
-    if check_admin_access(db_cursor, parent_email):
+    if roles.is_admin:
         return None
     for student in student_emails:
-        err = value_assert_user_exists(db_cursor, student)
+        if student in roles.children:
+            continue
+        err = await value_assert_user_exists(db_cursor, student)
         if err is not None:
             return err
-        ok = repo.parents.sql_has_child_at_course(db_cursor, course_id, parent_email, student)
-        if not ok:
-            return HTTPException(403, "User has no parental access to this student")
+        return HTTPException(403, "User has no parental access to this student")
     return None
 
 
-def assert_parent_of_all(db_cursor, parent_email: str, student_emails: list[str], course_id: str):
-    err = value_assert_parent_of_all(db_cursor, parent_email, student_emails, course_id)
+async def assert_parent_of_all(db_cursor, parent_email: str, student_emails: list[str], course_id: str):
+    err = await value_assert_parent_of_all(db_cursor, parent_email, student_emails, course_id)
     if err is not None:
         raise err
 
 
-def check_parent_of_all(db_cursor, parent_email: str, student_emails: list[str], course_id: str) -> bool:
-    return value_assert_parent_of_all(db_cursor, parent_email, student_emails, course_id) is None
+async def check_parent_of_all(db_cursor, parent_email: str, student_emails: list[str], course_id: str) -> bool:
+    return await value_assert_parent_of_all(db_cursor, parent_email, student_emails, course_id) is None
 
 
 # checking whether the user has admin access
-def value_assert_admin_access(db_cursor, user_email: str) -> Union[None, HTTPException]:
-    err = value_assert_user_exists(db_cursor, user_email)
-    if err is not None:
-        return err
-    db_cursor.execute(
-        "SELECT EXISTS(SELECT 1 FROM users WHERE email = %s AND isadmin)", (user_email,)
-    )
-    has_access = db_cursor.fetchone()[0]
-    if not has_access:
+async def value_assert_admin_access(db_cursor, user_email: str) -> Union[None, HTTPException]:
+    roles = await resolve_roles(db_cursor, user_email, None)
+    if not roles.user_exists:
+        return HTTPException(status_code=404, detail="No user with provided email")
+    if not roles.is_admin:
         return HTTPException(status_code=403, detail="User has no admin rights")
     return None
 
 
 # checking whether the user has admin access
-def assert_admin_access(db_cursor, user_email: str):
-    err = value_assert_admin_access(db_cursor, user_email)
+async def assert_admin_access(db_cursor, user_email: str):
+    err = await value_assert_admin_access(db_cursor, user_email)
     if err is not None:
         raise err
 
 
 # checking whether the user has admin access
-def check_admin_access(db_cursor, user_email: str) -> bool:
-    return value_assert_admin_access(db_cursor, user_email) is None
+async def check_admin_access(db_cursor, user_email: str) -> bool:
+    return await value_assert_admin_access(db_cursor, user_email) is None
@@ -44,6 +44,11 @@ TOKEN=$(curl -s --fail -X POST $API_URL/login -H "Content-Type: application/json
     -d "{\"email\":\"$USER_EMAIL\",\"password\":\"$USER_PASS\"}" | extract_token)
 echo "Token: $TOKEN"
 
+echo "== Using the token with every backend worker =="
+for i in $(seq 1 20); do
+    curl -s --fail -X GET "$API_URL/get_user_info" -H "Authorization: Bearer $TOKEN" > /dev/null
+done
+
 echo "== Creating a course =="
 COURSE_ID=$(curl -s --fail -X POST "$API_URL/create_course?title=Physics" \
     -H "Authorization: Bearer $TOKEN" | extract_course_id)
@@ -76,6 +81,12 @@ curl -s --fail -X GET "$API_URL/get_students_parents?course_id=$COURSE_ID&studen
     -H "Authorization: Bearer $TOKEN"
 echo
 
+echo "== Enrolling roster =="
+curl -s --fail -X POST "$API_URL/enroll_roster?course_id=$COURSE_ID" -H "Authorization: Bearer $TOKEN" \
+    -H "Content-Type: application/json" \
+    -d "{\"students\":[\"$STUDENT_EMAIL\"],\"parents\":[{\"student_email\":\"$STUDENT_EMAIL\",\"parent_email\":\"$PARENT_EMAIL\"}]}"
+echo
+
 echo "== Inviting second teacher =="
 curl -s --fail -X POST "$API_URL/invite_teacher?course_id=$COURSE_ID&new_teacher_email=$TEACHER2_EMAIL" \
     -H "Authorization: Bearer $TOKEN"
@@ -85,6 +96,10 @@ echo "== Getting course teachers =="
 curl -s --fail -X GET "$API_URL/get_course_teachers?course_id=$COURSE_ID" -H "Authorization: Bearer $TOKEN"
 echo
 
+echo "== Getting courses dashboard =="
+curl -s --fail -X GET "$API_URL/get_my_courses" -H "Authorization: Bearer $TOKEN"
+echo
+
 echo "== Creating material =="
 MATERIAL_ID=$(curl -s --fail -X POST "$API_URL/create_material?course_id=$COURSE_ID&title=Intro&description=Welcome" \
     -H "Authorization: Bearer $TOKEN" | extract_material_id)
@@ -116,6 +131,12 @@ curl -s --fail -X POST "$API_URL/submit_assignment?course_id=$COURSE_ID&assignme
     -H "Authorization: Bearer $STUDENT_TOKEN"
 echo
 
+echo "== Downloading all submission attachments =="
+curl -s --fail -X GET "$API_URL/download_assignment_submissions?course_id=$COURSE_ID&assignment_id=$ASSIGNMENT_ID" \
+    -H "Authorization: Bearer $TOKEN" -o /tmp/edhub_submissions.zip
+python3 -c "import zipfile; print(zipfile.ZipFile('/tmp/edhub_submissions.zip').namelist())"
+echo
+
 echo "== Grading assignment =="
 curl -s --fail -X POST "$API_URL/grade_submission?course_id=$COURSE_ID&assignment_id=$ASSIGNMENT_ID&student_email=$STUDENT_EMAIL&grade=95" \
     -H "Authorization: Bearer $TOKEN"
@@ -126,23 +147,94 @@ curl -s --fail -X GET "$API_URL/download_full_course_grade_table?course_id=$COUR
     -H "Authorization: Bearer $TOKEN"
 echo
 
+echo "== Grading submissions in bulk =="
+curl -s --fail -X POST "$API_URL/grade_submissions?course_id=$COURSE_ID&assignment_id=$ASSIGNMENT_ID" \
+    -H "Authorization: Bearer $TOKEN" -H "Content-Type: application/json" \
+    -d "{\"grades\":[{\"student_email\":\"$STUDENT_EMAIL\",\"grade\":95}]}"
+echo
+
+echo "== Uploading grade table =="
+curl -s --fail -X GET "$API_URL/download_full_course_grade_table?course_id=$COURSE_ID" \
+    -H "Authorization: Bearer $TOKEN" > /tmp/edhub_grades.csv
+curl -s --fail -X POST "$API_URL/upload_full_course_grade_table?course_id=$COURSE_ID" \
+    -H "Authorization: Bearer $TOKEN" -F "file=@/tmp/edhub_grades.csv"
+echo
+
+echo "== Grade report (student) =="
+curl -s --fail -X GET "$API_URL/download_full_course_grade_table?course_id=$COURSE_ID" \
+    -H "Authorization: Bearer $STUDENT_TOKEN"
+echo
+
 echo "== Grade report (json) =="
 curl -s --fail -X GET "$API_URL/get_full_course_grade_table_json?course_id=$COURSE_ID" \
     -H "Authorization: Bearer $TOKEN"
 echo
 
+echo "== Grade summaries =="
+curl -s --fail -X GET "$API_URL/get_grade_summaries?course_id=$COURSE_ID" \
+    -H "Authorization: Bearer $TOKEN"
+echo
+
+echo "== Setting grade category =="
+curl -s --fail -X POST "$API_URL/set_grade_category?course_id=$COURSE_ID&name=Homework&weight=2" \
+    -H "Authorization: Bearer $TOKEN"
+curl -s --fail -X POST "$API_URL/set_assignment_category?course_id=$COURSE_ID&assignment_id=$ASSIGNMENT_ID&category=Homework" \
+    -H "Authorization: Bearer $TOKEN"
+echo
+
+echo "== Final course grades =="
+curl -s --fail -X GET "$API_URL/get_course_final_grades?course_id=$COURSE_ID" \
+    -H "Authorization: Bearer $STUDENT_TOKEN"
+echo
+
+echo "== Assignment grade statistics =="
+curl -s --fail -X GET "$API_URL/get_assignment_grade_statistics?course_id=$COURSE_ID" \
+    -H "Authorization: Bearer $TOKEN"
+echo
+
 echo "== Admin login =="
 TOKEN=$(curl -s --fail -X POST $API_URL/login -H "Content-Type: application/json" \
     -d "{\"email\":\"admin\",\"password\":\"admin\"}" | extract_token)
 echo
 
+echo "== Checking that the admin account was created once =="
+ADMINS=$(curl -s --fail -X GET "$API_URL/get_admins" -H "Authorization: Bearer $TOKEN" \
+    | python3 -c "import sys, json; print(len(json.load(sys.stdin)))")
+[ "$ADMINS" = "1" ]
+echo
+
+echo "== Checking that admins only get their own courses with memberships_only =="
+MY_COURSES=$(curl -s --fail -X GET "$API_URL/get_my_courses?memberships_only=true" -H "Authorization: Bearer $TOKEN" \
+    | python3 -c "import sys, json; print(len(json.load(sys.stdin)))")
+ALL_COURSES=$(curl -s --fail -X GET "$API_URL/get_my_courses" -H "Authorization: Bearer $TOKEN" \
+    | python3 -c "import sys, json; print(len(json.load(sys.stdin)))")
+[ "$MY_COURSES" = "0" ] && [ "$ALL_COURSES" != "0" ]
+echo
+
 echo "== Admin creating material =="
 MATERIAL_ID=$(curl -s --fail -X POST "$API_URL/create_material?course_id=$COURSE_ID&title=AdminTitle&description=AdminDescription" \
     -H "Authorization: Bearer $TOKEN" | extract_material_id)
 echo "Material ID: $MATERIAL_ID"
 echo
 
+echo "== Admin reading the course logs =="
+sleep 2  # logs are written in batches
+LOGS=$(curl -s --fail -X GET "$API_URL/get_logs?course_id=$COURSE_ID&limit=2" -H "Authorization: Bearer $TOKEN" \
+    | python3 -c "import sys, json; d = json.load(sys.stdin); print(len(d['logs']), d['next_cursor'] is not None)")
+[ "$LOGS" = "2 True" ]
+echo
+
 echo "== Admin remove course =="
 curl -s -X POST "$API_URL/remove_course?course_id=$COURSE_ID" -H "Authorization: Bearer $TOKEN"
 
+echo "== Checking that the removed course is hidden =="
+STATUS=$(curl -s -o /dev/null -w "%{http_code}" -X GET "$API_URL/get_course_info?course_id=$COURSE_ID" -H "Authorization: Bearer $TOKEN")
+[ "$STATUS" = "404" ]
+echo
+
+echo "== Admin dry run of the storage garbage collection =="
+curl -s --fail -X POST "$API_URL/collect_storage_garbage?dry_run=true" -H "Authorization: Bearer $TOKEN" \
+    | python3 -c "import sys, json; d = json.load(sys.stdin); assert d['dry_run'] and d['deleted_blobs'] == 0, d"
+echo
+
 echo "== All tests completed =="
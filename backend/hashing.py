@@ -0,0 +1,48 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+# bcrypt releases the GIL while hashing, so a thread per core is enough to use all of them
+HASHING_WORKERS = os.cpu_count() or 1
+
+# how many hashing jobs may wait for a free worker before new ones are rejected
+HASHING_QUEUE_SIZE = 8 * HASHING_WORKERS
+
+# seconds the client is advised to wait after an overload response
+HASHING_RETRY_AFTER_SECONDS = 1
+
+pwd_hasher = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_executor = ThreadPoolExecutor(max_workers=HASHING_WORKERS, thread_name_prefix="bcrypt")
+
+# jobs that are running or waiting in the executor; only touched from the event loop
+_pending = 0
+
+
+async def _run_bounded(func, *args):
+    global _pending
+    if _pending >= HASHING_WORKERS + HASHING_QUEUE_SIZE:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many password operations in progress, try again later",
+            headers={"Retry-After": str(HASHING_RETRY_AFTER_SECONDS)},
+        )
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password(password: str) -> str:
+    return await _run_bounded(pwd_hasher.hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    return await _run_bounded(pwd_hasher.verify, password, hashed_password)
+
+
+def shutdown_hashing():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -28,12 +28,33 @@ class Course(CourseId):
     number_of_students: int
 
 
+class CourseWithRole(Course):
+    is_teacher: bool
+    is_student: bool
+    is_parent: bool
+    is_admin: bool
+
+
 class CoursePost(BaseModel):
     course_id: str
     post_id: int
     type: str
     timeadded: str
-    author: str
+    author: Union[str, None]
+    cursor: str
+
+
+class FeedAttachment(BaseModel):
+    file_id: str
+    filename: str
+    upload_time: str
+
+
+class ExpandedCoursePost(CoursePost):
+    title: str
+    description: str
+    author_name: Union[str, None]
+    attachments: list[FeedAttachment]
 
 
 class MaterialID(BaseModel):
@@ -64,7 +85,7 @@ class Assignment(AssignmentID):
     creation_time: str
     title: str
     description: str
-    author: str
+    author: Union[str, None]
 
 
 class AssignmentAttachmentMetadata(BaseModel):
@@ -125,3 +146,116 @@ class GradeRow(BaseModel):
 
 class GradeTable(BaseModel):
     rows: list[GradeRow]
+
+
+class GradeCategory(BaseModel):
+    name: Union[str, None]
+    weight: float
+
+
+class FinalGradeRow(BaseModel):
+    email: str
+    name: str
+    final_grade: Union[float, None]
+    category_grades: list[Union[float, None]]
+
+
+class FinalGradeTable(BaseModel):
+    categories: list[GradeCategory]
+    rows: list[FinalGradeRow]
+
+
+class AssignmentGradeStatistics(BaseModel):
+    assignment_id: int
+    title: str
+    category: Union[str, None]
+    submitted: int
+    graded: int
+    missing: int
+    mean: Union[float, None]
+    median: Union[float, None]
+    stddev: Union[float, None]
+
+
+class GradeEntry(BaseModel):
+    student_email: str
+    grade: int
+
+
+class GradeBatch(BaseModel):
+    grades: list[GradeEntry]
+
+
+class GradeRowResult(BaseModel):
+    row: int
+    student_email: str
+    assignment_id: int
+    grade: str
+    status: str
+    detail: str
+
+
+class RosterParent(BaseModel):
+    student_email: str
+    parent_email: str
+
+
+class Roster(BaseModel):
+    students: list[str] = []
+    parents: list[RosterParent] = []
+
+
+class RosterRowResult(BaseModel):
+    row: int
+    student_email: str
+    parent_email: Union[str, None]
+    status: str
+    detail: str
+
+
+class RosterReport(BaseModel):
+    students: list[RosterRowResult]
+    parents: list[RosterRowResult]
+
+
+class GradeSummary(BaseModel):
+    email: str
+    name: str
+    graded_count: int
+    average: Union[float, None]
+    last_graded: Union[str, None]
+
+
+class LogEntry(BaseModel):
+    time: str
+    tag: str
+    message: str
+    actor: Union[str, None]
+    course_id: Union[str, None]
+    object_id: Union[str, None]
+
+
+class LogPage(BaseModel):
+    logs: list[LogEntry]
+    next_cursor: Union[str, None]
+
+
+class GarbageCollectionRun(BaseModel):
+    dry_run: bool
+    started: str
+    finished: str
+    scanned_blobs: int
+    orphaned_blobs: int
+    orphaned_bytes: int
+    miscounted_blobs: int
+    deleted_blobs: int
+    reclaimed_bytes: int
+
+
+class GarbageCollectionStats(BaseModel):
+    grace_seconds: int
+    dry_run: bool
+    runs: int
+    deleted_blobs: int
+    reclaimed_bytes: int
+    last_run: Union[GarbageCollectionRun, None]
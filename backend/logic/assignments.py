@@ -1,13 +1,15 @@
-from fastapi import HTTPException, UploadFile, Response
+from fastapi import HTTPException, UploadFile
+from typing import Union
 from constants import TIME_FORMAT
 import constraints
 import repo.assignments as repo_ass
-import repo.files as repo_files
+import repo.grading as repo_grading
 import logic.logging as logger
 from logic.uploading import careful_upload
+from logic.downloading import stream_attachment
 
 
-def create_assignment(
+async def create_assignment(
     db_conn,
     db_cursor,
     course_id: str,
@@ -16,38 +18,39 @@ def create_assignment(
     user_email: str,
 ):
     # checking constraints
-    constraints.assert_teacher_access(db_cursor, user_email, course_id)
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
 
     # create assignment
-    assignment_id = repo_ass.sql_insert_assignment(db_cursor, course_id, title, description, user_email)
-    db_conn.commit()
+    assignment_id = await repo_ass.sql_insert_assignment(db_cursor, course_id, title, description, user_email)
+    await db_conn.commit()
 
-    logger.log(db_conn, logger.TAG_ASSIGNMENT_ADD, f"Created assignment {assignment_id}")
+    await logger.log(logger.TAG_ASSIGNMENT_ADD, f"Created assignment {assignment_id}", actor=user_email, course_id=course_id, object_id=assignment_id)
 
     return {"course_id": course_id, "assignment_id": assignment_id}
 
 
-def remove_assignment(db_conn, db_cursor, course_id: str, assignment_id: str, user_email: str):
+async def remove_assignment(db_conn, db_cursor, course_id: str, assignment_id: str, user_email: str):
     # checking constraints
-    constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
-    constraints.assert_teacher_access(db_cursor, user_email, course_id)
+    await constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
 
-    # remove assignment
-    repo_ass.sql_delete_assignment(db_cursor, course_id, assignment_id)
-    db_conn.commit()
+    # remove assignment, together with its grades in the students' summaries
+    await repo_grading.sql_delete_assignment_submissions(db_cursor, course_id, assignment_id)
+    await repo_ass.sql_delete_assignment(db_cursor, course_id, assignment_id)
+    await db_conn.commit()
 
-    logger.log(db_conn, logger.TAG_ASSIGNMENT_DEL, f"Removed assignment {assignment_id}")
+    await logger.log(logger.TAG_ASSIGNMENT_DEL, f"Removed assignment {assignment_id}", actor=user_email, course_id=course_id, object_id=assignment_id)
 
     return {"success": True}
 
 
-def get_assignment(db_cursor, course_id: str, assignment_id: str, user_email: str):
+async def get_assignment(db_cursor, course_id: str, assignment_id: str, user_email: str):
 
     # checking constraints
-    constraints.assert_course_access(db_cursor, user_email, course_id)
+    await constraints.assert_course_access(db_cursor, user_email, course_id)
 
     # searching for assignments
-    assignment = repo_ass.sql_select_assignment(db_cursor, course_id, assignment_id)
+    assignment = await repo_ass.sql_select_assignment(db_cursor, course_id, assignment_id)
     if not assignment:
         raise HTTPException(status_code=404, detail="Assignment not found")
 
@@ -64,18 +67,18 @@ def get_assignment(db_cursor, course_id: str, assignment_id: str, user_email: st
 
 async def create_assignment_attachment(db_conn, db_cursor, storage_db_conn, storage_db_cursor, course_id: str, assignment_id: str, file: UploadFile, user_email: str):
     # checking constraints
-    constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
-    constraints.assert_teacher_access(db_cursor, user_email, course_id)
+    await constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
 
-    # read the file
-    contents = await careful_upload(file)
+    # store the contents, shared with identical files
+    blob_hash = await careful_upload(storage_db_cursor, file)
 
-    # save the file into database
-    attachment_metadata = repo_ass.sql_insert_assignment_attachment(db_cursor, storage_db_cursor, course_id, assignment_id, file.filename, contents)
-    db_conn.commit()
-    storage_db_conn.commit()
+    # save the attachment metadata; the contents are committed first, so that it never points to a missing file
+    attachment_metadata = await repo_ass.sql_insert_assignment_attachment(db_cursor, course_id, assignment_id, blob_hash, file.filename)
+    await storage_db_conn.commit()
+    await db_conn.commit()
 
-    logger.log(db_conn, logger.TAG_ATTACHMENT_ADD_ASS, f"User {user_email} created an attachment {file.filename} for the assignment {assignment_id} in course {course_id}")
+    await logger.log(logger.TAG_ATTACHMENT_ADD_ASS, f"User {user_email} created an attachment {file.filename} for the assignment {assignment_id} in course {course_id}", actor=user_email, course_id=course_id, object_id=attachment_metadata[0])
     return {
         "course_id": course_id,
         "assignment_id": assignment_id,
@@ -85,13 +88,13 @@ async def create_assignment_attachment(db_conn, db_cursor, storage_db_conn, stor
     }
 
 
-def get_assignment_attachments(db_cursor, course_id: str, assignment_id: str, user_email: str):
+async def get_assignment_attachments(db_cursor, course_id: str, assignment_id: str, user_email: str):
     # checking constraints
-    constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
-    constraints.assert_course_access(db_cursor, user_email, course_id)
+    await constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
+    await constraints.assert_course_access(db_cursor, user_email, course_id)
 
     # searching for assignment attachments
-    files = repo_ass.sql_select_assignment_attachments(db_cursor, course_id, assignment_id)
+    files = await repo_ass.sql_select_assignment_attachments(db_cursor, course_id, assignment_id)
 
     res = [{
         "course_id": course_id,
@@ -104,24 +107,19 @@ def get_assignment_attachments(db_cursor, course_id: str, assignment_id: str, us
     return res
 
 
-def download_assignment_attachment(db_cursor, storage_db_cursor, course_id: str, assignment_id: str, file_id: str, user_email: str):
+async def download_assignment_attachment(db_cursor, course_id: str, assignment_id: str, file_id: str, range_header: Union[str, None], if_none_match: Union[str, None], user_email: str):
     # checking constraints
-    constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
-    constraints.assert_course_access(db_cursor, user_email, course_id)
+    await constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
+    await constraints.assert_course_access(db_cursor, user_email, course_id)
 
     # searching for assignment attachment
-    file = repo_files.sql_download_attachment(storage_db_cursor, file_id)
-    file_metadata = repo_files.sql_select_attachment_metadata(db_cursor, file_id)
-    if (not file or not file_metadata):
+    file_metadata = await repo_ass.sql_select_assignment_attachment(db_cursor, course_id, assignment_id, file_id)
+    if not file_metadata:
         raise HTTPException(status_code=404, detail="Attachment not found")
 
-    return Response(
-        content=file,
-        media_type="application/octet-stream",
-        headers={"Content-Disposition": f'attachment; filename="{file_metadata[1]}"'}
-    )
+    return await stream_attachment(file_metadata[1], file_metadata[0], range_header, if_none_match)
 
 
-def get_all_assignments(db_cursor, course_id: str, user_email: str) -> list[int]:
-    constraints.assert_course_access(db_cursor, user_email, course_id)
-    return repo_ass.sql_get_all_assignments(db_cursor, course_id)
+async def get_all_assignments(db_cursor, course_id: str, user_email: str) -> list[int]:
+    await constraints.assert_course_access(db_cursor, user_email, course_id)
+    return await repo_ass.sql_get_all_assignments(db_cursor, course_id)
@@ -1,52 +1,77 @@
 from fastapi import HTTPException
+from auth import get_db
 from constants import TIME_FORMAT
 import constraints
+import repo.assignments
 import repo.courses
+import repo.parents
+import repo.students
 import repo.teachers
-import repo.users
 import logic.logging as logger
+import logic.purging
 import logic.users
 import logic.csvtables
 from typing import Union
+from datetime import datetime
 import itertools
 
 
-def available_courses(db_cursor, user_email: str):
-    courses = repo.courses.sql_select_available_courses(db_cursor, user_email)
+async def available_courses(db_cursor, user_email: str):
+    courses = await repo.courses.sql_select_available_courses(db_cursor, user_email)
     result = [{"course_id": crs[0]} for crs in courses]
     return result
 
 
-def get_all_courses(db_cursor, user_email: str):
-    constraints.assert_admin_access(db_cursor, user_email)
-    courses = repo.courses.sql_select_all_courses(db_cursor)
+async def get_courses_dashboard(db_cursor, user_email: str, memberships_only: bool = False):
+    courses = await repo.courses.sql_select_courses_dashboard(db_cursor, user_email, memberships_only)
+    res = [
+        {
+            "course_id": str(crs[0]),
+            "title": crs[1],
+            "creation_time": crs[2].strftime(TIME_FORMAT),
+            "number_of_students": crs[3],
+            "is_teacher": crs[4],
+            "is_student": crs[5],
+            "is_parent": crs[6],
+            "is_admin": crs[7],
+        }
+        for crs in courses
+    ]
+    return res
+
+
+async def get_all_courses(db_cursor, user_email: str):
+    await constraints.assert_admin_access(db_cursor, user_email)
+    courses = await repo.courses.sql_select_all_courses(db_cursor)
     result = [{"course_id": crs[0]} for crs in courses]
     return result
 
 
-def create_course(db_conn, db_cursor, title: str, user_email: str):
-    course_id = repo.courses.sql_insert_course(db_cursor, title)
-    repo.teachers.sql_insert_teacher(db_cursor, user_email, course_id)
-    db_conn.commit()
+async def create_course(db_conn, db_cursor, title: str, user_email: str):
+    course_id = await repo.courses.sql_insert_course(db_cursor, title)
+    await repo.teachers.sql_insert_teacher(db_cursor, user_email, course_id)
+    await db_conn.commit()
 
-    logger.log(db_conn, logger.TAG_COURSE_ADD, f"User {user_email} created course {course_id}")
+    await logger.log(logger.TAG_COURSE_ADD, f"User {user_email} created course {course_id}", actor=user_email, course_id=course_id)
 
     return {"course_id": course_id}
 
 
-def remove_course(db_conn, db_cursor, course_id: str, user_email: str):
-    constraints.assert_teacher_access(db_cursor, user_email, course_id)
-    repo.courses.sql_delete_course(db_cursor, course_id)
-    db_conn.commit()
+async def remove_course(db_conn, db_cursor, course_id: str, user_email: str):
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
+    # the course is hidden at once, and its contents are purged in the background
+    await repo.courses.sql_mark_courses_deleted(db_cursor, [course_id])
+    await db_conn.commit()
+    logic.purging.schedule_purge()
 
-    logger.log(db_conn, logger.TAG_COURSE_DEL, f"User {user_email} deleted course {course_id}")
+    await logger.log(logger.TAG_COURSE_DEL, f"User {user_email} deleted course {course_id}", actor=user_email, course_id=course_id)
 
     return {"success": True}
 
 
-def get_course_info(db_cursor, course_id: str, user_email: str):
-    constraints.assert_course_access(db_cursor, user_email, course_id)
-    course = repo.courses.sql_select_course_info(db_cursor, course_id)
+async def get_course_info(db_cursor, course_id: str, user_email: str):
+    await constraints.assert_course_access(db_cursor, user_email, course_id)
+    course = await repo.courses.sql_select_course_info(db_cursor, course_id)
     if not course:
         raise HTTPException(status_code=404, detail="Course not found")
     res = {
@@ -58,9 +83,24 @@ def get_course_info(db_cursor, course_id: str, user_email: str):
     return res
 
 
-def get_course_feed(db_cursor, course_id: str, user_email: str):
-    constraints.assert_course_access(db_cursor, user_email, course_id)
-    course_feed = repo.courses.sql_select_course_feed(db_cursor, course_id)
+def _encode_feed_cursor(post) -> str:
+    return f"{post[3].isoformat()}_{post[2]}_{post[1]}"
+
+
+def _decode_feed_cursor(cursor: str):
+    try:
+        timeadded, post_type, post_id = cursor.rsplit("_", 2)
+        if post_type not in ("mat", "ass"):
+            raise ValueError(post_type)
+        return datetime.fromisoformat(timeadded), post_type, int(post_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def get_course_feed(db_cursor, course_id: str, cursor: Union[str, None], limit: Union[int, None], user_email: str):
+    await constraints.assert_course_access(db_cursor, user_email, course_id)
+    after = None if cursor is None else _decode_feed_cursor(cursor)
+    course_feed = await repo.courses.sql_select_course_feed(db_cursor, course_id, after, limit)
     res = [
         {
             "course_id": str(mat[0]),
@@ -68,27 +108,65 @@ def get_course_feed(db_cursor, course_id: str, user_email: str):
             "type": mat[2],
             "timeadded": mat[3].strftime(TIME_FORMAT),
             "author": mat[4],
+            "cursor": _encode_feed_cursor(mat),
         }
         for mat in course_feed
     ]
     return res
 
 
-def get_all_grades(db_cursor, course_id: str, students: list[str],
+async def get_course_feed_expanded(db_cursor, course_id: str, cursor: Union[str, None], limit: Union[int, None], user_email: str):
+    await constraints.assert_course_access(db_cursor, user_email, course_id)
+    after = None if cursor is None else _decode_feed_cursor(cursor)
+    course_feed = await repo.courses.sql_select_course_feed_expanded(db_cursor, course_id, after, limit)
+
+    # attachments of all the posts on the page at once
+    attachments = await repo.courses.sql_select_feed_attachments(
+        db_cursor,
+        course_id,
+        [post[1] for post in course_feed if post[2] == "mat"],
+        [post[1] for post in course_feed if post[2] == "ass"],
+    )
+    post_attachments = {}
+    for att in attachments:
+        key = ("mat", att[0]) if att[0] is not None else ("ass", att[1])
+        post_attachments.setdefault(key, []).append(
+            {"file_id": att[2], "filename": att[3], "upload_time": att[4].strftime(TIME_FORMAT)}
+        )
+
+    res = [
+        {
+            "course_id": str(post[0]),
+            "post_id": post[1],
+            "type": post[2],
+            "timeadded": post[3].strftime(TIME_FORMAT),
+            "author": post[4],
+            "cursor": _encode_feed_cursor(post),
+            "title": post[5],
+            "description": post[6],
+            "author_name": post[7],
+            "attachments": post_attachments.get((post[2], post[1]), []),
+        }
+        for post in course_feed
+    ]
+    return res
+
+
+async def get_all_grades(db_cursor, course_id: str, students: list[str],
                    gradables: list[int], user_email: str) -> list[tuple[str, int, Union[None, int]]]:
-    constraints.assert_user_exists(db_cursor, user_email)
-    constraints.assert_course_exists(db_cursor, course_id)
-    role = logic.users.get_user_role(db_cursor, course_id, user_email)
+    await constraints.assert_user_exists(db_cursor, user_email)
+    await constraints.assert_course_exists(db_cursor, course_id)
+    role = await logic.users.get_user_role(db_cursor, course_id, user_email)
     if role["is_parent"]:
-        constraints.assert_parent_of_all(db_cursor, user_email, students, course_id)
+        await constraints.assert_parent_of_all(db_cursor, user_email, students, course_id)
     elif role["is_student"]:
         for student in students:
             if student != user_email:
                 raise HTTPException(403, "A student cannot view other students' grades")
-    return repo.courses.sql_select_grades_in_course(db_cursor, course_id, students, gradables)
+    return await repo.courses.sql_select_grades_in_course(db_cursor, course_id, students, gradables)
 
 
-def get_grade_table(db_cursor, course_id: str, students: list[str],
+async def get_grade_table(db_cursor, course_id: str, students: list[str],
                     gradables: list[int], user_email: str) -> list[list[Union[int, None]]]:
     """
     Returns:
@@ -97,7 +175,7 @@ def get_grade_table(db_cursor, course_id: str, students: list[str],
     3) a `len(students) x len(gradables)` table of grades. Rows and columns are not included.
     Currently, gradables are just IDs of assignments in this course.
     """
-    values = get_all_grades(db_cursor, course_id, students, gradables, user_email)
+    values = await get_all_grades(db_cursor, course_id, students, gradables, user_email)
     allrows = sorted(set(v[0] for v in values)) if students is None else students
     allcols = sorted(set(v[1] for v in values)) if gradables is None else gradables
     nrows = len(allrows)
@@ -110,32 +188,53 @@ def get_grade_table(db_cursor, course_id: str, students: list[str],
     return table
 
 
-def get_grade_table_csv(db_cursor, course_id: str, students: list[str],
-                        gradables: list[int], user_email: str) -> str:
+async def get_grade_table_csv_columns(db_cursor, course_id: str, user_email: str):
     """
-    Compile a CSV file (comma-separated, CRLF newlines) with all grades of all students.
+    Check access to the grade table and prepare its export with `stream_grade_table_csv`.
 
-    COLUMNS: student login, student display name, then assignment names
+    Returns the assignments as (id, title) and the logins of the students visible by `user_email`,
+    None meaning all students of the course.
     """
-    table = get_grade_table(db_cursor, course_id, students, gradables, user_email)
-    columns = itertools.chain(("Login", "Public Name",), gradables)
-    for login, row in zip(students, table):
-        row.insert(0, login)
-        row.insert(1, repo.users.sql_get_user_name(db_cursor, login))
-    return logic.csvtables.encode_to_csv_with_columns(columns, table)
+    await constraints.assert_course_access(db_cursor, user_email, course_id)
+    students = await get_students_accessible_by(db_cursor, course_id, user_email, all_as_none=True)
+    assignments = await repo.assignments.sql_select_assignment_titles(db_cursor, course_id)
+    return assignments, students
+
 
+async def stream_grade_table_csv(course_id: str, assignments: list[tuple[int, str]],
+                                 students: Union[list[str], None]):
+    """
+    Stream a CSV file (comma-separated, CRLF newlines) with all grades of the given students.
 
-def get_students_accessible_by(db_cursor, course_id: str, user_email: str) -> list[str]:
+    COLUMNS: student login, student display name, then assignment titles
+
+    Uses its own database connection, as the response is sent after the request handler returns.
+    """
+    columns = itertools.chain(("Login", "Public Name",), (title for assid, title in assignments))
+    async with get_db() as (db_conn, db_cursor):
+        rows = repo.courses.sql_stream_grade_table(db_conn, course_id, [assid for assid, title in assignments], students)
+        async for chunk in logic.csvtables.stream_csv_with_columns(
+            columns, ((email, name, *grades) async for email, name, grades in rows)
+        ):
+            yield chunk
+
+
+async def get_students_accessible_by(
+    db_cursor, course_id: str, user_email: str, all_as_none: bool = False
+) -> Union[list[str], None]:
     """
     Returns the list of logins of students whose grades are visible by `user_email`.
 
+    With `all_as_none`, returns None instead when all students of the course are visible.
     In particular, returns an empty list if the user is not associated with the given course.
     """
-    role = logic.users.get_user_role(db_cursor, course_id, user_email)
+    role = await logic.users.get_user_role(db_cursor, course_id, user_email)
     if role["is_teacher"] or role["is_admin"]:
-        return [email for email, name in repo.students.sql_select_enrolled_students(db_cursor, course_id)]
+        if all_as_none:
+            return None
+        return [email for email, name in await repo.students.sql_select_enrolled_students(db_cursor, course_id)]
     if role["is_parent"]:
-        return [email for email, name in repo.parents.sql_select_parents_children(db_cursor, course_id, user_email)]
+        return [email for email, name in await repo.parents.sql_select_parents_children(db_cursor, course_id, user_email)]
     elif role["is_student"]:
         return [user_email]
     else:
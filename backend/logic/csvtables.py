@@ -1,4 +1,5 @@
 import csv
+import io
 
 
 def encode_to_csv_with_columns(columns: list, content: list[list]) -> str:
@@ -7,3 +8,41 @@ def encode_to_csv_with_columns(columns: list, content: list[list]) -> str:
         writer.writerow(columns)
         writer.writerows(content)
         return stream.getvalue()
+
+
+async def stream_csv_with_columns(columns: list, content, rows_per_chunk: int = 100):
+    """
+    Encode rows from the async iterator `content` like `encode_to_csv_with_columns`,
+    yielding the text in chunks of `rows_per_chunk` rows.
+    """
+    with csv.StringIO() as stream:
+        writer = csv.writer(stream, dialect="excel")
+        writer.writerow(columns)
+        rows = 0
+        async for row in content:
+            writer.writerow(row)
+            rows += 1
+            if rows % rows_per_chunk == 0:
+                yield stream.getvalue()
+                stream.seek(0)
+                stream.truncate()
+        yield stream.getvalue()
+
+
+def decode_csv_with_columns(text: str) -> tuple[list[str], list[tuple[int, list[str]]]]:
+    """
+    Split CSV text into the header row and the content rows, skipping empty lines.
+
+    Every content row comes with the number of the line of the file it starts on, counting from 1,
+    as quoted cells may span several lines.
+    """
+    reader = csv.reader(io.StringIO(text, newline=""), dialect="excel")
+    rows = []
+    line = 1
+    for row in reader:
+        if row:
+            rows.append((line, row))
+        line = reader.line_num + 1
+    if not rows:
+        return [], []
+    return rows[0][1], rows[1:]
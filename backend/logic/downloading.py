@@ -0,0 +1,146 @@
+import re
+import zipfile
+from datetime import datetime
+from typing import Union
+from fastapi import HTTPException
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from auth import get_storage_db
+from blobstorage import get_backend
+import repo.files as repo_files
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# blobs never change, so clients may keep them as long as they like; only the user's own cache may store them
+CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def parse_range(range_header: Union[str, None], size: int) -> Union[None, tuple[int, int]]:
+    """
+    Parse a single-range `Range` header into inclusive (first, last) byte positions.
+
+    Returns None if the whole file should be sent: there is no header, it is malformed,
+    or it asks for several ranges. Raises 416 if the range is outside the file.
+    """
+    if range_header is None:
+        return None
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+
+    first, last = match.group(1), match.group(2)
+    if first == "":
+        # suffix range: the last N bytes
+        first, last = max(size - int(last), 0), size - 1
+    else:
+        first, last = int(first), size - 1 if last == "" else min(int(last), size - 1)
+
+    if first > last or first >= size:
+        raise HTTPException(
+            status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"}
+        )
+    return first, last
+
+
+def _etag_matches(if_none_match: Union[str, None], etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    # weak comparison, as required for If-None-Match
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+async def stream_attachment(
+    blob_hash: bytes, filename: str, range_header: Union[str, None], if_none_match: Union[str, None]
+) -> Response:
+    # the content hash is a strong validator, and a matching one is answered without touching the storage
+    caching_headers = {"ETag": f'"{blob_hash.hex()}"', "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(if_none_match, caching_headers["ETag"]):
+        return Response(status_code=304, headers=caching_headers)
+
+    async with get_storage_db() as (storage_db_conn, storage_db_cursor):
+        blob = await repo_files.sql_select_blob(storage_db_cursor, blob_hash)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Attachment not found")
+    size, backend_name = blob
+    backend = get_backend(backend_name)
+
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Accept-Ranges": "bytes",
+        **caching_headers,
+    }
+    byte_range = parse_range(range_header, size)
+
+    path = backend.local_path(blob_hash)
+    if path is not None:
+        # the file is sent by Starlette, which handles the range itself
+        return FileResponse(path, media_type="application/octet-stream", headers=headers)
+
+    if byte_range is None:
+        first, last, status_code = 0, size - 1, 200
+    else:
+        first, last = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    headers["Content-Length"] = str(last - first + 1)
+
+    return StreamingResponse(
+        backend.read(blob_hash, first, last),
+        status_code=status_code,
+        media_type="application/octet-stream",
+        headers=headers,
+    )
+
+
+class _ZipSink:
+    """
+    Collects the output of a ZipFile until it is taken away.
+
+    It is not seekable, so the ZipFile writes the sizes and checksums after the contents of each file,
+    and nothing written has to be kept for later.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def stream_zip(entries: list[tuple[str, bytes, datetime]]):
+    """
+    Stream a ZIP archive of blobs, given as (name in the archive, blob hash, modification time).
+
+    The archive is built while it is sent, holding at most one chunk of a blob in memory.
+    The contents are stored without compression, as most attachments are compressed already.
+    """
+    async with get_storage_db() as (storage_db_conn, storage_db_cursor):
+        blobs = {
+            blob_hash: (size, backend_name)
+            for blob_hash, size, backend_name
+            in await repo_files.sql_select_blobs(storage_db_cursor, list({blob_hash for name, blob_hash, time in entries}))
+        }
+
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for name, blob_hash, modified in entries:
+            if blob_hash not in blobs:
+                continue
+            size, backend_name = blobs[blob_hash]
+            info = zipfile.ZipInfo(name, date_time=modified.timetuple()[:6])
+            with archive.open(info, mode="w") as entry:
+                async for chunk in get_backend(backend_name).read(blob_hash, 0, size - 1):
+                    entry.write(chunk)
+                    yield sink.take()
+            yield sink.take()
+    yield sink.take()
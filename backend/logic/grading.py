@@ -0,0 +1,208 @@
+import math
+import warnings
+from typing import Union
+from fastapi import HTTPException
+from constants import TIME_FORMAT
+import numpy as np
+
+import constraints
+import repo.grading as repo_grading
+import repo.students as repo_students
+import logic.courses
+import logic.logging as logger
+
+
+# Grades of a course are kept in a (students x assignments) matrix of floats, where NaN means
+# that the grade is not counted: there is no submission, or the submission is not graded yet.
+# Assignments without a category make up one more category, of weight 1.
+
+
+def build_grade_matrix(n_students: int, n_assignments: int, rows, columns, grades, missing_as_zero: bool) -> np.ndarray:
+    """
+    Build the matrix of counted grades from the submissions given as three arrays:
+    row, column, and grade (None if not graded).
+
+    With `missing_as_zero`, assignments that a student did not submit count as 0.
+    Submissions that are not graded yet are never counted.
+    """
+    matrix = np.full((n_students, n_assignments), 0.0 if missing_as_zero else np.nan)
+    matrix[np.asarray(rows, dtype=np.intp), np.asarray(columns, dtype=np.intp)] = np.asarray(grades, dtype=float)
+    return matrix
+
+
+def submission_counts(n_assignments: int, columns, grades) -> tuple[np.ndarray, np.ndarray]:
+    """Numbers of submitted and of graded submissions of every assignment."""
+    columns = np.asarray(columns, dtype=np.intp)
+    graded = ~np.isnan(np.asarray(grades, dtype=float))
+    return np.bincount(columns, minlength=n_assignments), np.bincount(columns[graded], minlength=n_assignments)
+
+
+def assignment_statistics(matrix: np.ndarray) -> dict[str, np.ndarray]:
+    """Mean, median and standard deviation of the counted grades of every assignment."""
+    # NaN is the intended result for assignments without any counted grades
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return {
+            "mean": np.nanmean(matrix, axis=0),
+            "median": np.nanmedian(matrix, axis=0),
+            "stddev": np.nanstd(matrix, axis=0),
+        }
+
+
+def final_grades(matrix: np.ndarray, categories: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the average grade of every student in every category, and the weighted final grades.
+
+    `categories` holds the category index of every assignment, `weights` the weight of every category.
+    A category without counted grades is left out of the final grade of the student,
+    and the final grade is NaN if there are no counted grades at all.
+    """
+    counted = ~np.isnan(matrix)
+    membership = np.zeros((matrix.shape[1], len(weights)))
+    membership[np.arange(matrix.shape[1]), categories] = 1.0
+
+    sums = np.where(counted, matrix, 0.0) @ membership
+    counts = counted @ membership
+    has_grades = counts > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        category_means = sums / counts
+        final = (np.where(has_grades, category_means, 0.0) @ weights) / (has_grades @ weights)
+    return category_means, final
+
+
+def _to_json(values: np.ndarray) -> list[Union[float, None]]:
+    return [None if np.isnan(value) else round(float(value), 2) for value in values]
+
+
+async def _load_submissions(db_cursor, course_id: str, students: list[tuple[str, str]]):
+    assignments = await repo_grading.sql_select_gradable_assignments(db_cursor, course_id)
+    submissions = await repo_grading.sql_select_grade_matrix(
+        db_cursor, course_id, [email for email, name in students], [assid for assid, title, category in assignments]
+    )
+    return assignments, submissions
+
+
+async def _visible_students_with_names(db_cursor, course_id: str, user_email: str) -> list[tuple[str, str]]:
+    # (login, public name) of the students whose grades are visible by the user, ordered by login
+    visible = await logic.courses.get_students_accessible_by(db_cursor, course_id, user_email, all_as_none=True)
+    students = await repo_students.sql_select_enrolled_students(db_cursor, course_id)
+    return sorted(student for student in students if visible is None or student[0] in visible)
+
+
+async def get_grade_categories(db_cursor, course_id: str, user_email: str):
+    await constraints.assert_course_access(db_cursor, user_email, course_id)
+    categories = await repo_grading.sql_select_grade_categories(db_cursor, course_id)
+    return [{"name": name, "weight": weight} for name, weight in categories]
+
+
+async def set_grade_category(db_conn, db_cursor, course_id: str, name: str, weight: float, user_email: str):
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
+    if not 1 <= len(name) <= 100:
+        raise HTTPException(status_code=400, detail="Category name must be from 1 to 100 characters long")
+    if not (math.isfinite(weight) and weight > 0):
+        raise HTTPException(status_code=400, detail="Category weight must be a positive number")
+
+    await repo_grading.sql_upsert_grade_category(db_cursor, course_id, name, weight)
+    await db_conn.commit()
+
+    await logger.log(logger.TAG_CATEGORY_ADD, f"Set weight of category {name} to {weight}", actor=user_email, course_id=course_id)
+
+    return {"success": True}
+
+
+async def remove_grade_category(db_conn, db_cursor, course_id: str, name: str, user_email: str):
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
+    if not await repo_grading.sql_select_grade_category_exists(db_cursor, course_id, name):
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    # assignments of the category become uncategorized
+    await repo_grading.sql_delete_grade_category(db_cursor, course_id, name)
+    await db_conn.commit()
+
+    await logger.log(logger.TAG_CATEGORY_DEL, f"Removed category {name}", actor=user_email, course_id=course_id)
+
+    return {"success": True}
+
+
+async def set_assignment_category(
+    db_conn, db_cursor, course_id: str, assignment_id: str, category: Union[str, None], user_email: str
+):
+    await constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
+    if category is not None and not await repo_grading.sql_select_grade_category_exists(db_cursor, course_id, category):
+        raise HTTPException(status_code=404, detail="Category not found")
+
+    await repo_grading.sql_update_assignment_category(db_cursor, course_id, assignment_id, category)
+    await db_conn.commit()
+
+    await logger.log(logger.TAG_ASSIGNMENT_CATEGORY, f"Moved assignment {assignment_id} to category {category}", actor=user_email, course_id=course_id, object_id=assignment_id)
+
+    return {"success": True}
+
+
+async def get_course_final_grades(db_cursor, course_id: str, missing_as_zero: bool, user_email: str):
+    await constraints.assert_course_access(db_cursor, user_email, course_id)
+    students = await _visible_students_with_names(db_cursor, course_id, user_email)
+    categories = await repo_grading.sql_select_grade_categories(db_cursor, course_id)
+    assignments, (rows, columns, grades) = await _load_submissions(db_cursor, course_id, students)
+    matrix = build_grade_matrix(len(students), len(assignments), rows, columns, grades, missing_as_zero)
+
+    # the uncategorized assignments go last, and only if there are any
+    category_index = {name: i for i, (name, weight) in enumerate(categories)}
+    category_columns = [{"name": name, "weight": weight} for name, weight in categories]
+    if any(category is None for assid, title, category in assignments):
+        category_columns.append({"name": None, "weight": 1.0})
+    assignment_categories = np.array(
+        [category_index.get(category, len(categories)) for assid, title, category in assignments], dtype=np.intp
+    )
+    weights = np.array([column["weight"] for column in category_columns], dtype=float)
+
+    category_means, final = final_grades(matrix, assignment_categories, weights)
+    return {
+        "categories": category_columns,
+        "rows": [
+            {"email": email, "name": name, "final_grade": grade, "category_grades": _to_json(means)}
+            for (email, name), grade, means in zip(students, _to_json(final), category_means)
+        ],
+    }
+
+
+async def get_assignment_grade_statistics(db_cursor, course_id: str, missing_as_zero: bool, user_email: str):
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
+    students = sorted(await repo_students.sql_select_enrolled_students(db_cursor, course_id))
+    assignments, (rows, columns, grades) = await _load_submissions(db_cursor, course_id, students)
+    matrix = build_grade_matrix(len(students), len(assignments), rows, columns, grades, missing_as_zero)
+
+    submitted, graded = submission_counts(len(assignments), columns, grades)
+    stats = assignment_statistics(matrix)
+    means, medians, stddevs = _to_json(stats["mean"]), _to_json(stats["median"]), _to_json(stats["stddev"])
+    return [
+        {
+            "assignment_id": assid,
+            "title": title,
+            "category": category,
+            "submitted": int(submitted[i]),
+            "graded": int(graded[i]),
+            "missing": len(students) - int(submitted[i]),
+            "mean": means[i],
+            "median": medians[i],
+            "stddev": stddevs[i],
+        }
+        for i, (assid, title, category) in enumerate(assignments)
+    ]
+
+
+async def get_grade_summaries(db_cursor, course_id: str, user_email: str):
+    await constraints.assert_course_access(db_cursor, user_email, course_id)
+    students = await logic.courses.get_students_accessible_by(db_cursor, course_id, user_email, all_as_none=True)
+    summaries = await repo_grading.sql_select_grade_summaries(db_cursor, course_id, students)
+    return [
+        {
+            "email": summary[0],
+            "name": summary[1],
+            "graded_count": summary[2],
+            "average": None if summary[3] is None else round(summary[3], 2),
+            "last_graded": None if summary[4] is None else summary[4].strftime(TIME_FORMAT),
+        }
+        for summary in summaries
+    ]
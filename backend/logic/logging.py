@@ -1,10 +1,84 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import Union
+from fastapi import HTTPException
+
+import constraints
+from auth import get_db
+from constants import TIME_FORMAT
 import repo.logging as repo_log
 
+# events waiting to be written; when the queue is full, log() waits for the writer
+LOG_QUEUE_SIZE = 10000
+
+# the writer stores events in batches of up to LOG_BATCH_SIZE,
+# waiting at most LOG_FLUSH_INTERVAL_SECONDS for a batch to fill up
+LOG_BATCH_SIZE = 500
+LOG_FLUSH_INTERVAL_SECONDS = 1.0
+
+# attempts to store a batch before it is given up, and the pause between them
+LOG_WRITE_ATTEMPTS = 5
+LOG_RETRY_SECONDS = 1.0
+
+_queue: Union[asyncio.Queue, None] = None
+_writer: Union[asyncio.Task, None] = None
+
+
+async def log(tag, msg, actor=None, course_id=None, object_id=None):
+    """
+    Record an event: `actor` is the email of the user who caused it, `course_id` is the course
+    it happened in, and `object_id` identifies what it affected within the course or the system.
+    """
+    # the time of the event rather than of the write, in UTC
+    event_time = datetime.now(timezone.utc).replace(tzinfo=None)
+    await _queue.put((event_time, tag, msg, actor, course_id, None if object_id is None else str(object_id)))
+
+
+async def _collect_batch():
+    batch = [await _queue.get()]
+    deadline = asyncio.get_running_loop().time() + LOG_FLUSH_INTERVAL_SECONDS
+    while len(batch) < LOG_BATCH_SIZE:
+        timeout = deadline - asyncio.get_running_loop().time()
+        try:
+            batch.append(await asyncio.wait_for(_queue.get(), timeout) if timeout > 0 else _queue.get_nowait())
+        except (asyncio.TimeoutError, asyncio.QueueEmpty):
+            break
+    return batch
+
+
+async def _write_batch(batch):
+    for attempt in range(1, LOG_WRITE_ATTEMPTS + 1):
+        try:
+            async with get_db() as (db_conn, db_cursor):
+                await repo_log.sql_insert_logs(db_cursor, batch)
+            return
+        except Exception as e:
+            if attempt == LOG_WRITE_ATTEMPTS:
+                print(f"Dropped {len(batch)} log events after {attempt} failed attempts: {e!r}")
+                return
+            await asyncio.sleep(LOG_RETRY_SECONDS)
+
+
+async def _write_logs():
+    while True:
+        batch = await _collect_batch()
+        try:
+            await _write_batch(batch)
+        finally:
+            for _ in batch:
+                _queue.task_done()
+
+
+def start_log_writer():
+    global _queue, _writer
+    _queue = asyncio.Queue(maxsize=LOG_QUEUE_SIZE)
+    _writer = asyncio.create_task(_write_logs())
 
-def log(db_conn, tag, msg):
-    with db_conn.cursor() as db_cursor:
-        repo_log.sql_insert_log(db_cursor, tag, msg)
-        db_conn.commit()
+
+async def stop_log_writer():
+    # write everything logged so far, then stop
+    await _queue.join()
+    _writer.cancel()
 
 
 _TAG_ASSIGNMENT = "assignment"
@@ -17,18 +91,23 @@ _TAG_USER = "user"
 _TAG_SUBMISSION = "submission"
 _TAG_ATTACHMENT = "attachment"
 _TAG_ADMIN = "admin"
+_TAG_CATEGORY = "category"
+_TAG_STORAGE = "storage"
 
 _ACT_ADD = "add"
 _ACT_DEL = "del"
 _ACT_SUBMIT = "submit"
 _ACT_GRADE = "grade"
 _ACT_CHANGE_PASSWORD = "changepw"
+_ACT_CATEGORIZE = "categorize"
+_ACT_COLLECT = "gc"
 
 
 TAG_ASSIGNMENT_ADD = f"{_TAG_ASSIGNMENT} {_ACT_ADD}"
 TAG_ASSIGNMENT_DEL = f"{_TAG_ASSIGNMENT} {_ACT_DEL}"
 TAG_ASSIGNMENT_SUBMIT = f"{_TAG_ASSIGNMENT} {_ACT_SUBMIT}"
 TAG_ASSIGNMENT_GRADE = f"{_TAG_ASSIGNMENT} {_ACT_GRADE}"
+TAG_ASSIGNMENT_CATEGORY = f"{_TAG_ASSIGNMENT} {_ACT_CATEGORIZE}"
 
 TAG_COURSE_ADD = f"{_TAG_COURSE} {_ACT_ADD}"
 TAG_COURSE_DEL = f"{_TAG_COURSE} {_ACT_DEL}"
@@ -56,3 +135,62 @@ TAG_ATTACHMENT_ADD_SUB = f" {_TAG_SUBMISSION} {TAG_ATTACHMENT_ADD}"
 
 TAG_ADMIN_ADD = f"{_TAG_ADMIN} {_ACT_ADD}"
 TAG_ADMIN_DEL = f"{_TAG_ADMIN} {_ACT_DEL}"
+
+TAG_CATEGORY_ADD = f"{_TAG_CATEGORY} {_ACT_ADD}"
+TAG_CATEGORY_DEL = f"{_TAG_CATEGORY} {_ACT_DEL}"
+
+TAG_STORAGE_GC = f"{_TAG_STORAGE} {_ACT_COLLECT}"
+
+
+def _encode_cursor(t: datetime, log_id: int) -> str:
+    return f"{t.isoformat()}_{log_id}"
+
+
+def _decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        t, _, log_id = cursor.rpartition("_")
+        return datetime.fromisoformat(t), int(log_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _as_utc(t: Union[datetime, None]) -> Union[datetime, None]:
+    # log times are naive UTC; comparing them with aware values would not use the indexes
+    if t is None or t.tzinfo is None:
+        return t
+    return t.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+async def get_logs(
+    db_cursor,
+    tag: Union[str, None],
+    actor: Union[str, None],
+    course_id: Union[str, None],
+    since: Union[datetime, None],
+    until: Union[datetime, None],
+    cursor: Union[str, None],
+    limit: int,
+    user_email: str,
+):
+    # checking constraints
+    await constraints.assert_admin_access(db_cursor, user_email)
+
+    # one more row than asked tells whether there is a next page
+    after = None if cursor is None else _decode_cursor(cursor)
+    logs = await repo_log.sql_select_logs(
+        db_cursor, tag, actor, course_id, _as_utc(since), _as_utc(until), after, limit + 1
+    )
+    next_cursor = _encode_cursor(logs[limit - 1][1], logs[limit - 1][0]) if len(logs) > limit else None
+
+    res = [
+        {
+            "time": log[1].strftime(TIME_FORMAT),
+            "tag": log[2],
+            "message": log[3],
+            "actor": log[4],
+            "course_id": log[5],
+            "object_id": log[6],
+        }
+        for log in logs[:limit]
+    ]
+    return {"logs": res, "next_cursor": next_cursor}
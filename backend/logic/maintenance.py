@@ -0,0 +1,67 @@
+import asyncio
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from typing import Union
+
+from auth import get_db
+import repo.logging as repo_log
+import logic.purging
+import logic.storage
+
+# how often every worker runs the maintenance; runs are idempotent, so it does not matter which one does the work
+MAINTENANCE_INTERVAL_SECONDS = 60 * 60
+
+# logs older than this many days are dropped with their partitions
+LOG_RETENTION_DAYS = 7
+
+# partitions are created this many days in advance, so logs always have one to go to
+LOG_PARTITIONS_AHEAD_DAYS = 3
+
+_task: Union[asyncio.Task, None] = None
+
+
+async def maintain_log_partitions():
+    today = datetime.now(timezone.utc).date()
+    async with get_db() as (db_conn, db_cursor):
+        await repo_log.sql_lock_log_partitions(db_cursor)
+        await repo_log.sql_create_default_log_partition(db_cursor)
+        for days in range(LOG_PARTITIONS_AHEAD_DAYS + 1):
+            await repo_log.sql_create_log_partition(db_cursor, today + timedelta(days=days))
+        for day in await repo_log.sql_select_log_partition_days(db_cursor):
+            if day < today - timedelta(days=LOG_RETENTION_DAYS):
+                await repo_log.sql_drop_log_partition(db_cursor, day)
+        await repo_log.sql_delete_default_logs(db_cursor, today - timedelta(days=LOG_RETENTION_DAYS))
+
+
+async def run_maintenance():
+    # the steps are independent, a failing one does not hold back the others
+    steps = (
+        ("Log partition maintenance", maintain_log_partitions),
+        ("Purge of deleted users and courses", logic.purging.purge_deleted),
+        ("Storage garbage collection", lambda: logic.storage.collect_garbage(logic.storage.GC_DRY_RUN)),
+    )
+    for name, step in steps:
+        try:
+            await step()
+        except Exception as e:
+            print(f"{name} failed: {e!r}")
+
+
+async def _run_periodically():
+    while True:
+        await asyncio.sleep(MAINTENANCE_INTERVAL_SECONDS)
+        await run_maintenance()
+
+
+async def start_maintenance():
+    global _task
+    # today's log partition is created before anything is logged; the rest waits for the periodic runs
+    await maintain_log_partitions()
+    _task = asyncio.create_task(_run_periodically())
+
+
+async def stop_maintenance():
+    _task.cancel()
+    with suppress(asyncio.CancelledError):
+        await _task
+    await logic.purging.stop_purge()
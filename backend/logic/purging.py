@@ -0,0 +1,113 @@
+import asyncio
+from contextlib import suppress
+from typing import Union
+
+from auth import get_db
+import repo.purging as repo_purging
+
+# rows deleted or changed in one transaction, and the pause between the transactions,
+# so that a purge never holds many locks for long
+PURGE_BATCH_SIZE = 200
+PURGE_PAUSE_SECONDS = 0.05
+
+# what refers to a deleted course or user, in the order it is purged; files go with their owners
+_COURSE_STEPS = [
+    (repo_purging.sql_delete_rows, "course_assignments_submissions", "courseid"),
+    (repo_purging.sql_delete_rows, "course_assignments", "courseid"),
+    (repo_purging.sql_delete_rows, "course_materials", "courseid"),
+    (repo_purging.sql_delete_rows, "student_at", "courseid"),
+    (repo_purging.sql_delete_rows, "teaches", "courseid"),
+]
+_USER_STEPS = [
+    (repo_purging.sql_delete_rows, "course_assignments_submissions", "email"),
+    (repo_purging.sql_clear_column, "course_assignments_submissions", "gradedby"),
+    (repo_purging.sql_clear_column, "course_materials", "author"),
+    (repo_purging.sql_clear_column, "course_assignments", "author"),
+]
+
+_task: Union[asyncio.Task, None] = None
+
+
+async def _purge_steps(steps, value, lock: bool = True) -> bool:
+    # returns False as soon as another worker is found purging
+    for action, table, column in steps:
+        while True:
+            async with get_db() as (db_conn, db_cursor):
+                if lock and not await repo_purging.sql_try_lock_purge(db_cursor):
+                    return False
+                count = await action(db_cursor, table, column, value, PURGE_BATCH_SIZE)
+            await asyncio.sleep(PURGE_PAUSE_SECONDS)
+            if count < PURGE_BATCH_SIZE:
+                break
+    return True
+
+
+async def _purge_row(delete, value, lock: bool = True) -> bool:
+    async with get_db() as (db_conn, db_cursor):
+        if lock and not await repo_purging.sql_try_lock_purge(db_cursor):
+            return False
+        await delete(db_cursor, value)
+    return True
+
+
+async def purge_deleted():
+    """
+    Purge the deleted courses and users, in batches of rows, each in its own transaction.
+
+    Rows added to them in the meantime are deleted with the course or user row at the end.
+    Every transaction takes the purge lock, and the purge stops when another worker holds it,
+    leaving the rest to that worker; no connection is kept between the transactions.
+    """
+    while True:
+        async with get_db() as (db_conn, db_cursor):
+            if not await repo_purging.sql_try_lock_purge(db_cursor):
+                return
+            courses = await repo_purging.sql_select_deleted_courses(db_cursor, PURGE_BATCH_SIZE)
+            users = await repo_purging.sql_select_deleted_users(db_cursor, PURGE_BATCH_SIZE)
+        if not courses and not users:
+            return
+
+        for course_id in courses:
+            if not (await _purge_steps(_COURSE_STEPS, course_id)
+                    and await _purge_row(repo_purging.sql_delete_course, course_id)):
+                return
+        for user_email in users:
+            if not (await _purge_steps(_USER_STEPS, user_email)
+                    and await _purge_row(repo_purging.sql_delete_user, user_email)):
+                return
+
+
+async def purge_user(user_email: str):
+    """
+    Purge a deleted user right away, so that the email can be registered again.
+
+    The purge lock is not taken: purging the same rows again is harmless, and this does not wait for other purges.
+    """
+    await _purge_steps(_USER_STEPS, user_email, lock=False)
+    await _purge_row(repo_purging.sql_delete_user, user_email, lock=False)
+
+
+async def _purge_in_background():
+    try:
+        await purge_deleted()
+    except Exception as e:
+        print(f"Purge failed: {e!r}")
+
+
+def schedule_purge():
+    """
+    Start purging the deleted courses and users in the background, unless this worker is purging already.
+
+    A running purge looks for more deleted rows before it finishes, and whatever it misses
+    is purged by the periodic maintenance.
+    """
+    global _task
+    if _task is None or _task.done():
+        _task = asyncio.create_task(_purge_in_background())
+
+
+async def stop_purge():
+    if _task is not None:
+        _task.cancel()
+        with suppress(asyncio.CancelledError):
+            await _task
@@ -0,0 +1,157 @@
+from typing import Union
+from fastapi import HTTPException, UploadFile
+import constraints
+import repo.grading as repo_grading
+import repo.parents as repo_parents
+import repo.students as repo_students
+import repo.users as repo_users
+import logic.logging as logger
+import logic.csvtables
+
+# the largest roster accepted in one request
+MAX_ROSTER_ROWS = 10000
+
+STATUS_ADDED = "added"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+
+
+def _result(row: int, student_email: str, parent_email: Union[str, None], status: str, detail: str):
+    return {"row": row, "student_email": student_email, "parent_email": parent_email, "status": status, "detail": detail}
+
+
+async def enroll_roster(
+    db_conn,
+    db_cursor,
+    course_id: str,
+    students: list[tuple[int, str]],
+    parents: list[tuple[int, str, str]],
+    teacher_email: str,
+):
+    """
+    Enroll the students and invite the parents, given as (row, student) and (row, student, parent).
+
+    Every row is checked like in `invite_student` and `invite_parent`, but with a fixed number of queries
+    for the whole roster. The valid rows are added in one transaction, and a result is returned for every row.
+    """
+    await constraints.assert_teacher_access(db_cursor, teacher_email, course_id)
+    if len(students) + len(parents) > MAX_ROSTER_ROWS:
+        raise HTTPException(status_code=400, detail=f"A roster can have at most {MAX_ROSTER_ROWS} rows")
+
+    emails = {email for row, email in students} | {email for row, student, parent in parents for email in (student, parent)}
+    roles = {email: (exists, is_teacher, is_student, is_parent)
+             for email, exists, is_teacher, is_student, is_parent
+             in await repo_users.sql_select_course_roles(db_cursor, course_id, list(emails))}
+
+    # students
+    student_results = []
+    new_students = []
+    seen = set()
+    for row, email in students:
+        exists, is_teacher, is_student, is_parent = roles[email]
+        if not email:
+            student_results.append(_result(row, email, None, STATUS_FAILED, "Empty email"))
+        elif email in seen:
+            student_results.append(_result(row, email, None, STATUS_SKIPPED, "Duplicate row"))
+        elif not exists:
+            student_results.append(_result(row, email, None, STATUS_FAILED, "No user with provided email"))
+        elif is_student:
+            student_results.append(_result(row, email, None, STATUS_SKIPPED, "The user already has student rights in this course"))
+        elif is_teacher:
+            student_results.append(_result(row, email, None, STATUS_FAILED, "Can't invite course teacher as a student"))
+        elif is_parent:
+            student_results.append(_result(row, email, None, STATUS_FAILED, "Can't invite parent as a student"))
+        else:
+            student_results.append(_result(row, email, None, STATUS_ADDED, "Enrolled"))
+            new_students.append(email)
+        seen.add(email)
+
+    # parents, who may be invited for the students enrolled above
+    parent_results = []
+    new_pairs = []
+    new_students_set = set(new_students)
+    existing_pairs = set(await repo_parents.sql_select_parent_pairs(
+        db_cursor, course_id, list({parent for row, student, parent in parents})
+    ))
+    seen = set()
+    for row, student, parent in parents:
+        student_exists, student_is_teacher, student_is_student, student_is_parent = roles[student]
+        exists, is_teacher, is_student, is_parent = roles[parent]
+        if not student or not parent:
+            parent_results.append(_result(row, student, parent, STATUS_FAILED, "Empty email"))
+        elif (parent, student) in seen:
+            parent_results.append(_result(row, student, parent, STATUS_SKIPPED, "Duplicate row"))
+        elif not (student_is_student or student in new_students_set):
+            parent_results.append(_result(row, student, parent, STATUS_FAILED, "Provided user in not a student at this course"))
+        elif not exists:
+            parent_results.append(_result(row, student, parent, STATUS_FAILED, "No user with provided email"))
+        elif (parent, student) in existing_pairs:
+            parent_results.append(_result(row, student, parent, STATUS_SKIPPED, "Parent already assigned to this student at this course"))
+        elif is_teacher:
+            parent_results.append(_result(row, student, parent, STATUS_FAILED, "Can't invite course teacher as a parent"))
+        elif is_student or parent in new_students_set:
+            parent_results.append(_result(row, student, parent, STATUS_FAILED, "Can't invite course student as a parent"))
+        else:
+            parent_results.append(_result(row, student, parent, STATUS_ADDED, "Invited"))
+            new_pairs.append((parent, student))
+        seen.add((parent, student))
+
+    # rows added by someone else in the meantime are reported as skipped
+    added_students = set(await repo_students.sql_insert_students_at(db_cursor, course_id, new_students))
+    await repo_grading.sql_insert_grade_summaries(db_cursor, course_id, list(added_students))
+    added_pairs = set(await repo_parents.sql_insert_parents_of_at_course(db_cursor, course_id, new_pairs))
+    await db_conn.commit()
+
+    for result in student_results:
+        if result["status"] == STATUS_ADDED and result["student_email"] not in added_students:
+            result.update(status=STATUS_SKIPPED, detail="The user already has student rights in this course")
+    for result in parent_results:
+        if result["status"] == STATUS_ADDED and (result["parent_email"], result["student_email"]) not in added_pairs:
+            result.update(status=STATUS_SKIPPED, detail="Parent already assigned to this student at this course")
+
+    for student in added_students:
+        await logger.log(logger.TAG_STUDENT_ADD, f"Teacher {teacher_email} invited a student {student}", actor=teacher_email, course_id=course_id, object_id=student)
+    for parent, student in added_pairs:
+        await logger.log(logger.TAG_PARENT_ADD, f"Teacher {teacher_email} invited a parent {parent} for student {student}", actor=teacher_email, course_id=course_id, object_id=parent)
+
+    return {"students": student_results, "parents": parent_results}
+
+
+async def enroll_roster_json(db_conn, db_cursor, course_id: str, roster, teacher_email: str):
+    # rows are numbered from 1 within each list
+    students = [(i, email.strip()) for i, email in enumerate(roster.students, 1)]
+    parents = [(i, pair.student_email.strip(), pair.parent_email.strip()) for i, pair in enumerate(roster.parents, 1)]
+    return await enroll_roster(db_conn, db_cursor, course_id, students, parents, teacher_email)
+
+
+async def enroll_roster_csv(db_conn, db_cursor, course_id: str, file: UploadFile, teacher_email: str):
+    """
+    Enroll the roster from a CSV file with a `student_email` column and an optional `parent_email` column.
+
+    Every line enrolls the student, and invites the parent for them if there is one, so a student with
+    several parents takes several lines. Rows are numbered by lines of the file, the header being line 1.
+    """
+    try:
+        text = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Roster CSV must be encoded in UTF-8")
+    header, lines = logic.csvtables.decode_csv_with_columns(text)
+    columns = [column.strip().lower() for column in header]
+    if "student_email" not in columns:
+        raise HTTPException(status_code=400, detail="Roster CSV must have a student_email column")
+    student_column = columns.index("student_email")
+    parent_column = columns.index("parent_email") if "parent_email" in columns else None
+
+    students = []
+    parents = []
+    listed = set()
+    for row, line in lines:
+        student = line[student_column].strip() if student_column < len(line) else ""
+        parent = line[parent_column].strip() if parent_column is not None and parent_column < len(line) else ""
+        # the lines listing more parents of the same student are not duplicates
+        if student not in listed or not parent:
+            students.append((row, student))
+            listed.add(student)
+        if parent:
+            parents.append((row, student, parent))
+    return await enroll_roster(db_conn, db_cursor, course_id, students, parents, teacher_email)
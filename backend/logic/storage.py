@@ -0,0 +1,149 @@
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Union
+from fastapi import HTTPException
+from constants import TIME_FORMAT
+
+from auth import get_db, get_storage_db
+from blobstorage import get_backend
+import constraints
+import repo.files as repo_files
+import logic.logging as logger
+
+# blobs are collected in batches of this size, with a pause between them,
+# so that a collection never loads the databases for long
+GC_BATCH_SIZE = 500
+GC_PAUSE_SECONDS = 0.5
+
+# blobs uploaded more recently than this are kept even if no file refers to them,
+# as the files of an upload are registered in the system database after the blob is committed
+GC_GRACE_SECONDS = int(os.environ.get("STORAGE_GC_GRACE_SECONDS", 24 * 60 * 60))
+
+# with dry run, the periodic collections only count what they would delete
+GC_DRY_RUN = os.environ.get("STORAGE_GC_DRY_RUN", "") == "1"
+
+# statistics of a collection, in the order of the columns of storage_gc_runs
+_RUN_FIELDS = (
+    "started", "finished", "dry_run", "scanned_blobs", "orphaned_blobs", "orphaned_bytes",
+    "miscounted_blobs", "deleted_blobs", "reclaimed_bytes",
+)
+
+
+def _now() -> datetime:
+    # UTC, like the times of the logs
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _run_to_json(run: dict) -> dict:
+    return {**run, "started": run["started"].strftime(TIME_FORMAT), "finished": run["finished"].strftime(TIME_FORMAT)}
+
+
+async def _collect_batch(blobs, run: dict):
+    blob_hashes = [blob[0] for blob in blobs]
+    async with get_db() as (db_conn, db_cursor):
+        references = dict(await repo_files.sql_count_blob_references(db_cursor, blob_hashes))
+
+    orphans = [(blob_hash, size) for blob_hash, size, refcount, expired in blobs if blob_hash not in references and expired]
+    miscounted = [(blob_hash, references[blob_hash]) for blob_hash, size, refcount, expired in blobs
+                  if blob_hash in references and refcount != references[blob_hash]]
+    run["scanned_blobs"] += len(blobs)
+    run["orphaned_blobs"] += len(orphans)
+    run["orphaned_bytes"] += sum(size for blob_hash, size in orphans)
+    run["miscounted_blobs"] += len(miscounted)
+    if run["dry_run"] or not (orphans or miscounted):
+        return
+
+    async with get_storage_db() as (storage_db_conn, storage_db_cursor):
+        # an upload of the same contents may come in between and leave the count one short;
+        # the counts are informational, and the next collection fixes it
+        await repo_files.sql_update_blob_refcounts(
+            storage_db_cursor, [blob_hash for blob_hash, count in miscounted], [count for blob_hash, count in miscounted]
+        )
+        deleted = await repo_files.sql_delete_expired_blobs(
+            storage_db_cursor, [blob_hash for blob_hash, size in orphans], GC_GRACE_SECONDS
+        )
+        # the contents are deleted while the rows are locked, so a new upload of them cannot be deleted too;
+        # if the transaction fails after that, the rows are left without contents: the next collection deletes them,
+        # unless an upload of the same contents comes first and writes them again
+        for blob_hash, size, backend in deleted:
+            await get_backend(backend).delete(storage_db_cursor, blob_hash)
+    run["deleted_blobs"] += len(deleted)
+    run["reclaimed_bytes"] += sum(size for blob_hash, size, backend in deleted)
+
+
+async def collect_garbage(dry_run: bool, actor: Union[str, None] = None) -> Union[dict, None]:
+    """
+    Delete the blobs that no file refers to anymore, and fix the reference counts of the other ones.
+
+    Blobs are walked in batches in the order of their hashes, and the files referring to them
+    are counted in the system database. Orphaned blobs uploaded within the grace period are kept.
+    With `dry_run`, nothing is changed, and the statistics tell what would be.
+
+    Only one collection runs at a time over all workers; returns None if another one is running.
+    """
+    run = {
+        "dry_run": dry_run,
+        "started": _now(),
+        "finished": None,
+        "scanned_blobs": 0,
+        "orphaned_blobs": 0,
+        "orphaned_bytes": 0,
+        "miscounted_blobs": 0,
+        "deleted_blobs": 0,
+        "reclaimed_bytes": 0,
+    }
+    async with get_storage_db() as (lock_conn, lock_cursor):
+        if not await repo_files.sql_try_lock_garbage_collection(lock_cursor):
+            return None
+        # the lock outlives the transaction, which is not kept open during the collection
+        await lock_conn.commit()
+        try:
+            after = b""
+            while True:
+                async with get_storage_db() as (storage_db_conn, storage_db_cursor):
+                    blobs = await repo_files.sql_select_blob_batch(storage_db_cursor, after, GC_GRACE_SECONDS, GC_BATCH_SIZE)
+                if not blobs:
+                    break
+                after = blobs[-1][0]
+                await _collect_batch(blobs, run)
+                await asyncio.sleep(GC_PAUSE_SECONDS)
+        finally:
+            await repo_files.sql_unlock_garbage_collection(lock_cursor)
+
+    run["finished"] = _now()
+    # the runs are kept in the system database, so the statistics cover all workers
+    async with get_db() as (db_conn, db_cursor):
+        await repo_files.sql_insert_gc_run(db_cursor, run)
+
+    if dry_run:
+        msg = f"Garbage collection dry run found {run['orphaned_blobs']} orphaned blobs of {run['orphaned_bytes']} bytes"
+    else:
+        msg = f"Garbage collection deleted {run['deleted_blobs']} orphaned blobs, reclaimed {run['reclaimed_bytes']} bytes"
+    await logger.log(logger.TAG_STORAGE_GC, f"{msg}, {run['scanned_blobs']} blobs scanned", actor=actor)
+    return _run_to_json(run)
+
+
+async def run_garbage_collection(dry_run: bool, user_email: str):
+    async with get_db() as (db_conn, db_cursor):
+        await constraints.assert_admin_access(db_cursor, user_email)
+    run = await collect_garbage(dry_run, actor=user_email)
+    if run is None:
+        raise HTTPException(status_code=409, detail="Garbage collection is already running")
+    return run
+
+
+async def get_garbage_collection_stats(db_cursor, user_email: str):
+    await constraints.assert_admin_access(db_cursor, user_email)
+    runs, deleted_blobs, reclaimed_bytes = await repo_files.sql_select_gc_totals(db_cursor)
+    last_run = await repo_files.sql_select_last_gc_run(db_cursor)
+    if last_run is not None:
+        last_run = _run_to_json(dict(zip(_RUN_FIELDS, last_run)))
+    return {
+        "grace_seconds": GC_GRACE_SECONDS,
+        "dry_run": GC_DRY_RUN,
+        "runs": runs,
+        "deleted_blobs": deleted_blobs,
+        "reclaimed_bytes": reclaimed_bytes,
+        "last_run": last_run,
+    }
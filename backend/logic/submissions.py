@@ -1,13 +1,30 @@
-from fastapi import HTTPException, UploadFile, Response
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
+from typing import Union
 from constants import TIME_FORMAT
 import constraints
+import repo.assignments as repo_ass
+import repo.grading as repo_grading
 import repo.submissions as repo_submit
-import repo.files as repo_files
+import repo.users as repo_users
 import logic.logging as logger
 from logic.uploading import careful_upload
+from logic.downloading import stream_attachment, stream_zip
+import logic.csvtables
 
+# the largest number of grades set by one request
+MAX_GRADES_PER_REQUEST = 10000
 
-def submit_assignment(
+# the range of the int column the grades are stored in
+MIN_GRADE = -2**31
+MAX_GRADE = 2**31 - 1
+
+GRADE_GRADED = "graded"
+GRADE_SKIPPED = "skipped"
+GRADE_FAILED = "failed"
+
+
+async def submit_assignment(
     db_conn,
     db_cursor,
     course_id: str,
@@ -17,36 +34,36 @@ def submit_assignment(
 ):
 
     # checking constraints
-    constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
-    constraints.assert_student_access(db_cursor, student_email, course_id)
+    await constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
+    await constraints.assert_student_access(db_cursor, student_email, course_id)
 
-    submission = repo_submit.sql_select_submission_grade(db_cursor, course_id, assignment_id, student_email)
+    submission = await repo_submit.sql_select_submission_grade(db_cursor, course_id, assignment_id, student_email)
 
     # inserting submission
     if submission is None:
-        repo_submit.sql_insert_submission(db_cursor, course_id, assignment_id, student_email, comment)
-        db_conn.commit()
+        await repo_submit.sql_insert_submission(db_cursor, course_id, assignment_id, student_email, comment)
+        await db_conn.commit()
 
     # updating submission if not graded
     elif submission and submission[0] in (None, "null"):
-        repo_submit.sql_update_submission_comment(db_cursor, comment, course_id, assignment_id, student_email)
-        db_conn.commit()
+        await repo_submit.sql_update_submission_comment(db_cursor, comment, course_id, assignment_id, student_email)
+        await db_conn.commit()
 
     else:
         raise HTTPException(status_code=404, detail="Can't edit the submission after it was graded.")
 
-    logger.log(db_conn, logger.TAG_ASSIGNMENT_SUBMIT, f"Student {student_email} submitted an assignment{assignment_id} in {course_id}")
+    await logger.log(logger.TAG_ASSIGNMENT_SUBMIT, f"Student {student_email} submitted an assignment{assignment_id} in {course_id}", actor=student_email, course_id=course_id, object_id=assignment_id)
 
     return {"success": True}
 
 
-def get_assignment_submissions(db_cursor, course_id: str, assignment_id: str, user_email: str):
+async def get_assignment_submissions(db_cursor, course_id: str, assignment_id: str, user_email: str):
     # checking constraints
-    constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
-    constraints.assert_teacher_access(db_cursor, user_email, course_id)
+    await constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
 
     # finding students' submissions
-    submissions = repo_submit.sql_select_submissions(db_cursor, course_id, assignment_id)
+    submissions = await repo_submit.sql_select_submissions(db_cursor, course_id, assignment_id)
 
     res = [
         {
@@ -65,7 +82,7 @@ def get_assignment_submissions(db_cursor, course_id: str, assignment_id: str, us
     return res
 
 
-def get_submission(
+async def get_submission(
     db_cursor,
     course_id: str,
     assignment_id: str,
@@ -73,17 +90,17 @@ def get_submission(
     user_email: str,
 ):
     # checking constraints
-    constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
-    constraints.assert_student_access(db_cursor, student_email, course_id)
+    await constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
+    await constraints.assert_student_access(db_cursor, student_email, course_id)
     if not (
-        constraints.check_teacher_access(db_cursor, user_email, course_id)
-        or constraints.check_parent_student_access(db_cursor, user_email, student_email, course_id)
+        await constraints.check_teacher_access(db_cursor, user_email, course_id)
+        or await constraints.check_parent_student_access(db_cursor, user_email, student_email, course_id)
         or student_email == user_email
     ):
         raise HTTPException(status_code=403, detail="User does not have access to this submission")
 
     # finding student's submission
-    submission = repo_submit.sql_select_single_submission(db_cursor, course_id, assignment_id, student_email)
+    submission = await repo_submit.sql_select_single_submission(db_cursor, course_id, assignment_id, student_email)
     if not submission:
         raise HTTPException(status_code=404, detail="Submission of this user is not found")
 
@@ -101,7 +118,7 @@ def get_submission(
     return res
 
 
-def grade_submission(
+async def grade_submission(
     db_conn,
     db_cursor,
     course_id: str,
@@ -111,32 +128,157 @@ def grade_submission(
     user_email: str,
 ):
     # checking constraints
-    constraints.assert_teacher_access(db_cursor, user_email, course_id)
-    constraints.assert_submission_exists(db_cursor, course_id, assignment_id, student_email)
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
+    await constraints.assert_submission_exists(db_cursor, course_id, assignment_id, student_email)
 
-    repo_submit.sql_update_submission_grade(db_cursor, grade, user_email, course_id, assignment_id, student_email)
-    db_conn.commit()
+    grades = await repo_submit.sql_update_submission_grade(db_cursor, grade, user_email, course_id, assignment_id, student_email)
+    if grades is not None:
+        await repo_grading.sql_update_grade_summary(db_cursor, course_id, student_email, *grades)
+    await db_conn.commit()
 
-    logger.log(db_conn, logger.TAG_ASSIGNMENT_GRADE, f"Teacher {user_email} graded an assignment {assignment_id} in {course_id} by {student_email}")
+    await logger.log(logger.TAG_ASSIGNMENT_GRADE, f"Teacher {user_email} graded an assignment {assignment_id} in {course_id} by {student_email}", actor=user_email, course_id=course_id, object_id=assignment_id)
 
     return {"success": True}
 
 
+async def _apply_grades(db_conn, db_cursor, course_id: str, grades: list[tuple[int, str, int, str]], user_email: str):
+    # sets the grades given as (row, student, assignment, grade) and returns the result for every row
+    if len(grades) > MAX_GRADES_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_GRADES_PER_REQUEST} grades can be set at once")
+
+    results = []
+    valid = []
+    seen = set()
+    for row, student_email, assignment_id, grade in grades:
+        result = {"row": row, "student_email": student_email, "assignment_id": assignment_id, "grade": str(grade)}
+        results.append(result)
+        try:
+            grade = int(grade)
+        except ValueError:
+            result.update(status=GRADE_FAILED, detail="Grade should be integer")
+            continue
+        if not MIN_GRADE <= grade <= MAX_GRADE:
+            result.update(status=GRADE_FAILED, detail="Grade is out of range")
+            continue
+        if (student_email, assignment_id) in seen:
+            result.update(status=GRADE_SKIPPED, detail="Duplicate row")
+            continue
+        seen.add((student_email, assignment_id))
+        valid.append((student_email, assignment_id, grade))
+
+    # like `grade_submission`, only the students still enrolled in the course can be graded
+    enrolled = {email for email, exists, is_teacher, is_student, is_parent
+                in await repo_users.sql_select_course_roles(db_cursor, course_id, list({email for email, assignment_id, grade in valid}))
+                if is_student}
+    valid = [(email, assignment_id, grade) for email, assignment_id, grade in valid if email in enrolled]
+
+    submissions = {
+        (email, assignment_id): (old_grade, new_grade, updated)
+        for email, assignment_id, old_grade, new_grade, updated
+        in await repo_submit.sql_update_submission_grades(db_cursor, course_id, valid, user_email)
+    }
+    changes = [(email, old_grade, new_grade)
+               for (email, assignment_id), (old_grade, new_grade, updated) in submissions.items() if updated]
+    await repo_grading.sql_update_grade_summaries(db_cursor, course_id, changes)
+    await db_conn.commit()
+
+    for result in results:
+        if "status" in result:
+            continue
+        submission = submissions.get((result["student_email"], result["assignment_id"]))
+        if result["student_email"] not in enrolled:
+            result.update(status=GRADE_FAILED, detail="Provided user in not a student at this course")
+        elif submission is None:
+            result.update(status=GRADE_FAILED, detail="The given student has not made a submission to this assignment")
+        elif not submission[2]:
+            result.update(status=GRADE_SKIPPED, detail="The submission already has this grade")
+        else:
+            result.update(status=GRADE_GRADED, detail="Graded")
+    return results, len(changes)
+
+
+async def grade_submissions(
+    db_conn,
+    db_cursor,
+    course_id: str,
+    assignment_id: str,
+    grades: list,
+    user_email: str,
+):
+    # checking constraints once for all the grades
+    await constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
+
+    results, graded = await _apply_grades(
+        db_conn,
+        db_cursor,
+        course_id,
+        [(row, entry.student_email, int(assignment_id), entry.grade) for row, entry in enumerate(grades, 1)],
+        user_email,
+    )
+
+    if graded:
+        await logger.log(logger.TAG_ASSIGNMENT_GRADE, f"Teacher {user_email} graded {graded} submissions of assignment {assignment_id} in {course_id}", actor=user_email, course_id=course_id, object_id=assignment_id)
+
+    return results
+
+
+async def import_grade_table_csv(db_conn, db_cursor, course_id: str, file: UploadFile, user_email: str):
+    """
+    Set the grades from a CSV file in the format of `download_full_course_grade_table`.
+
+    Columns after the first two are matched to assignments by title. If several assignments have the same title,
+    the columns with it are matched to them in the order of creation, like in the exported file.
+    Empty cells are ignored, and rows are numbered by lines of the file, the header being line 1.
+    """
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
+    try:
+        text = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Grade table must be encoded in UTF-8")
+    header, lines = logic.csvtables.decode_csv_with_columns(text)
+    if len(header) < 2 or header[0].strip().lower() != "login":
+        raise HTTPException(status_code=400, detail="Grade table must start with Login and Public Name columns")
+
+    assignments_by_title = {}
+    for assignment_id, title in await repo_ass.sql_select_assignment_titles(db_cursor, course_id):
+        assignments_by_title.setdefault(title, []).append(assignment_id)
+    columns = []
+    for title in header[2:]:
+        same_title = assignments_by_title.get(title.strip(), [])
+        if not same_title:
+            raise HTTPException(status_code=400, detail=f"No assignment titled {title.strip()!r} in this course")
+        columns.append(same_title.pop(0))
+
+    grades = [
+        (row, line[0].strip(), assignment_id, cell.strip())
+        for row, line in lines
+        for assignment_id, cell in zip(columns, line[2:])
+        if line[0].strip() and cell.strip()
+    ]
+    results, graded = await _apply_grades(db_conn, db_cursor, course_id, grades, user_email)
+
+    if graded:
+        await logger.log(logger.TAG_ASSIGNMENT_GRADE, f"Teacher {user_email} imported {graded} grades in {course_id}", actor=user_email, course_id=course_id)
+
+    return results
+
+
 async def create_submission_attachment(db_conn, db_cursor, storage_db_conn, storage_db_cursor, course_id: str, assignment_id: str, student_email: str, file: UploadFile, user_email: str):
     # checking constraints
-    constraints.assert_submission_exists(db_cursor, course_id, assignment_id, student_email)
+    await constraints.assert_submission_exists(db_cursor, course_id, assignment_id, student_email)
     if student_email != user_email:
         raise HTTPException(status_code=403, detail="User does not have access to this submission")
 
-    # read the file
-    contents = await careful_upload(file)
+    # store the contents, shared with identical files
+    blob_hash = await careful_upload(storage_db_cursor, file)
 
-    # save the file into database
-    attachment_metadata = repo_submit.sql_insert_submission_attachment(db_cursor, storage_db_cursor, course_id, assignment_id, student_email, file.filename, contents)
-    db_conn.commit()
-    storage_db_conn.commit()
+    # save the attachment metadata; the contents are committed first, so that it never points to a missing file
+    attachment_metadata = await repo_submit.sql_insert_submission_attachment(db_cursor, course_id, assignment_id, student_email, blob_hash, file.filename)
+    await storage_db_conn.commit()
+    await db_conn.commit()
 
-    logger.log(db_conn, logger.TAG_ATTACHMENT_ADD_SUB, f"User {user_email} created an attachment {file.filename} for the submission for the assignment {assignment_id} in course {course_id}")
+    await logger.log(logger.TAG_ATTACHMENT_ADD_SUB, f"User {user_email} created an attachment {file.filename} for the submission for the assignment {assignment_id} in course {course_id}", actor=user_email, course_id=course_id, object_id=attachment_metadata[0])
     return {
         "course_id": course_id,
         "assignment_id": assignment_id,
@@ -147,18 +289,18 @@ async def create_submission_attachment(db_conn, db_cursor, storage_db_conn, stor
     }
 
 
-def get_submission_attachments(db_cursor, course_id: str, assignment_id: str, student_email: str, user_email: str):
+async def get_submission_attachments(db_cursor, course_id: str, assignment_id: str, student_email: str, user_email: str):
     # checking constraints
-    constraints.assert_submission_exists(db_cursor, course_id, assignment_id, student_email)
+    await constraints.assert_submission_exists(db_cursor, course_id, assignment_id, student_email)
     if not (
-        constraints.check_teacher_access(db_cursor, user_email, course_id)
-        or constraints.check_parent_student_access(db_cursor, user_email, student_email, course_id)
+        await constraints.check_teacher_access(db_cursor, user_email, course_id)
+        or await constraints.check_parent_student_access(db_cursor, user_email, student_email, course_id)
         or student_email == user_email
     ):
         raise HTTPException(status_code=403, detail="User does not have access to this submission")
 
     # searching for submission attachments
-    files = repo_submit.sql_select_submission_attachments(db_cursor, course_id, assignment_id, student_email)
+    files = await repo_submit.sql_select_submission_attachments(db_cursor, course_id, assignment_id, student_email)
 
     res = [{
         "course_id": course_id,
@@ -172,24 +314,51 @@ def get_submission_attachments(db_cursor, course_id: str, assignment_id: str, st
     return res
 
 
-def download_submission_attachment(db_cursor, storage_db_cursor, course_id: str, assignment_id: str, student_email: str, file_id: str, user_email: str):
+async def download_submission_attachment(db_cursor, course_id: str, assignment_id: str, student_email: str, file_id: str, range_header: Union[str, None], if_none_match: Union[str, None], user_email: str):
     # checking constraints
-    constraints.assert_submission_exists(db_cursor, course_id, assignment_id, student_email)
+    await constraints.assert_submission_exists(db_cursor, course_id, assignment_id, student_email)
     if not (
-        constraints.check_teacher_access(db_cursor, user_email, course_id)
-        or constraints.check_parent_student_access(db_cursor, user_email, student_email, course_id)
+        await constraints.check_teacher_access(db_cursor, user_email, course_id)
+        or await constraints.check_parent_student_access(db_cursor, user_email, student_email, course_id)
         or student_email == user_email
     ):
         raise HTTPException(status_code=403, detail="User does not have access to this submission")
 
     # searching for submission attachment
-    file = repo_files.sql_download_attachment(storage_db_cursor, file_id)
-    file_metadata = repo_files.sql_select_attachment_metadata(db_cursor, file_id)
-    if (not file or not file_metadata):
+    file_metadata = await repo_submit.sql_select_submission_attachment(db_cursor, course_id, assignment_id, student_email, file_id)
+    if not file_metadata:
         raise HTTPException(status_code=404, detail="Attachment not found")
 
-    return Response(
-        content=file,
-        media_type="application/octet-stream",
-        headers={"Content-Disposition": f'attachment; filename="{file_metadata[1]}"'}
+    return await stream_attachment(file_metadata[1], file_metadata[0], range_header, if_none_match)
+
+
+def _archive_name(name: str) -> str:
+    # a name from the user must not make a path of its own within the archive
+    name = name.replace("/", "_").replace("\\", "_").strip()
+    return name if name not in ("", ".", "..") else "_"
+
+
+async def download_assignment_submissions(db_cursor, course_id: str, assignment_id: str, user_email: str):
+    # checking constraints
+    await constraints.assert_assignment_exists(db_cursor, course_id, assignment_id)
+    await constraints.assert_teacher_access(db_cursor, user_email, course_id)
+
+    # every student gets a directory, and repeated filenames are numbered
+    entries = []
+    taken = set()
+    for email, filename, blob_hash, upload_time in await repo_submit.sql_select_assignment_submission_attachments(db_cursor, course_id, assignment_id):
+        directory, filename = _archive_name(email), _archive_name(filename)
+        name = f"{directory}/{filename}"
+        stem, dot, extension = filename.rpartition(".")
+        copy = 1
+        while name in taken:
+            copy += 1
+            name = f"{directory}/{stem} ({copy}).{extension}" if stem else f"{directory}/{filename} ({copy})"
+        taken.add(name)
+        entries.append((name, blob_hash, upload_time))
+
+    return StreamingResponse(
+        stream_zip(entries),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="assignment_{assignment_id}_submissions.zip"'},
     )
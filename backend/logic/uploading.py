@@ -1,23 +1,83 @@
+import hashlib
 from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
 
-MAX_SIZE = 5 * 1024 * 1024
+from blobstorage import get_backend
+import repo.files as repo_files
+
+MAX_SIZE = 50 * 1024 * 1024
 CHUNK_SIZE = 64 * 1024
 
-async def careful_upload(file: UploadFile):
+# room for the multipart boundaries, part headers and the filename around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def _too_large():
+    return HTTPException(status_code=413, detail=f"File too large (max {MAX_SIZE} bytes)")
+
+
+async def _read_chunks(file: UploadFile):
     total_size = 0
-    chunks = []
     while True:
         chunk = await file.read(CHUNK_SIZE)
         if not chunk:
             break
-        
+
         total_size += len(chunk)
         if total_size > MAX_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File too large (max {MAX_SIZE} bytes)"
-            )
-        chunks.append(chunk)
-
-    file_data = b''.join(chunks)
-    return file_data
+            raise _too_large()
+        yield chunk
+
+
+async def careful_upload(storage_db_cursor, file: UploadFile) -> bytes:
+    """
+    Store the file contents in the storage and return their SHA-256 hash, which identifies the blob.
+
+    The spooled file is hashed first, and the contents are written chunk by chunk only if no
+    identical blob exists yet, so at most one chunk of the file is held in memory. The contents of an
+    existing blob are written again if they are missing from its backend. If the file
+    turns out to be too large, 413 is raised and the caller's storage transaction is rolled back.
+    """
+    if file.size is not None and file.size > MAX_SIZE:
+        raise _too_large()
+
+    digest = hashlib.sha256()
+    size = 0
+    async for chunk in _read_chunks(file):
+        digest.update(chunk)
+        size += len(chunk)
+    blob_hash = digest.digest()
+
+    is_new, backend_name = await repo_files.sql_reference_blob(storage_db_cursor, blob_hash, size, get_backend().name)
+    backend = get_backend(backend_name)
+    # contents can be missing if the garbage collector deleted them, but failed to delete the row
+    if is_new or not await backend.exists(storage_db_cursor, blob_hash, size):
+        await file.seek(0)
+        await backend.write(storage_db_cursor, blob_hash, _read_chunks(file))
+    return blob_hash
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject multipart requests that declare a body larger than any allowed upload,
+    before the body is received and spooled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self._declared_too_large(dict(scope["headers"])):
+            response = JSONResponse(status_code=413, content={"detail": _too_large().detail})
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _declared_too_large(headers) -> bool:
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            return False
+        try:
+            return int(headers.get(b"content-length", b"")) > MAX_SIZE + MULTIPART_OVERHEAD
+        except ValueError:
+            return False
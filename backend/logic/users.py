@@ -1,33 +1,34 @@
 from fastapi import HTTPException
-from datetime import datetime, timedelta
-from jose import jwt
 import constraints
-from auth import pwd_hasher, ACCESS_TOKEN_EXPIRE_MINUTES, SECRET_KEY, ALGORITHM
+from auth import create_access_token, invalidate_user
+from hashing import hash_password, verify_password
+import repo.courses as repo_courses
 import repo.users as repo_users
 from regex import match, search
 import logic.logging as logger
+import logic.purging
 
 
-def get_user_info(db_cursor, user_email: str):
+async def get_user_info(db_cursor, user_email: str):
     return {
         "email": user_email,
-        "name": repo_users.sql_get_user_name(db_cursor, user_email),
+        "name": await repo_users.sql_get_user_name(db_cursor, user_email),
     }
 
 
-def get_user_role(db_cursor, course_id: str, user_email: str):
+async def get_user_role(db_cursor, course_id: str, user_email: str):
     # getting info about the roles
     res = {
-        "is_teacher": constraints.check_teacher_access(db_cursor, user_email, course_id),
-        "is_student": constraints.check_student_access(db_cursor, user_email, course_id),
-        "is_parent": constraints.check_parent_access(db_cursor, user_email, course_id),
-        "is_admin": constraints.check_admin_access(db_cursor, user_email)
+        "is_teacher": await constraints.check_teacher_access(db_cursor, user_email, course_id),
+        "is_student": await constraints.check_student_access(db_cursor, user_email, course_id),
+        "is_parent": await constraints.check_parent_access(db_cursor, user_email, course_id),
+        "is_admin": await constraints.check_admin_access(db_cursor, user_email)
     }
 
     return res
 
 
-def create_user(db_conn, db_cursor, user):
+async def create_user(db_conn, db_cursor, user):
 
     # validation of email format
     pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
@@ -48,31 +49,35 @@ def create_user(db_conn, db_cursor, user):
     ):
         raise HTTPException(status_code=400, detail="Password is too weak")
 
+    # a removed user keeps the email until purged, so that purge is finished first
+    if await repo_users.sql_select_user_deleted(db_cursor, user.email):
+        await logic.purging.purge_user(user.email)
+
     # checking whether such user exists
-    user_exists = repo_users.sql_select_user_exists(db_cursor, user.email)
+    user_exists = await repo_users.sql_select_user_exists(db_cursor, user.email)
     if user_exists:
         raise HTTPException(status_code=400, detail="User already exists")
 
     # hashing password
-    hashed_password = pwd_hasher.hash(user.password)
-    repo_users.sql_insert_user(db_cursor, user.email, user.name, hashed_password)
-    db_conn.commit()
+    hashed_password = await hash_password(user.password)
+    await repo_users.sql_insert_user(db_cursor, user.email, user.name, hashed_password)
+    await db_conn.commit()
 
     # giving access_token
-    data = {
-        "email": user.email,
-        "exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
-    }
-    access_token = jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
+    access_token = await create_access_token(user.email)
 
-    logger.log(db_conn, logger.TAG_USER_ADD, f"Created new user: {user.email}")
+    await logger.log(logger.TAG_USER_ADD, f"Created new user: {user.email}", actor=user.email, object_id=user.email)
 
     return {"email": user.email, "access_token": access_token}
 
 
-def login(db_cursor, user):
+async def login(db_cursor, user):
+
+    result = await repo_users.sql_select_passwordhash(db_cursor, user.email)
 
-    result = repo_users.sql_select_passwordhash(db_cursor, user.email)
+    # a removed user keeps the email until purged, so that purge is finished first
+    if await repo_users.sql_select_user_deleted(db_cursor, user.email):
+        await logic.purging.purge_user(user.email)
 
     # checking whether such user exists
     if not result:
@@ -80,22 +85,22 @@ def login(db_cursor, user):
 
     # checking password
     hashed_password = result[0]
-    if not pwd_hasher.verify(user.password, hashed_password):
+    if not await verify_password(user.password, hashed_password):
         raise HTTPException(status_code=401, detail="Invalid password")
 
     # giving access token
-    data = {
-        "email": user.email,
-        "exp": datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES),
-    }
-    access_token = jwt.encode(data, SECRET_KEY, algorithm=ALGORITHM)
+    access_token = await create_access_token(user.email)
 
     return {"email": user.email, "access_token": access_token}
 
 
-def change_password(db_conn, db_cursor, user):
+async def change_password(db_conn, db_cursor, user):
+
+    result = await repo_users.sql_select_passwordhash(db_cursor, user.email)
 
-    result = repo_users.sql_select_passwordhash(db_cursor, user.email)
+    # a removed user keeps the email until purged, so that purge is finished first
+    if await repo_users.sql_select_user_deleted(db_cursor, user.email):
+        await logic.purging.purge_user(user.email)
 
     # checking whether such user exists
     if not result:
@@ -103,84 +108,88 @@ def change_password(db_conn, db_cursor, user):
 
     # checking password
     hashed_password = result[0]
-    if not pwd_hasher.verify(user.password, hashed_password):
+    if not await verify_password(user.password, hashed_password):
         raise HTTPException(status_code=401, detail="Invalid password")
 
     # changing the password to a new one
-    hashed_new_password = pwd_hasher.hash(user.new_password)
-    repo_users.sql_update_password(db_cursor, user.email, hashed_new_password)
-    db_conn.commit()
+    hashed_new_password = await hash_password(user.new_password)
+    await repo_users.sql_update_password(db_cursor, user.email, hashed_new_password)
+    await db_conn.commit()
 
-    logger.log(db_conn, logger.TAG_USER_CHPW, f"User {user.email} changed their password")
+    await logger.log(logger.TAG_USER_CHPW, f"User {user.email} changed their password", actor=user.email, object_id=user.email)
 
     return {"success": True}
 
 
-def remove_user(db_conn, db_cursor, user_email: str):
+async def remove_user(db_conn, db_cursor, user_email: str):
 
     # checking constraints
-    constraints.assert_user_exists(db_cursor, user_email)
-    if constraints.check_admin_access(db_cursor, user_email) and repo_users.sql_count_admins(db_cursor) == 1:
+    await constraints.assert_user_exists(db_cursor, user_email)
+    if await constraints.check_admin_access(db_cursor, user_email) and await repo_users.sql_count_admins(db_cursor) == 1:
         raise HTTPException(status_code=403, detail="Cannot remove the last administrator")
 
     # remove teacher role preparation: find courses with 1 teacher left
-    single_teacher_courses = repo_users.sql_select_single_teacher_courses(db_cursor, user_email)
-    for course_id_to_delete in single_teacher_courses:
-        repo_users.sql_delete_course(db_cursor, course_id_to_delete)
+    single_teacher_courses = await repo_users.sql_select_single_teacher_courses(db_cursor, user_email)
+    await repo_courses.sql_mark_courses_deleted(db_cursor, single_teacher_courses)
 
-    # remove user
-    repo_users.sql_delete_user(db_cursor, user_email)
+    # remove user: the user leaves the courses at once, everything else is purged in the background
+    await repo_users.sql_delete_user_memberships(db_cursor, user_email)
+    await repo_users.sql_mark_user_deleted(db_cursor, user_email)
 
-    db_conn.commit()
+    await db_conn.commit()
+    invalidate_user(user_email)
+    logic.purging.schedule_purge()
 
-    logger.log(db_conn, logger.TAG_USER_DEL, f"Removed user {user_email} from the system")
+    await logger.log(logger.TAG_USER_DEL, f"Removed user {user_email} from the system", actor=user_email, object_id=user_email)
 
     return {"success": True}
 
 
-def create_admin_account(db_conn, db_cursor):
-    repo_users.sql_insert_user(db_cursor, 'admin', 'admin', pwd_hasher.hash('admin'))
-    repo_users.sql_give_admin_permissions(db_cursor, 'admin')
-    db_conn.commit()
+async def create_admin_account(db_conn, db_cursor):
+    await repo_users.sql_insert_user(db_cursor, 'admin', 'admin', await hash_password('admin'))
+    await repo_users.sql_give_admin_permissions(db_cursor, 'admin')
+    await db_conn.commit()
 
-    logger.log(db_conn, logger.TAG_USER_ADD, "Created new user: admin")
-    logger.log(db_conn, logger.TAG_ADMIN_ADD, "Added admin privileges to user: admin")
+    await logger.log(logger.TAG_USER_ADD, "Created new user: admin", object_id="admin")
+    await logger.log(logger.TAG_ADMIN_ADD, "Added admin privileges to user: admin", object_id="admin")
 
 
-def give_admin_permissions(db_conn, db_cursor, object_email: str, subject_email: str):
+async def give_admin_permissions(db_conn, db_cursor, object_email: str, subject_email: str):
 
     # checking constraints
-    constraints.assert_admin_access(db_cursor, subject_email)
-    constraints.assert_user_exists(db_cursor, object_email)
+    await constraints.assert_admin_access(db_cursor, subject_email)
+    await constraints.assert_user_exists(db_cursor, object_email)
 
-    repo_users.sql_give_admin_permissions(db_cursor, object_email)
-    db_conn.commit()
+    await repo_users.sql_give_admin_permissions(db_cursor, object_email)
+    await db_conn.commit()
 
-    logger.log(db_conn, logger.TAG_ADMIN_ADD, f"Added admin privileges to user: {object_email}")
+    await logger.log(logger.TAG_ADMIN_ADD, f"Added admin privileges to user: {object_email}", actor=subject_email, object_id=object_email)
 
     return {"success": True}
 
 
-def get_all_users(db_cursor, user_email: str):
+async def get_all_users(db_cursor, user_email: str):
     # checking constraints
-    constraints.assert_admin_access(db_cursor, user_email)
+    await constraints.assert_admin_access(db_cursor, user_email)
 
     # finding all users
-    users = repo_users.sql_select_all_users(db_cursor)
+    users = await repo_users.sql_select_all_users(db_cursor)
 
     res = [{"email": u[0], "name": u[1]} for u in users]
     return res
 
 
-def get_admins(db_cursor):
-    users = repo_users.sql_select_admins(db_cursor)
+async def get_admins(db_cursor):
+    users = await repo_users.sql_select_admins(db_cursor)
     res = [{"email": u[0], "name": u[1]} for u in users]
     return res
 
 
-# create an initial admin account
+# create an initial admin account; with several workers starting at once,
+# the lock makes the others wait and then see the account created by the first one
 async def create_admin_account_if_not_exists(db_conn, db_cursor):
-    if repo_users.sql_admins_exist(db_cursor):
+    await repo_users.sql_lock_admin_creation(db_cursor)
+    if await repo_users.sql_admins_exist(db_cursor):
         return
-    create_admin_account(db_conn, db_cursor)
+    await create_admin_account(db_conn, db_cursor)
     print(f"\nAdmin account created\nlogin: admin\npassword: admin\n")
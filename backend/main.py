@@ -1,13 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import logic.users
-from auth import get_db
+from logic.logging import start_log_writer, stop_log_writer
+from logic.maintenance import start_maintenance, stop_maintenance
+from auth import get_db, open_databases, close_databases, rotate_signing_keys
+from hashing import shutdown_hashing
+from logic.uploading import UploadSizeLimitMiddleware
 
 import routers.assignments
 import routers.submissions
 import routers.courses
+import routers.logs
 import routers.materials
 import routers.parents
+import routers.storage
 import routers.students
 import routers.teachers
 import routers.users
@@ -35,12 +41,15 @@ app = FastAPI(
 app.include_router(routers.assignments.router)
 app.include_router(routers.submissions.router)
 app.include_router(routers.courses.router)
+app.include_router(routers.logs.router)
 app.include_router(routers.materials.router)
 app.include_router(routers.parents.router)
+app.include_router(routers.storage.router)
 app.include_router(routers.students.router)
 app.include_router(routers.teachers.router)
 app.include_router(routers.users.router)
 
+app.add_middleware(UploadSizeLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -53,5 +62,18 @@ app.add_middleware(
 # app startup
 @app.on_event("startup")
 async def startup_event():
-    with get_db() as (conn, cur):
+    await open_databases()
+    await start_maintenance()
+    start_log_writer()
+    await rotate_signing_keys()
+    async with get_db() as (conn, cur):
         await logic.users.create_admin_account_if_not_exists(conn, cur)
+
+
+# app shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    await stop_maintenance()
+    await stop_log_writer()
+    await close_databases()
+    shutdown_hashing()
@@ -0,0 +1,62 @@
+"""
+Move the contents of blobs from one storage backend to another:
+
+    python migrate_storage.py postgres filesystem
+
+Blobs are moved one by one, each in its own transaction, and every download reads a blob
+from the backend recorded for it, so the app can keep running during the migration.
+Set STORAGE_BACKEND to the target backend as well, so that new uploads go there.
+"""
+import argparse
+import asyncio
+
+from auth import get_storage_db, open_databases, close_databases
+from blobstorage import BACKENDS
+import repo.files as repo_files
+
+BATCH_SIZE = 100
+
+
+async def migrate(source_name: str, target_name: str):
+    source, target = BACKENDS[source_name], BACKENDS[target_name]
+    moved_blobs = moved_bytes = 0
+    while True:
+        async with get_storage_db() as (storage_db_conn, storage_db_cursor):
+            blobs = await repo_files.sql_select_blobs_at_backend(storage_db_cursor, source.name, BATCH_SIZE)
+        if not blobs:
+            break
+
+        for blob_hash, size in blobs:
+            # the blob is locked while it is copied, so that it cannot be moved twice
+            async with get_storage_db() as (storage_db_conn, storage_db_cursor):
+                if not await repo_files.sql_lock_blob_at_backend(storage_db_cursor, blob_hash, source.name):
+                    continue
+                await target.write(storage_db_cursor, blob_hash, source.read(blob_hash, 0, size - 1))
+                await repo_files.sql_update_blob_backend(storage_db_cursor, blob_hash, target.name)
+
+            # the old copy is removed only after the new one is committed
+            async with get_storage_db() as (storage_db_conn, storage_db_cursor):
+                await source.delete(storage_db_cursor, blob_hash)
+
+            moved_blobs += 1
+            moved_bytes += size
+        print(f"Moved {moved_blobs} blobs, {moved_bytes} bytes")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Move attachment contents between storage backends")
+    parser.add_argument("source", choices=BACKENDS)
+    parser.add_argument("target", choices=BACKENDS)
+    args = parser.parse_args()
+    if args.source == args.target:
+        parser.error("source and target backends must differ")
+
+    await open_databases()
+    try:
+        await migrate(args.source, args.target)
+    finally:
+        await close_databases()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,67 +1,79 @@
-def sql_insert_assignment(db_cursor, course_id, title, description, user_email):
-    db_cursor.execute(
+async def sql_insert_assignment(db_cursor, course_id, title, description, user_email):
+    await db_cursor.execute(
         "INSERT INTO course_assignments (courseid, name, description, timeadded, author) VALUES (%s, %s, %s, now(), %s) RETURNING assid",
         (course_id, title, description, user_email),
     )
-    return db_cursor.fetchone()[0]
+    return (await db_cursor.fetchone())[0]
 
 
-def sql_delete_assignment(db_cursor, course_id, assignment_id):
-    db_cursor.execute(
+async def sql_delete_assignment(db_cursor, course_id, assignment_id):
+    await db_cursor.execute(
         "DELETE FROM course_assignments WHERE courseid = %s AND assid = %s",
         (course_id, assignment_id),
     )
 
 
-def sql_select_assignment(db_cursor, course_id, assignment_id):
-    db_cursor.execute(
+async def sql_select_assignment(db_cursor, course_id, assignment_id):
+    # an author removed from the system is hidden until the purge clears it
+    await db_cursor.execute(
         """
-        SELECT courseid, assid, timeadded, name, description, author
+        SELECT courseid, assid, timeadded, name, description,
+               CASE WHEN EXISTS (SELECT 1 FROM users WHERE users.email = course_assignments.author AND users.deleted IS NULL)
+                    THEN author END
         FROM course_assignments
         WHERE courseid = %s AND assid = %s
         """,
         (course_id, assignment_id),
     )
-    return db_cursor.fetchone()
+    return await db_cursor.fetchone()
 
 
-def sql_insert_assignment_attachment(db_cursor, storage_db_cursor, course_id, assignment_id, filename, contents):
-    storage_db_cursor.execute(
+async def sql_insert_assignment_attachment(db_cursor, course_id, assignment_id, blob_hash, filename):
+    await db_cursor.execute(
         """
-        INSERT INTO files 
-        (id, content)
-        VALUES (gen_random_uuid(), %s)
-        RETURNING id
+        INSERT INTO files
+        (fileid, courseid, assid, blobhash, filename, uploadtime)
+        VALUES (gen_random_uuid(), %s, %s, %s, %s, now())
+        RETURNING fileid, uploadtime
         """,
-        (contents, )
+        (course_id, assignment_id, blob_hash, filename),
     )
-    fileid = storage_db_cursor.fetchone()[0]
+    return await db_cursor.fetchone()
+
 
-    db_cursor.execute(
+async def sql_select_assignment_attachments(db_cursor, course_id, assignment_id):
+    await db_cursor.execute(
         """
-        INSERT INTO assignment_files 
-        (courseid, assid, fileid, filename, uploadtime)
-        VALUES (%s, %s, %s, %s, now())
-        RETURNING fileid, uploadtime
+        SELECT fileid, filename, uploadtime
+        FROM files
+        WHERE courseid = %s AND assid = %s AND email IS NULL
         """,
-        (course_id, assignment_id, fileid, filename),
+        (course_id, assignment_id),
     )
-    return db_cursor.fetchone()
+    return await db_cursor.fetchall()
 
 
-def sql_select_assignment_attachments(db_cursor, course_id, assignment_id):
-    db_cursor.execute(
+async def sql_select_assignment_attachment(db_cursor, course_id, assignment_id, file_id):
+    await db_cursor.execute(
         """
-        SELECT fileid, filename, uploadtime
-        FROM assignment_files
-        WHERE courseid = %s AND assid = %s
+        SELECT filename, blobhash
+        FROM files
+        WHERE fileid = %s AND courseid = %s AND assid = %s AND email IS NULL
         """,
-        (course_id, assignment_id),
+        (file_id, course_id, assignment_id),
     )
-    return db_cursor.fetchall()
+    return await db_cursor.fetchone()
 
 
-def sql_get_all_assignments(db_cursor, course_id: str) -> list[int]:
-    db_cursor.execute("SELECT assid FROM course_assignments WHERE courseid = %s",
+async def sql_get_all_assignments(db_cursor, course_id: str) -> list[int]:
+    await db_cursor.execute("SELECT assid FROM course_assignments WHERE courseid = %s",
                       (course_id,))
-    return [i[0] for i in db_cursor.fetchall()]
+    return [i[0] for i in await db_cursor.fetchall()]
+
+
+async def sql_select_assignment_titles(db_cursor, course_id: str) -> list[tuple[int, str]]:
+    await db_cursor.execute(
+        "SELECT assid, name FROM course_assignments WHERE courseid = %s ORDER BY timeadded, assid",
+        (course_id,),
+    )
+    return await db_cursor.fetchall()
@@ -1,72 +1,195 @@
 from typing import Union
+from psycopg import sql
 
+import constraints
 
-def sql_select_available_courses(db_cursor, user_email):
-    db_cursor.execute(
+# rows fetched from the server at once while streaming the grade table
+GRADE_TABLE_FETCH_SIZE = 500
+
+
+async def sql_select_available_courses(db_cursor, user_email):
+    await db_cursor.execute(
         """
-        SELECT courseid AS cid FROM teaches WHERE email = %s
-        UNION
-        SELECT courseid AS cid FROM student_at WHERE email = %s
-        UNION
-        SELECT courseid AS cid FROM parent_of_at_course WHERE parentemail = %s
+        SELECT m.cid FROM (
+            SELECT courseid AS cid FROM teaches WHERE email = %s
+            UNION
+            SELECT courseid AS cid FROM student_at WHERE email = %s
+            UNION
+            SELECT courseid AS cid FROM parent_of_at_course WHERE parentemail = %s
+        ) m
+        JOIN courses c ON c.courseid = m.cid
+        WHERE c.deleted IS NULL
         """,
         (user_email, user_email, user_email),
     )
-    return db_cursor.fetchall()
+    return await db_cursor.fetchall()
+
+
+async def sql_select_courses_dashboard(db_cursor, user_email, memberships_only=False):
+    # admins see every course unless `memberships_only`, other users only the ones they are members of
+    await db_cursor.execute(
+        """
+        WITH me AS (
+            SELECT COALESCE(bool_or(isadmin), FALSE) AS isadmin FROM users WHERE email = %(email)s
+        ),
+        memberships AS (
+            SELECT courseid, TRUE AS t, FALSE AS s, FALSE AS p FROM teaches WHERE email = %(email)s
+            UNION ALL
+            SELECT courseid, FALSE, TRUE, FALSE FROM student_at WHERE email = %(email)s
+            UNION ALL
+            SELECT DISTINCT courseid, FALSE, FALSE, TRUE FROM parent_of_at_course WHERE parentemail = %(email)s
+        ),
+        roles AS (
+            SELECT courseid, bool_or(t) AS is_teacher, bool_or(s) AS is_student, bool_or(p) AS is_parent
+            FROM memberships
+            GROUP BY courseid
+        ),
+        visible AS (
+            SELECT c.courseid, c.name, c.timecreated,
+                COALESCE(r.is_teacher, FALSE) AS is_teacher,
+                COALESCE(r.is_student, FALSE) AS is_student,
+                COALESCE(r.is_parent, FALSE) AS is_parent,
+                me.isadmin
+            FROM courses c
+            CROSS JOIN me
+            LEFT JOIN roles r ON r.courseid = c.courseid
+            WHERE c.deleted IS NULL AND ((me.isadmin AND NOT %(memberships_only)s) OR r.courseid IS NOT NULL)
+        ),
+        student_counts AS (
+            SELECT sa.courseid, COUNT(*) AS student_count
+            FROM student_at sa
+            JOIN visible v ON v.courseid = sa.courseid
+            GROUP BY sa.courseid
+        )
+        SELECT v.courseid, v.name, v.timecreated, COALESCE(sc.student_count, 0),
+            v.is_teacher, v.is_student, v.is_parent, v.isadmin
+        FROM visible v
+        LEFT JOIN student_counts sc ON sc.courseid = v.courseid
+        ORDER BY v.timecreated DESC, v.courseid
+        """,
+        {"email": user_email, "memberships_only": memberships_only},
+    )
+    return await db_cursor.fetchall()
 
 
-def sql_select_all_courses(db_cursor):
-    db_cursor.execute("SELECT courseid FROM courses")
-    return db_cursor.fetchall()
+async def sql_select_all_courses(db_cursor):
+    await db_cursor.execute("SELECT courseid FROM courses WHERE deleted IS NULL")
+    return await db_cursor.fetchall()
 
 
-def sql_insert_course(db_cursor, title):
-    db_cursor.execute(
+async def sql_insert_course(db_cursor, title):
+    await db_cursor.execute(
         "INSERT INTO courses (courseid, name, timecreated) VALUES (gen_random_uuid(), %s, now()) RETURNING courseid",
         (title,),
     )
-    return db_cursor.fetchone()[0]
+    constraints.forget_roles(db_cursor)
+    return (await db_cursor.fetchone())[0]
 
 
-def sql_delete_course(db_cursor, course_id):
-    db_cursor.execute("DELETE FROM courses WHERE courseid = %s", (course_id,))
+async def sql_mark_courses_deleted(db_cursor, course_ids: list[str]):
+    await db_cursor.execute(
+        "UPDATE courses SET deleted = now() WHERE courseid = ANY(%s::uuid[]) AND deleted IS NULL", (course_ids,)
+    )
+    constraints.forget_roles(db_cursor)
 
 
-def sql_select_course_info(db_cursor, course_id):
-    db_cursor.execute(
+async def sql_select_course_info(db_cursor, course_id):
+    await db_cursor.execute(
         """
         SELECT c.courseid, c.name, c.timecreated, COUNT(sa.email) AS student_count
         FROM courses c
         LEFT JOIN student_at sa ON c.courseid = sa.courseid
-        WHERE c.courseid = %s
+        WHERE c.courseid = %s AND c.deleted IS NULL
         GROUP BY c.courseid
         """,
         (course_id,),
     )
-    return db_cursor.fetchone()
-
-
-def sql_select_course_feed(db_cursor, course_id):
-    db_cursor.execute(
+    return await db_cursor.fetchone()
+
+
+def _feed_page_condition(post_type, id_column, after):
+    # posts are ordered by timeadded descending, then 'ass' before 'mat', then by id descending
+    if after is None:
+        return sql.SQL("TRUE"), []
+    after_time, after_type, after_id = after
+    if post_type == after_type:
+        return sql.SQL("(timeadded, {}) < (%s, %s)").format(sql.Identifier(id_column)), [after_time, after_id]
+    if post_type > after_type:
+        return sql.SQL("timeadded <= %s"), [after_time]
+    return sql.SQL("timeadded < %s"), [after_time]
+
+
+def _course_feed_page(course_id, after, limit):
+    # every part takes at most `limit` posts following `after` from its (courseid, timeadded, id) index
+    # authors removed from the system are hidden until their purge clears them
+    mat_condition, mat_params = _feed_page_condition("mat", "matid", after)
+    ass_condition, ass_params = _feed_page_condition("ass", "assid", after)
+    query = sql.SQL(
         """
-        SELECT courseid AS cid, matid as postid, 'mat' as type, timeadded, author
+        (SELECT courseid AS cid, matid as postid, 'mat' as type, timeadded,
+                CASE WHEN EXISTS (SELECT 1 FROM users WHERE users.email = course_materials.author AND users.deleted IS NULL)
+                     THEN author END AS author,
+                name, description
         FROM course_materials
-        WHERE courseid = %s
+        WHERE courseid = %s AND {}
+        ORDER BY timeadded DESC, matid DESC
+        LIMIT %s)
 
-        UNION
+        UNION ALL
 
-        SELECT courseid AS cid, assid as postid, 'ass' as type, timeadded, author
+        (SELECT courseid AS cid, assid as postid, 'ass' as type, timeadded,
+                CASE WHEN EXISTS (SELECT 1 FROM users WHERE users.email = course_assignments.author AND users.deleted IS NULL)
+                     THEN author END AS author,
+                name, description
         FROM course_assignments
-        WHERE courseid = %s
+        WHERE courseid = %s AND {}
+        ORDER BY timeadded DESC, assid DESC
+        LIMIT %s)
 
-        ORDER BY timeadded DESC
+        ORDER BY timeadded DESC, type, postid DESC
+        LIMIT %s
+        """
+    ).format(mat_condition, ass_condition)
+    return query, (course_id, *mat_params, limit, course_id, *ass_params, limit, limit)
+
+
+async def sql_select_course_feed(db_cursor, course_id, after=None, limit=None):
+    query, params = _course_feed_page(course_id, after, limit)
+    await db_cursor.execute(query, params)
+    return await db_cursor.fetchall()
+
+
+async def sql_select_course_feed_expanded(db_cursor, course_id, after=None, limit=None):
+    page, params = _course_feed_page(course_id, after, limit)
+    await db_cursor.execute(
+        sql.SQL(
+            """
+            SELECT page.cid, page.postid, page.type, page.timeadded, page.author,
+                   page.name, page.description, users.publicname
+            FROM ({}) AS page
+            LEFT JOIN users ON users.email = page.author AND users.deleted IS NULL
+            ORDER BY page.timeadded DESC, page.type, page.postid DESC
+            """
+        ).format(page),
+        params,
+    )
+    return await db_cursor.fetchall()
+
+
+async def sql_select_feed_attachments(db_cursor, course_id, material_ids, assignment_ids):
+    await db_cursor.execute(
+        """
+        SELECT matid, assid, fileid, filename, uploadtime
+        FROM files
+        WHERE courseid = %s AND email IS NULL AND (matid = ANY(%s) OR assid = ANY(%s))
+        ORDER BY uploadtime
         """,
-        (course_id, course_id),
+        (course_id, material_ids, assignment_ids),
     )
-    return db_cursor.fetchall()
+    return await db_cursor.fetchall()
 
 
-def sql_select_grades_in_course(db_cursor, course_id: str,
+async def sql_select_grades_in_course(db_cursor, course_id: str,
                                 students: Union[list[str], None] = None,
                                 assignments: Union[list[int], None] = None) -> list[tuple[str, int, Union[int, None]]]:
     if students is not None and len(students) == 0:
@@ -76,10 +199,42 @@ def sql_select_grades_in_course(db_cursor, course_id: str,
     query = "SELECT email, assid, grade FROM course_assignments_submissions WHERE courseid = %s"
     qargs = [course_id]
     if students is not None:
-        query += " AND email in %s"
-        qargs.append(tuple(students))
+        query += " AND email = ANY(%s)"
+        qargs.append(list(students))
     if assignments is not None:
-        query += " AND assid in %s"
-        qargs.append(tuple(assignments))
-    db_cursor.execute(query, tuple(qargs))
-    return db_cursor.fetchall()
+        query += " AND assid = ANY(%s)"
+        qargs.append(list(assignments))
+    await db_cursor.execute(query, tuple(qargs))
+    return await db_cursor.fetchall()
+
+
+async def sql_stream_grade_table(db_conn, course_id: str, assignments: list[int],
+                                 students: Union[list[str], None] = None):
+    """
+    Iterate over (email, publicname, grades) of the students of the course, ordered by email,
+    where `grades` are aligned with `assignments` and None where there is no grade.
+
+    Rows are read through a server-side cursor, so the table is never loaded at once.
+    With `students` being None, all enrolled students are included.
+    """
+    async with db_conn.cursor(name="grade_table") as cursor:
+        cursor.itersize = GRADE_TABLE_FETCH_SIZE
+        await cursor.execute(
+            """
+            SELECT sa.email, u.publicname,
+                ARRAY(
+                    SELECT cas.grade
+                    FROM unnest(%(assignments)s::int[]) WITH ORDINALITY AS a(assid, pos)
+                    LEFT JOIN course_assignments_submissions cas
+                        ON cas.courseid = sa.courseid AND cas.assid = a.assid AND cas.email = sa.email
+                    ORDER BY a.pos
+                )
+            FROM student_at sa
+            JOIN users u ON u.email = sa.email
+            WHERE sa.courseid = %(course)s AND (%(students)s::text[] IS NULL OR sa.email = ANY(%(students)s::text[]))
+            ORDER BY sa.email
+            """,
+            {"course": course_id, "assignments": assignments, "students": students},
+        )
+        async for row in cursor:
+            yield row
@@ -1,14 +1,158 @@
-def sql_download_attachment(storage_db_cursor, file_id):
-    storage_db_cursor.execute("SELECT content FROM files WHERE id = %s", (file_id, ))
-    return storage_db_cursor.fetchone()[0]
-
-
-def sql_select_attachment_metadata(db_cursor, file_id):
-    db_cursor.execute("""
-                      (SELECT fileid, filename, uploadtime FROM material_files WHERE fileid = %s)
-                      UNION
-                      (SELECT fileid, filename, uploadtime FROM assignment_files WHERE fileid = %s)
-                      UNION
-                      (SELECT fileid, filename, uploadtime FROM submissions_files WHERE fileid = %s)
-                      """, (file_id, file_id, file_id))
-    return db_cursor.fetchone()
+async def sql_reference_blob(storage_db_cursor, blob_hash, size, backend):
+    # returns whether the blob is new and its contents have to be written, and the backend holding them;
+    # an upload of the same contents in progress makes this wait for its outcome instead of conflicting
+    await storage_db_cursor.execute(
+        """
+        INSERT INTO blobs (hash, size, refcount, backend) VALUES (%s, %s, 1, %s)
+        ON CONFLICT (hash) DO UPDATE SET refcount = blobs.refcount + 1, referenced = now()
+        RETURNING xmax = 0, backend
+        """,
+        (blob_hash, size, backend),
+    )
+    return await storage_db_cursor.fetchone()
+
+
+async def sql_insert_blob_chunks(storage_db_cursor, blob_hash, chunks):
+    # a single COPY streams all the chunks without a round trip per chunk
+    pos = 0
+    async with storage_db_cursor.copy("COPY blob_chunks (hash, pos, data) FROM STDIN (FORMAT BINARY)") as copy:
+        copy.set_types(["bytea", "int8", "bytea"])
+        async for chunk in chunks:
+            await copy.write_row((blob_hash, pos, chunk))
+            pos += len(chunk)
+    return pos
+
+
+async def sql_select_blob(storage_db_cursor, blob_hash):
+    await storage_db_cursor.execute("SELECT size, backend FROM blobs WHERE hash = %s", (blob_hash, ))
+    return await storage_db_cursor.fetchone()
+
+
+async def sql_select_blobs(storage_db_cursor, blob_hashes: list[bytes]):
+    await storage_db_cursor.execute("SELECT hash, size, backend FROM blobs WHERE hash = ANY(%s)", (blob_hashes, ))
+    return await storage_db_cursor.fetchall()
+
+
+async def sql_select_blobs_at_backend(storage_db_cursor, backend, limit):
+    await storage_db_cursor.execute("SELECT hash, size FROM blobs WHERE backend = %s LIMIT %s", (backend, limit))
+    return await storage_db_cursor.fetchall()
+
+
+async def sql_lock_blob_at_backend(storage_db_cursor, blob_hash, backend):
+    # returns whether the blob is still at the backend; it stays locked until the end of the transaction
+    await storage_db_cursor.execute(
+        "SELECT 1 FROM blobs WHERE hash = %s AND backend = %s FOR UPDATE", (blob_hash, backend)
+    )
+    return await storage_db_cursor.fetchone() is not None
+
+
+async def sql_update_blob_backend(storage_db_cursor, blob_hash, backend):
+    await storage_db_cursor.execute("UPDATE blobs SET backend = %s WHERE hash = %s", (backend, blob_hash))
+
+
+async def sql_select_blob_chunks(storage_db_cursor, blob_hash, first, end):
+    # chunks overlapping [first, end): the one containing `first` and the ones starting before `end`
+    await storage_db_cursor.execute(
+        """
+        SELECT pos, data FROM blob_chunks
+        WHERE hash = %(hash)s AND pos < %(end)s
+        AND pos >= (SELECT max(pos) FROM blob_chunks WHERE hash = %(hash)s AND pos <= %(first)s)
+        ORDER BY pos
+        """,
+        {"hash": blob_hash, "first": first, "end": end},
+    )
+    return await storage_db_cursor.fetchall()
+
+
+async def sql_select_blob_chunks_exist(storage_db_cursor, blob_hash):
+    await storage_db_cursor.execute("SELECT EXISTS(SELECT 1 FROM blob_chunks WHERE hash = %s)", (blob_hash, ))
+    return (await storage_db_cursor.fetchone())[0]
+
+
+async def sql_delete_blob_chunks(storage_db_cursor, blob_hash):
+    await storage_db_cursor.execute("DELETE FROM blob_chunks WHERE hash = %s", (blob_hash, ))
+
+
+
+async def sql_try_lock_garbage_collection(storage_db_cursor) -> bool:
+    # a session lock, held across the transactions of a whole collection
+    await storage_db_cursor.execute("SELECT pg_try_advisory_lock(hashtext('garbage_collection'))")
+    return (await storage_db_cursor.fetchone())[0]
+
+
+async def sql_unlock_garbage_collection(storage_db_cursor):
+    await storage_db_cursor.execute("SELECT pg_advisory_unlock(hashtext('garbage_collection'))")
+
+
+async def sql_select_blob_batch(storage_db_cursor, after: bytes, grace_seconds: int, limit: int):
+    # blobs in the order of hashes, starting after the given one; `expired` tells if the last upload is older than the grace period
+    await storage_db_cursor.execute(
+        """
+        SELECT hash, size, refcount, referenced < now() - make_interval(secs => %s) AS expired
+        FROM blobs WHERE hash > %s ORDER BY hash LIMIT %s
+        """,
+        (grace_seconds, after, limit),
+    )
+    return await storage_db_cursor.fetchall()
+
+
+async def sql_count_blob_references(db_cursor, blob_hashes: list[bytes]):
+    # number of registered files with every given contents; the ones without files are left out
+    await db_cursor.execute(
+        "SELECT blobhash, count(*) FROM files WHERE blobhash = ANY(%s) GROUP BY blobhash", (blob_hashes, )
+    )
+    return await db_cursor.fetchall()
+
+
+async def sql_update_blob_refcounts(storage_db_cursor, blob_hashes: list[bytes], refcounts: list[int]):
+    await storage_db_cursor.execute(
+        """
+        UPDATE blobs SET refcount = counted.refcount
+        FROM unnest(%s::bytea[], %s::int[]) AS counted(hash, refcount)
+        WHERE blobs.hash = counted.hash AND blobs.refcount <> counted.refcount
+        """,
+        (blob_hashes, refcounts),
+    )
+    return storage_db_cursor.rowcount
+
+
+async def sql_delete_expired_blobs(storage_db_cursor, blob_hashes: list[bytes], grace_seconds: int):
+    # the rows stay locked until the end of the transaction, so uploads of the same contents wait for it;
+    # a blob uploaded again in the meantime is not expired anymore and is kept
+    await storage_db_cursor.execute(
+        """
+        DELETE FROM blobs WHERE hash = ANY(%s) AND referenced < now() - make_interval(secs => %s)
+        RETURNING hash, size, backend
+        """,
+        (blob_hashes, grace_seconds),
+    )
+    return await storage_db_cursor.fetchall()
+
+
+_GC_RUN_COLUMNS = """
+    started, finished, dryrun, scannedblobs, orphanedblobs, orphanedbytes, miscountedblobs, deletedblobs, reclaimedbytes
+"""
+
+
+async def sql_insert_gc_run(db_cursor, run: dict):
+    await db_cursor.execute(
+        f"""
+        INSERT INTO storage_gc_runs ({_GC_RUN_COLUMNS})
+        VALUES (%(started)s, %(finished)s, %(dry_run)s, %(scanned_blobs)s, %(orphaned_blobs)s, %(orphaned_bytes)s,
+                %(miscounted_blobs)s, %(deleted_blobs)s, %(reclaimed_bytes)s)
+        """,
+        run,
+    )
+
+
+async def sql_select_last_gc_run(db_cursor):
+    await db_cursor.execute(f"SELECT {_GC_RUN_COLUMNS} FROM storage_gc_runs ORDER BY id DESC LIMIT 1")
+    return await db_cursor.fetchone()
+
+
+async def sql_select_gc_totals(db_cursor):
+    # number of runs, deleted blobs and reclaimed bytes
+    await db_cursor.execute(
+        "SELECT count(*), coalesce(sum(deletedblobs), 0), coalesce(sum(reclaimedbytes), 0) FROM storage_gc_runs"
+    )
+    return await db_cursor.fetchone()
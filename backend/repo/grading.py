@@ -0,0 +1,161 @@
+from typing import Union
+
+
+async def sql_select_grade_categories(db_cursor, course_id):
+    await db_cursor.execute(
+        "SELECT name, weight FROM grade_categories WHERE courseid = %s ORDER BY name",
+        (course_id,),
+    )
+    return await db_cursor.fetchall()
+
+
+async def sql_select_grade_category_exists(db_cursor, course_id, name):
+    await db_cursor.execute(
+        "SELECT EXISTS(SELECT 1 FROM grade_categories WHERE courseid = %s AND name = %s)",
+        (course_id, name),
+    )
+    return (await db_cursor.fetchone())[0]
+
+
+async def sql_upsert_grade_category(db_cursor, course_id, name, weight):
+    await db_cursor.execute(
+        """
+        INSERT INTO grade_categories (courseid, name, weight) VALUES (%s, %s, %s)
+        ON CONFLICT (courseid, name) DO UPDATE SET weight = EXCLUDED.weight
+        """,
+        (course_id, name, weight),
+    )
+
+
+async def sql_delete_grade_category(db_cursor, course_id, name):
+    await db_cursor.execute(
+        "DELETE FROM grade_categories WHERE courseid = %s AND name = %s",
+        (course_id, name),
+    )
+
+
+async def sql_update_assignment_category(db_cursor, course_id, assignment_id, category):
+    await db_cursor.execute(
+        "UPDATE course_assignments SET category = %s WHERE courseid = %s AND assid = %s",
+        (category, course_id, assignment_id),
+    )
+
+
+async def sql_select_gradable_assignments(db_cursor, course_id):
+    await db_cursor.execute(
+        "SELECT assid, name, category FROM course_assignments WHERE courseid = %s ORDER BY timeadded, assid",
+        (course_id,),
+    )
+    return await db_cursor.fetchall()
+
+
+async def sql_select_grade_matrix(db_cursor, course_id, students: list[str], assignments: list[int]):
+    """
+    Select the submissions of the given students for the given assignments as three arrays:
+    row (index in `students`), column (index in `assignments`), and grade, None if not graded yet.
+    """
+    await db_cursor.execute(
+        """
+        SELECT
+            COALESCE(array_agg(s.pos - 1), '{}'),
+            COALESCE(array_agg(a.pos - 1), '{}'),
+            COALESCE(array_agg(cas.grade), '{}')
+        FROM course_assignments_submissions cas
+        JOIN unnest(%(students)s::text[]) WITH ORDINALITY AS s(email, pos) ON s.email = cas.email
+        JOIN unnest(%(assignments)s::int[]) WITH ORDINALITY AS a(assid, pos) ON a.assid = cas.assid
+        WHERE cas.courseid = %(course)s
+        """,
+        {"course": course_id, "students": students, "assignments": assignments},
+    )
+    return await db_cursor.fetchone()
+
+
+async def sql_insert_grade_summaries(db_cursor, course_id, students: list[str]):
+    # summaries of newly enrolled students, counting the submissions left from an earlier enrollment
+    await db_cursor.execute(
+        """
+        INSERT INTO grade_summaries (courseid, email, gradedcount, gradesum)
+        SELECT %(course)s, s.email, COUNT(cas.grade), COALESCE(SUM(cas.grade), 0)
+        FROM unnest(%(students)s::text[]) AS s(email)
+        LEFT JOIN course_assignments_submissions cas ON cas.courseid = %(course)s AND cas.email = s.email
+        GROUP BY s.email
+        """,
+        {"course": course_id, "students": students},
+    )
+
+
+async def sql_update_grade_summary(db_cursor, course_id, student_email, old_grade, new_grade):
+    await db_cursor.execute(
+        """
+        UPDATE grade_summaries
+        SET gradedcount = gradedcount + %s, gradesum = gradesum + %s, lastgraded = now()
+        WHERE courseid = %s AND email = %s
+        """,
+        (
+            (new_grade is not None) - (old_grade is not None),
+            (new_grade or 0) - (old_grade or 0),
+            course_id,
+            student_email,
+        ),
+    )
+
+
+async def sql_update_grade_summaries(db_cursor, course_id, changes: list[tuple[str, Union[int, None], Union[int, None]]]):
+    # applies many grade changes, given as (student email, old grade, new grade), at once
+    await db_cursor.execute(
+        """
+        UPDATE grade_summaries gs
+        SET gradedcount = gs.gradedcount + d.gradedcount, gradesum = gs.gradesum + d.gradesum, lastgraded = now()
+        FROM (
+            SELECT email, SUM((new IS NOT NULL)::int - (old IS NOT NULL)::int) AS gradedcount,
+                SUM(COALESCE(new, 0) - COALESCE(old, 0)) AS gradesum
+            FROM unnest(%s::text[], %s::int[], %s::int[]) AS c(email, old, new)
+            GROUP BY email
+        ) d
+        WHERE gs.courseid = %s AND gs.email = d.email
+        """,
+        (
+            [email for email, old, new in changes],
+            [old for email, old, new in changes],
+            [new for email, old, new in changes],
+            course_id,
+        ),
+    )
+
+
+async def sql_delete_assignment_submissions(db_cursor, course_id, assignment_id):
+    # the grades are taken out of the summaries by the same statement that deletes them,
+    # so that a concurrent grading either happens before it or finds no submission
+    await db_cursor.execute(
+        """
+        WITH removed AS (
+            DELETE FROM course_assignments_submissions
+            WHERE courseid = %(course)s AND assid = %(assignment)s
+            RETURNING email, grade
+        ),
+        totals AS (
+            SELECT email, COUNT(grade) AS gradedcount, COALESCE(SUM(grade), 0) AS gradesum
+            FROM removed
+            GROUP BY email
+        )
+        UPDATE grade_summaries gs
+        SET gradedcount = gs.gradedcount - t.gradedcount, gradesum = gs.gradesum - t.gradesum
+        FROM totals t
+        WHERE gs.courseid = %(course)s AND gs.email = t.email
+        """,
+        {"course": course_id, "assignment": assignment_id},
+    )
+
+
+async def sql_select_grade_summaries(db_cursor, course_id, students: Union[list[str], None] = None):
+    await db_cursor.execute(
+        """
+        SELECT gs.email, u.publicname, gs.gradedcount, gs.average, gs.lastgraded
+        FROM grade_summaries gs
+        JOIN users u ON u.email = gs.email
+        WHERE gs.courseid = %(course)s AND (%(students)s::text[] IS NULL OR gs.email = ANY(%(students)s::text[]))
+        ORDER BY gs.email
+        """,
+        {"course": course_id, "students": students},
+    )
+    return await db_cursor.fetchall()
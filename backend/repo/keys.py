@@ -0,0 +1,22 @@
+async def sql_lock_signing_keys(db_cursor):
+    await db_cursor.execute("SELECT pg_advisory_xact_lock(hashtext('signing_keys'))")
+
+
+async def sql_select_signing_keys(db_cursor, rotation_hours, retention_minutes):
+    await db_cursor.execute(
+        """
+        SELECT kid, secret, timecreated > now() - make_interval(hours => %s) AS fresh
+        FROM signing_keys
+        WHERE timecreated > now() - make_interval(hours => %s, mins => %s)
+        ORDER BY timecreated DESC
+        """,
+        (rotation_hours, rotation_hours, retention_minutes),
+    )
+    return await db_cursor.fetchall()
+
+
+async def sql_insert_signing_key(db_cursor, kid, secret):
+    await db_cursor.execute(
+        "INSERT INTO signing_keys (kid, secret, timecreated) VALUES (%s, %s, now())",
+        (kid, secret),
+    )
@@ -1,13 +1,122 @@
-import random
+import re
+from datetime import date, datetime, timedelta
+from psycopg import sql
 
-LOG_CLEANUP_PROBABILITY = 0.01
+# every partition holds a single day and is named after it
+LOG_PARTITION_PREFIX = "logs_"
+LOG_PARTITION_DATE_FORMAT = "%Y%m%d"
+LOG_PARTITION_NAME = re.compile(LOG_PARTITION_PREFIX + r"\d{8}")
 
+# events falling outside of every day partition go here rather than failing to be written
+LOG_DEFAULT_PARTITION = "logs_default"
 
-def sql_insert_log(db_cursor, tag, msg):
-    db_cursor.execute("INSERT INTO logs (t, tag, msg) VALUES (now(), %s, %s)", (tag, msg))
-    if random.random() < LOG_CLEANUP_PROBABILITY:
-        sql_delete_old_logs(db_cursor)
 
+def _partition_table(day: date) -> str:
+    return LOG_PARTITION_PREFIX + day.strftime(LOG_PARTITION_DATE_FORMAT)
 
-def sql_delete_old_logs(db_cursor):
-    db_cursor.execute("DELETE FROM logs WHERE t < NOW() - INTERVAl '7 days'")
+
+def _partition_name(day: date) -> sql.Identifier:
+    return sql.Identifier(_partition_table(day))
+
+
+async def sql_insert_logs(db_cursor, events):
+    async with db_cursor.copy("COPY logs (t, tag, msg, actor, courseid, objectid) FROM STDIN") as copy:
+        for event in events:
+            await copy.write_row(event)
+
+
+async def sql_lock_log_partitions(db_cursor):
+    await db_cursor.execute("SELECT pg_advisory_xact_lock(hashtext('log_partitions'))")
+
+
+async def sql_create_default_log_partition(db_cursor):
+    await db_cursor.execute(
+        sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF logs DEFAULT").format(sql.Identifier(LOG_DEFAULT_PARTITION))
+    )
+
+
+async def sql_create_log_partition(db_cursor, day: date):
+    await db_cursor.execute("SELECT to_regclass(%s)", (_partition_table(day),))
+    if (await db_cursor.fetchone())[0] is not None:
+        return
+    # the rows of the day that went to the default partition are moved to the new one,
+    # as a partition cannot be added while the default one holds rows in its range
+    await db_cursor.execute(sql.SQL("CREATE TABLE {} (LIKE logs INCLUDING DEFAULTS)").format(_partition_name(day)))
+    await db_cursor.execute(
+        sql.SQL(
+            """
+            WITH moved AS (DELETE FROM {} WHERE t >= %s AND t < %s RETURNING *)
+            INSERT INTO {} SELECT * FROM moved
+            """
+        ).format(sql.Identifier(LOG_DEFAULT_PARTITION), _partition_name(day)),
+        (day, day + timedelta(days=1)),
+    )
+    # partition bounds cannot be passed as parameters
+    await db_cursor.execute(
+        sql.SQL("ALTER TABLE logs ATTACH PARTITION {} FOR VALUES FROM ({}) TO ({})").format(
+            _partition_name(day),
+            sql.Literal(day),
+            sql.Literal(day + timedelta(days=1)),
+        )
+    )
+
+
+async def sql_select_log_partition_days(db_cursor) -> list[date]:
+    await db_cursor.execute(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'logs'::regclass
+        """
+    )
+    names = [i[0] for i in await db_cursor.fetchall()]
+    # other tables attached to logs, like the default partition, are not day partitions
+    return [
+        datetime.strptime(name.removeprefix(LOG_PARTITION_PREFIX), LOG_PARTITION_DATE_FORMAT).date()
+        for name in names
+        if LOG_PARTITION_NAME.fullmatch(name)
+    ]
+
+
+async def sql_delete_default_logs(db_cursor, before: date):
+    await db_cursor.execute(
+        sql.SQL("DELETE FROM {} WHERE t < %s").format(sql.Identifier(LOG_DEFAULT_PARTITION)), (before,)
+    )
+
+
+async def sql_drop_log_partition(db_cursor, day: date):
+    await db_cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(_partition_name(day)))
+
+
+async def sql_select_logs(db_cursor, tag, actor, course_id, since, until, after, limit):
+    # only the filters in use make it into the query, so each combination is planned with its own index
+    conditions = []
+    params = []
+    for column, value in (("tag", tag), ("actor", actor), ("courseid", course_id)):
+        if value is not None:
+            conditions.append(sql.SQL("{} = %s").format(sql.Identifier(column)))
+            params.append(value)
+    if since is not None:
+        conditions.append(sql.SQL("t >= %s"))
+        params.append(since)
+    if until is not None:
+        conditions.append(sql.SQL("t < %s"))
+        params.append(until)
+    if after is not None:
+        conditions.append(sql.SQL("(t, id) < (%s, %s)"))
+        params.extend(after)
+
+    await db_cursor.execute(
+        sql.SQL(
+            """
+            SELECT id, t, tag, msg, actor, courseid, objectid
+            FROM logs
+            WHERE {}
+            ORDER BY t DESC, id DESC
+            LIMIT %s
+            """
+        ).format(sql.SQL(" AND ").join(conditions) if conditions else sql.SQL("TRUE")),
+        (*params, limit),
+    )
+    return await db_cursor.fetchall()
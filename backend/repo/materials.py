@@ -1,61 +1,65 @@
-def sql_insert_material(db_cursor, course_id, title, description, user_email):
-    db_cursor.execute(
+async def sql_insert_material(db_cursor, course_id, title, description, user_email):
+    await db_cursor.execute(
         "INSERT INTO course_materials (courseid, name, description, timeadded, author) VALUES (%s, %s, %s, now(), %s) RETURNING matid",
         (course_id, title, description, user_email),
     )
-    return db_cursor.fetchone()[0]
+    return (await db_cursor.fetchone())[0]
 
 
-def sql_delete_material(db_cursor, course_id, material_id):
-    db_cursor.execute(
+async def sql_delete_material(db_cursor, course_id, material_id):
+    await db_cursor.execute(
         "DELETE FROM course_materials WHERE courseid = %s AND matid = %s",
         (course_id, material_id),
     )
 
 
-def sql_select_material(db_cursor, course_id, material_id):
-    db_cursor.execute(
+async def sql_select_material(db_cursor, course_id, material_id):
+    # an author removed from the system is hidden until the purge clears it
+    await db_cursor.execute(
         """
-        SELECT courseid, matid, timeadded, name, description, author
+        SELECT courseid, matid, timeadded, name, description,
+               CASE WHEN EXISTS (SELECT 1 FROM users WHERE users.email = course_materials.author AND users.deleted IS NULL)
+                    THEN author END
         FROM course_materials
         WHERE courseid = %s AND matid = %s
         """,
         (course_id, material_id),
     )
-    return db_cursor.fetchone()
+    return await db_cursor.fetchone()
 
 
-def sql_insert_material_attachment(db_cursor, storage_db_cursor, course_id, material_id, filename, contents):
-    storage_db_cursor.execute(
+async def sql_insert_material_attachment(db_cursor, course_id, material_id, blob_hash, filename):
+    await db_cursor.execute(
         """
-        INSERT INTO files 
-        (id, content)
-        VALUES (gen_random_uuid(), %s)
-        RETURNING id
-        """,
-        (contents, )
-    )
-    fileid = storage_db_cursor.fetchone()[0]
-
-    db_cursor.execute(
-        """
-        INSERT INTO material_files 
-        (courseid, matid, fileid, filename, uploadtime)
-        VALUES (%s, %s, %s, %s, now())
+        INSERT INTO files
+        (fileid, courseid, matid, blobhash, filename, uploadtime)
+        VALUES (gen_random_uuid(), %s, %s, %s, %s, now())
         RETURNING fileid, uploadtime
         """,
-        (course_id, material_id, fileid, filename),
+        (course_id, material_id, blob_hash, filename),
     )
-    return db_cursor.fetchone()
+    return await db_cursor.fetchone()
 
 
-def sql_select_material_attachments(db_cursor, course_id, material_id):
-    db_cursor.execute(
+async def sql_select_material_attachments(db_cursor, course_id, material_id):
+    await db_cursor.execute(
         """
         SELECT fileid, filename, uploadtime
-        FROM material_files
+        FROM files
         WHERE courseid = %s AND matid = %s
         """,
         (course_id, material_id),
     )
-    return db_cursor.fetchall()
+    return await db_cursor.fetchall()
+
+
+async def sql_select_material_attachment(db_cursor, course_id, material_id, file_id):
+    await db_cursor.execute(
+        """
+        SELECT filename, blobhash
+        FROM files
+        WHERE fileid = %s AND courseid = %s AND matid = %s
+        """,
+        (file_id, course_id, material_id),
+    )
+    return await db_cursor.fetchone()
@@ -0,0 +1,53 @@
+from psycopg import sql
+
+
+async def sql_try_lock_purge(db_cursor) -> bool:
+    # held until the end of the transaction; every transaction of a purge takes it
+    await db_cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext('purge'))")
+    return (await db_cursor.fetchone())[0]
+
+
+async def sql_select_deleted_courses(db_cursor, limit):
+    await db_cursor.execute(
+        "SELECT courseid FROM courses WHERE deleted IS NOT NULL ORDER BY deleted LIMIT %s", (limit,)
+    )
+    return [row[0] for row in await db_cursor.fetchall()]
+
+
+async def sql_select_deleted_users(db_cursor, limit):
+    await db_cursor.execute(
+        "SELECT email FROM users WHERE deleted IS NOT NULL ORDER BY deleted LIMIT %s", (limit,)
+    )
+    return [row[0] for row in await db_cursor.fetchall()]
+
+
+async def sql_delete_rows(db_cursor, table: str, column: str, value, limit: int) -> int:
+    # deletes at most `limit` rows with the value in the column, with everything cascading from them;
+    # returns the number of rows deleted
+    await db_cursor.execute(
+        sql.SQL(
+            "DELETE FROM {table} WHERE ctid = ANY(ARRAY(SELECT ctid FROM {table} WHERE {column} = %s LIMIT %s))"
+        ).format(table=sql.Identifier(table), column=sql.Identifier(column)),
+        (value, limit),
+    )
+    return db_cursor.rowcount
+
+
+async def sql_clear_column(db_cursor, table: str, column: str, value, limit: int) -> int:
+    # sets at most `limit` cells with the value in the column to NULL; returns the number of rows changed
+    await db_cursor.execute(
+        sql.SQL(
+            "UPDATE {table} SET {column} = NULL WHERE ctid = ANY(ARRAY(SELECT ctid FROM {table} WHERE {column} = %s LIMIT %s))"
+        ).format(table=sql.Identifier(table), column=sql.Identifier(column)),
+        (value, limit),
+    )
+    return db_cursor.rowcount
+
+
+async def sql_delete_course(db_cursor, course_id):
+    # whatever is left of the course goes with it
+    await db_cursor.execute("DELETE FROM courses WHERE courseid = %s AND deleted IS NOT NULL", (course_id,))
+
+
+async def sql_delete_user(db_cursor, user_email):
+    await db_cursor.execute("DELETE FROM users WHERE email = %s AND deleted IS NOT NULL", (user_email,))
@@ -1,5 +1,8 @@
-def sql_select_enrolled_students(db_cursor, course_id):
-    db_cursor.execute(
+import constraints
+
+
+async def sql_select_enrolled_students(db_cursor, course_id):
+    await db_cursor.execute(
         """
         SELECT
             s.email,
@@ -10,18 +13,35 @@ def sql_select_enrolled_students(db_cursor, course_id):
         """,
         (course_id,),
     )
-    return db_cursor.fetchall()
+    return await db_cursor.fetchall()
 
 
-def sql_insert_student_at(db_cursor, student_email, course_id):
-    db_cursor.execute(
+async def sql_insert_student_at(db_cursor, student_email, course_id):
+    await db_cursor.execute(
         "INSERT INTO student_at (email, courseid) VALUES (%s, %s)",
         (student_email, course_id),
     )
+    constraints.forget_roles(db_cursor)
+
+
+async def sql_insert_students_at(db_cursor, course_id, student_emails: list[str]) -> list[str]:
+    # returns the students actually enrolled, skipping those enrolled concurrently
+    await db_cursor.execute(
+        """
+        INSERT INTO student_at (email, courseid)
+        SELECT email, %s FROM unnest(%s::text[]) AS s(email)
+        ON CONFLICT DO NOTHING
+        RETURNING email
+        """,
+        (course_id, student_emails),
+    )
+    constraints.forget_roles(db_cursor)
+    return [row[0] for row in await db_cursor.fetchall()]
 
 
-def sql_delete_student_at(db_cursor, course_id, student_email):
-    db_cursor.execute(
+async def sql_delete_student_at(db_cursor, course_id, student_email):
+    await db_cursor.execute(
         "DELETE FROM student_at WHERE courseid = %s AND email = %s",
         (course_id, student_email),
     )
+    constraints.forget_roles(db_cursor)
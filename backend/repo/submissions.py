@@ -1,56 +1,71 @@
-def sql_select_submission_grade(db_cursor, course_id, assignment_id, student_email):
-    db_cursor.execute(
+async def sql_select_submission_grade(db_cursor, course_id, assignment_id, student_email):
+    await db_cursor.execute(
         "SELECT grade FROM course_assignments_submissions WHERE courseid = %s AND assid = %s AND email = %s",
         (course_id, assignment_id, student_email),
     )
-    return db_cursor.fetchone()
+    return await db_cursor.fetchone()
 
 
-def sql_insert_submission(db_cursor, course_id, assignment_id, student_email, comment):
-    db_cursor.execute(
+async def sql_insert_submission(db_cursor, course_id, assignment_id, student_email, comment):
+    await db_cursor.execute(
         "INSERT INTO course_assignments_submissions (courseid, assid, email, timeadded, timemodified, comment, grade, gradedby) VALUES (%s, %s, %s, now(), now(), %s, null, null)",
         (course_id, assignment_id, student_email, comment),
     )
 
 
-def sql_insert_submission_attachment(db_cursor, storage_db_cursor, course_id, assignment_id, student_email, filename, contents):
-    storage_db_cursor.execute(
+async def sql_insert_submission_attachment(db_cursor, course_id, assignment_id, student_email, blob_hash, filename):
+    await db_cursor.execute(
         """
-        INSERT INTO files 
-        (id, content)
-        VALUES (gen_random_uuid(), %s)
-        RETURNING id
-        """,
-        (contents, )
-    )
-    fileid = storage_db_cursor.fetchone()[0]
-    
-    db_cursor.execute(
-        """
-        INSERT INTO submissions_files 
-        (courseid, assid, email, fileid, filename, uploadtime)
-        VALUES (%s, %s, %s, %s, %s, now())
+        INSERT INTO files
+        (fileid, courseid, assid, email, blobhash, filename, uploadtime)
+        VALUES (gen_random_uuid(), %s, %s, %s, %s, %s, now())
         RETURNING fileid, uploadtime
         """,
-        (course_id, assignment_id, student_email, fileid, filename),
+        (course_id, assignment_id, student_email, blob_hash, filename),
     )
-    return db_cursor.fetchone()
+    return await db_cursor.fetchone()
 
 
-def sql_select_submission_attachments(db_cursor, course_id, assignment_id, student_email):
-    db_cursor.execute(
+async def sql_select_submission_attachments(db_cursor, course_id, assignment_id, student_email):
+    await db_cursor.execute(
         """
         SELECT fileid, filename, uploadtime
-        FROM submissions_files
+        FROM files
         WHERE courseid = %s AND assid = %s AND email = %s
         """,
         (course_id, assignment_id, student_email),
     )
-    return db_cursor.fetchall()
+    return await db_cursor.fetchall()
+
+
+async def sql_select_assignment_submission_attachments(db_cursor, course_id, assignment_id):
+    await db_cursor.execute(
+        """
+        SELECT f.email, f.filename, f.blobhash, f.uploadtime
+        FROM files f
+        JOIN users u ON u.email = f.email
+        WHERE f.courseid = %s AND f.assid = %s AND u.deleted IS NULL
+        ORDER BY f.email, f.uploadtime, f.fileid
+        """,
+        (course_id, assignment_id),
+    )
+    return await db_cursor.fetchall()
+
+
+async def sql_select_submission_attachment(db_cursor, course_id, assignment_id, student_email, file_id):
+    await db_cursor.execute(
+        """
+        SELECT filename, blobhash
+        FROM files
+        WHERE fileid = %s AND courseid = %s AND assid = %s AND email = %s
+        """,
+        (file_id, course_id, assignment_id, student_email),
+    )
+    return await db_cursor.fetchone()
 
 
-def sql_update_submission_comment(db_cursor, comment, course_id, assignment_id, student_email):
-    db_cursor.execute(
+async def sql_update_submission_comment(db_cursor, comment, course_id, assignment_id, student_email):
+    await db_cursor.execute(
         """
         UPDATE course_assignments_submissions
         SET comment = %s, timemodified = now()
@@ -60,8 +75,8 @@ def sql_update_submission_comment(db_cursor, comment, course_id, assignment_id,
     )
 
 
-def sql_select_submissions(db_cursor, course_id, assignment_id):
-    db_cursor.execute(
+async def sql_select_submissions(db_cursor, course_id, assignment_id):
+    await db_cursor.execute(
         """
         SELECT
             s.email,
@@ -73,16 +88,16 @@ def sql_select_submissions(db_cursor, course_id, assignment_id):
             s.gradedby
         FROM course_assignments_submissions s
         JOIN users u ON s.email = u.email
-        WHERE s.courseid = %s AND s.assid = %s
+        WHERE s.courseid = %s AND s.assid = %s AND u.deleted IS NULL
         ORDER BY s.timeadded DESC
         """,
         (course_id, assignment_id),
     )
-    return db_cursor.fetchall()
+    return await db_cursor.fetchall()
 
 
-def sql_select_single_submission(db_cursor, course_id, assignment_id, student_email):
-    db_cursor.execute(
+async def sql_select_single_submission(db_cursor, course_id, assignment_id, student_email):
+    await db_cursor.execute(
         """
         SELECT
             s.email,
@@ -94,19 +109,69 @@ def sql_select_single_submission(db_cursor, course_id, assignment_id, student_em
             s.gradedby
         FROM course_assignments_submissions s
         JOIN users u ON s.email = u.email
-        WHERE s.courseid = %s AND s.assid = %s AND s.email = %s
+        WHERE s.courseid = %s AND s.assid = %s AND s.email = %s AND u.deleted IS NULL
         """,
         (course_id, assignment_id, student_email),
     )
-    return db_cursor.fetchone()
+    return await db_cursor.fetchone()
 
 
-def sql_update_submission_grade(db_cursor, grade, user_email, course_id, assignment_id, student_email):
-    db_cursor.execute(
+async def sql_update_submission_grade(db_cursor, grade, user_email, course_id, assignment_id, student_email):
+    # returns the old and the new grade, or None if there is no such submission
+    await db_cursor.execute(
         """
-        UPDATE course_assignments_submissions
+        UPDATE course_assignments_submissions cas
         SET grade = %s, gradedby = %s
-        WHERE courseid = %s AND assid = %s AND email = %s
+        FROM (
+            SELECT grade FROM course_assignments_submissions
+            WHERE courseid = %s AND assid = %s AND email = %s
+            FOR UPDATE
+        ) old
+        WHERE cas.courseid = %s AND cas.assid = %s AND cas.email = %s
+        RETURNING old.grade, cas.grade
+        """,
+        (grade, user_email, course_id, assignment_id, student_email, course_id, assignment_id, student_email),
+    )
+    return await db_cursor.fetchone()
+
+
+async def sql_update_submission_grades(db_cursor, course_id, grades: list[tuple[str, int, int]], user_email):
+    """
+    Set the grades given as (student email, assignment ID, grade) in a single statement.
+
+    Returns (student email, assignment ID, old grade, new grade, whether updated) for every existing
+    submission of a student enrolled in the course among the given ones;
+    submissions that already have the given grade are not updated.
+    """
+    await db_cursor.execute(
+        """
+        WITH current AS (
+            SELECT cas.email, cas.assid, cas.grade AS oldgrade, n.grade AS newgrade
+            FROM course_assignments_submissions cas
+            JOIN unnest(%(emails)s::text[], %(assignments)s::int[], %(grades)s::int[]) AS n(email, assid, grade)
+                ON cas.email = n.email AND cas.assid = n.assid
+            JOIN student_at sa ON sa.courseid = cas.courseid AND sa.email = cas.email
+            WHERE cas.courseid = %(course)s
+            FOR UPDATE OF cas
+        ),
+        updated AS (
+            UPDATE course_assignments_submissions cas
+            SET grade = c.newgrade, gradedby = %(teacher)s
+            FROM current c
+            WHERE cas.courseid = %(course)s AND cas.assid = c.assid AND cas.email = c.email
+                AND c.oldgrade IS DISTINCT FROM c.newgrade
+            RETURNING cas.email, cas.assid
+        )
+        SELECT c.email, c.assid, c.oldgrade, c.newgrade, u.email IS NOT NULL
+        FROM current c
+        LEFT JOIN updated u ON u.email = c.email AND u.assid = c.assid
         """,
-        (grade, user_email, course_id, assignment_id, student_email),
+        {
+            "course": course_id,
+            "teacher": user_email,
+            "emails": [email for email, assignment, grade in grades],
+            "assignments": [assignment for email, assignment, grade in grades],
+            "grades": [grade for email, assignment, grade in grades],
+        },
     )
+    return await db_cursor.fetchall()
@@ -1,64 +1,106 @@
-def sql_get_user_name(db_cursor, email):
-    db_cursor.execute("SELECT publicname FROM users WHERE email = %s", (email,))
-    return db_cursor.fetchone()[0]
+import constraints
 
 
-def sql_select_user_exists(db_cursor, email):
-    db_cursor.execute("SELECT EXISTS(SELECT 1 FROM users WHERE email = %s)", (email,))
-    return db_cursor.fetchone()[0]
+async def sql_get_user_name(db_cursor, email):
+    await db_cursor.execute("SELECT publicname FROM users WHERE email = %s", (email,))
+    return (await db_cursor.fetchone())[0]
 
 
-def sql_insert_user(db_cursor, email, name, hashed_password):
-    db_cursor.execute(
+async def sql_select_user_exists(db_cursor, email):
+    # deleted users are counted too, as they keep their emails until they are purged
+    await db_cursor.execute("SELECT EXISTS(SELECT 1 FROM users WHERE email = %s)", (email,))
+    return (await db_cursor.fetchone())[0]
+
+
+async def sql_select_user_deleted(db_cursor, email):
+    await db_cursor.execute("SELECT EXISTS(SELECT 1 FROM users WHERE email = %s AND deleted IS NOT NULL)", (email,))
+    return (await db_cursor.fetchone())[0]
+
+
+async def sql_insert_user(db_cursor, email, name, hashed_password):
+    await db_cursor.execute(
         "INSERT INTO users (email, publicname, isadmin, timeregistered, passwordhash) VALUES (%s, %s, 'f', now(), %s)",
         (email, name, hashed_password),
     )
+    constraints.forget_roles(db_cursor)
 
 
-def sql_select_passwordhash(db_cursor, email):
-    db_cursor.execute("SELECT passwordhash FROM users WHERE email = %s", (email,))
-    return db_cursor.fetchone()
+async def sql_select_passwordhash(db_cursor, email):
+    await db_cursor.execute("SELECT passwordhash FROM users WHERE email = %s AND deleted IS NULL", (email,))
+    return await db_cursor.fetchone()
 
 
-def sql_update_password(db_cursor, email, hashed_new_password):
-    db_cursor.execute("UPDATE users SET passwordhash = %s WHERE email = %s", (hashed_new_password, email))
+async def sql_update_password(db_cursor, email, hashed_new_password):
+    await db_cursor.execute("UPDATE users SET passwordhash = %s WHERE email = %s", (hashed_new_password, email))
 
 
-def sql_select_single_teacher_courses(db_cursor, user_email):
-    db_cursor.execute(
+async def sql_select_single_teacher_courses(db_cursor, user_email):
+    await db_cursor.execute(
         "SELECT t.courseid FROM teaches t WHERE t.email = %s AND (SELECT COUNT(*) FROM teaches WHERE courseid = t.courseid) = 1",
         (user_email,),
     )
-    return [row[0] for row in db_cursor.fetchall()]
+    return [row[0] for row in await db_cursor.fetchall()]
+
+
+async def sql_mark_user_deleted(db_cursor, user_email):
+    await db_cursor.execute("UPDATE users SET deleted = now() WHERE email = %s AND deleted IS NULL", (user_email,))
+    constraints.forget_roles(db_cursor)
+
+
+async def sql_delete_user_memberships(db_cursor, user_email):
+    # the parents of the user as a student go with the student rows
+    await db_cursor.execute(
+        """
+        WITH t AS (DELETE FROM teaches WHERE email = %(email)s),
+        p AS (DELETE FROM parent_of_at_course WHERE parentemail = %(email)s)
+        DELETE FROM student_at WHERE email = %(email)s
+        """,
+        {"email": user_email},
+    )
+    constraints.forget_roles(db_cursor)
 
 
-def sql_delete_course(db_cursor, course_id):
-    db_cursor.execute("DELETE FROM courses WHERE courseid = %s", (course_id,))
+async def sql_give_admin_permissions(db_cursor, user_email):
+    await db_cursor.execute("UPDATE users SET isadmin = 't' WHERE email = %s", (user_email,))
+    constraints.forget_roles(db_cursor)
 
 
-def sql_delete_user(db_cursor, user_email):
-    db_cursor.execute("DELETE FROM users WHERE email = %s", (user_email,))
+async def sql_select_admins(db_cursor):
+    await db_cursor.execute("SELECT email, publicname FROM users WHERE isadmin AND deleted IS NULL")
+    return await db_cursor.fetchall()
 
 
-def sql_give_admin_permissions(db_cursor, user_email):
-    db_cursor.execute("UPDATE users SET isadmin = 't' WHERE email = %s", (user_email,))
+async def sql_count_admins(db_cursor):
+    await db_cursor.execute("SELECT COUNT(*) FROM users WHERE isadmin AND deleted IS NULL")
+    return (await db_cursor.fetchone())[0]
 
 
-def sql_select_admins(db_cursor):
-    db_cursor.execute("SELECT email, publicname FROM users WHERE isadmin")
-    return db_cursor.fetchall()
+async def sql_lock_admin_creation(db_cursor):
+    await db_cursor.execute("SELECT pg_advisory_xact_lock(hashtext('create_admin_account'))")
 
 
-def sql_count_admins(db_cursor):
-    db_cursor.execute("SELECT COUNT(*) FROM users WHERE isadmin")
-    return db_cursor.fetchone()[0]
+async def sql_admins_exist(db_cursor) -> bool:
+    await db_cursor.execute("SELECT EXISTS (SELECT 1 FROM users WHERE isadmin AND deleted IS NULL)")
+    return (await db_cursor.fetchone())[0]
 
 
-def sql_admins_exist(db_cursor) -> bool:
-    db_cursor.execute("SELECT EXISTS (SELECT 1 FROM users WHERE isadmin)")
-    return db_cursor.fetchone()[0]
+async def sql_select_all_users(db_cursor):
+    await db_cursor.execute("SELECT email, publicname FROM users WHERE deleted IS NULL")
+    return await db_cursor.fetchall()
 
 
-def sql_select_all_users(db_cursor):
-    db_cursor.execute("SELECT email, publicname FROM users")
-    return db_cursor.fetchall()
+async def sql_select_course_roles(db_cursor, course_id, emails: list[str]):
+    # (email, exists, is teacher, is student, is parent) in the course for every given email
+    await db_cursor.execute(
+        """
+        SELECT
+            e.email,
+            EXISTS(SELECT 1 FROM users u WHERE u.email = e.email AND u.deleted IS NULL),
+            EXISTS(SELECT 1 FROM teaches t WHERE t.email = e.email AND t.courseid = %(course)s),
+            EXISTS(SELECT 1 FROM student_at s WHERE s.email = e.email AND s.courseid = %(course)s),
+            EXISTS(SELECT 1 FROM parent_of_at_course p WHERE p.parentemail = e.email AND p.courseid = %(course)s)
+        FROM unnest(%(emails)s::text[]) AS e(email)
+        """,
+        {"course": course_id, "emails": emails},
+    )
+    return await db_cursor.fetchall()
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, UploadFile, File
-from typing import List
+from fastapi import APIRouter, Depends, UploadFile, File, Header
+from typing import List, Union
 
 from auth import get_current_user, get_db, get_storage_db
 import json_classes
@@ -32,8 +32,8 @@ async def create_assignment(
     """
 
     # connection to database
-    with get_db() as (db_conn, db_cursor):
-        return logic_create_assignment(db_conn, db_cursor, course_id, title, description, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_create_assignment(db_conn, db_cursor, course_id, title, description, user_email)
 
 
 @router.post("/remove_assignment", response_model=json_classes.Success, tags=["Assignments"])
@@ -45,8 +45,8 @@ async def remove_assignment(course_id: str, assignment_id: str, user_email: str
     """
 
     # connection to database
-    with get_db() as (db_conn, db_cursor):
-        return logic_remove_assignment(db_conn, db_cursor, course_id, assignment_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_remove_assignment(db_conn, db_cursor, course_id, assignment_id, user_email)
 
 
 @router.get("/get_assignment", response_model=json_classes.Assignment, tags=["Assignments"])
@@ -62,8 +62,8 @@ async def get_assignment(course_id: str, assignment_id: str, user_email: str = D
     """
 
     # connection to database
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_assignment(db_cursor, course_id, assignment_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_assignment(db_cursor, course_id, assignment_id, user_email)
 
 
 @router.post("/create_assignment_attachment", response_model=json_classes.AssignmentAttachmentMetadata, tags=["Assignments"])
@@ -82,7 +82,7 @@ async def create_assignment_attachment(
 
     The format of upload_time is TIME_FORMAT.
     """
-    with get_db() as (db_conn, db_cursor), get_storage_db() as (storage_db_conn, storage_db_cursor):
+    async with get_db() as (db_conn, db_cursor), get_storage_db() as (storage_db_conn, storage_db_cursor):
         return await logic_create_assignment_attachment(db_conn, db_cursor, storage_db_conn, storage_db_cursor, course_id, assignment_id, file, user_email)
 
 
@@ -95,14 +95,26 @@ async def get_assignment_attachments(course_id: str, assignment_id: str, user_em
 
     The format of upload_time is TIME_FORMAT.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_assignment_attachments(db_cursor, course_id, assignment_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_assignment_attachments(db_cursor, course_id, assignment_id, user_email)
 
 
 @router.get("/download_assignment_attachment", tags=["Assignments"])
-async def download_assignment_attachment(course_id: str, assignment_id: str, file_id: str, user_email: str = Depends(get_current_user)):
+async def download_assignment_attachment(
+    course_id: str,
+    assignment_id: str,
+    file_id: str,
+    range_header: Union[str, None] = Header(default=None, alias="Range"),
+    if_none_match: Union[str, None] = Header(default=None, alias="If-None-Match"),
+    user_email: str = Depends(get_current_user),
+):
     """
     Download the course assignment attachment by provided course_id, assignment_id, file_id.
+
+    Supports the `Range` header with a single byte range, answering 206 Partial Content.
+
+    Attachments never change, so the response carries an `ETag` and may be cached by the client.
+    A request with a matching `If-None-Match` is answered with 304 Not Modified.
     """
-    with get_db() as (db_conn, db_cursor), get_storage_db() as (storage_db_conn, storage_db_cursor):
-        return logic_download_assignment_attachment(db_cursor, storage_db_cursor, course_id, assignment_id, file_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_download_assignment_attachment(db_cursor, course_id, assignment_id, file_id, range_header, if_none_match, user_email)
@@ -1,11 +1,13 @@
-from typing import List
-from fastapi import APIRouter, Depends
+from typing import List, Union
+from fastapi import APIRouter, Depends, Query, UploadFile, File
 from fastapi import responses
 
 from auth import get_current_user, get_db
 import json_classes
 import logic.courses
+import logic.grading
 import logic.students
+import logic.submissions
 import logic.assignments
 
 router = APIRouter()
@@ -16,8 +18,23 @@ async def available_courses(user_email: str = Depends(get_current_user)):
     """
     Get the list of IDs of courses available for user (as a teacher, student, or parent).
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic.courses.available_courses(db_cursor, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.courses.available_courses(db_cursor, user_email)
+
+
+@router.get("/get_my_courses", response_model=List[json_classes.CourseWithRole], tags=["Courses"])
+async def get_my_courses(memberships_only: bool = False, user_email: str = Depends(get_current_user)):
+    """
+    Get information about all courses available for user, for the courses dashboard.
+
+    For every course returns course_id, title, creation date, number of enrolled students,
+    and the roles of the user in it, as in `get_course_info` and `get_user_role`.
+
+    Admins receive all courses in the system, unless `memberships_only` is set.
+    The newest courses go first.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.courses.get_courses_dashboard(db_cursor, user_email, memberships_only)
 
 
 @router.get("/get_all_courses", response_model=List[json_classes.CourseId], tags=["Courses"])
@@ -27,8 +44,8 @@ async def get_all_courses(user_email: str = Depends(get_current_user)):
 
     Admin role required.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic.courses.get_all_courses(db_cursor, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.courses.get_all_courses(db_cursor, user_email)
 
 
 @router.post("/create_course", response_model=json_classes.CourseId, tags=["Courses"])
@@ -36,8 +53,8 @@ async def create_course(title: str, user_email: str = Depends(get_current_user))
     """
     Create the course with provided title and become a teacher in it.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic.courses.create_course(db_conn, db_cursor, title, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.courses.create_course(db_conn, db_cursor, title, user_email)
 
 
 # WARNING: update if new elements appear
@@ -47,11 +64,12 @@ async def remove_course(course_id: str, user_email: str = Depends(get_current_us
     Remove the course with provided course_id.
 
     All the course materials, teachers, students, and parents will be also removed.
+    The course disappears at once, and its contents are removed in the background.
 
     Teacher role required.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic.courses.remove_course(db_conn, db_cursor, course_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.courses.remove_course(db_conn, db_cursor, course_id, user_email)
 
 
 @router.get("/get_course_info", response_model=json_classes.Course, tags=["Courses"])
@@ -59,21 +77,48 @@ async def get_course_info(course_id: str, user_email: str = Depends(get_current_
     """
     Get information about the course: course_id, title, creation date, and number of enrolled students.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic.courses.get_course_info(db_cursor, course_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.courses.get_course_info(db_cursor, course_id, user_email)
 
 
 @router.get("/get_course_feed", response_model=List[json_classes.CoursePost], tags=["Courses"])
-async def get_course_feed(course_id: str, user_email: str = Depends(get_current_user)):
+async def get_course_feed(
+    course_id: str,
+    cursor: Union[str, None] = None,
+    limit: Union[int, None] = Query(default=None, ge=1, le=100),
+    user_email: str = Depends(get_current_user),
+):
     """
     Get the course feed with all its materials.
 
     Materials are ordered by creation_date, the first posts are new.
 
-    Returns the list of (course_id, post_id, type, timeadded, author) for each material.
+    Returns the list of (course_id, post_id, type, timeadded, author, cursor) for each material.
+
+    Without `limit` the whole feed is returned. Otherwise at most `limit` posts are returned;
+    to get the next page, pass the `cursor` of the last post received.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.courses.get_course_feed(db_cursor, course_id, cursor, limit, user_email)
+
+
+@router.get("/get_course_feed_expanded", response_model=List[json_classes.ExpandedCoursePost], tags=["Courses"])
+async def get_course_feed_expanded(
+    course_id: str,
+    cursor: Union[str, None] = None,
+    limit: Union[int, None] = Query(default=None, ge=1, le=100),
+    user_email: str = Depends(get_current_user),
+):
+    """
+    Get the course feed like `get_course_feed`, together with the details of every post.
+
+    In addition to the fields of `get_course_feed`, returns the title, description and author name
+    of each material or assignment, and the list of (file_id, filename, upload_time) for its attachments.
+
+    Paginated by `cursor` and `limit` in the same way as `get_course_feed`.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic.courses.get_course_feed(db_cursor, course_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.courses.get_course_feed_expanded(db_cursor, course_id, cursor, limit, user_email)
 
 
 @router.get("/download_full_course_grade_table", tags=["Courses"])
@@ -81,7 +126,7 @@ async def download_full_course_grade_table(course_id: str, user_email: str = Dep
     """
     Download a CSV file (comma-separated, CRLF newlines) with all grades of all students.
 
-    COLUMNS: student login, student display name, then assignment names
+    COLUMNS: student login, student display name, then assignment titles
 
     Teacher OR parent OR student role required.
 
@@ -91,12 +136,34 @@ async def download_full_course_grade_table(course_id: str, user_email: str = Dep
 
     Students only see themselves.
     """
-    with get_db() as (db_conn, db_cursor):
-        students = logic.courses.get_students_accessible_by(db_cursor, course_id, user_email)
-        gradables = logic.assignments.get_all_assignments(db_cursor, course_id, user_email)
-        csv_text = logic.courses.get_grade_table_csv(db_cursor, course_id, students, gradables, user_email)
-        return responses.PlainTextResponse(csv_text, media_type="text/csv",
-                                           headers={'Content-Disposition': 'filename=report.csv'})
+    async with get_db() as (db_conn, db_cursor):
+        assignments, students = await logic.courses.get_grade_table_csv_columns(db_cursor, course_id, user_email)
+    return responses.StreamingResponse(logic.courses.stream_grade_table_csv(course_id, assignments, students),
+                                       media_type="text/csv",
+                                       headers={'Content-Disposition': 'filename=report.csv'})
+
+
+@router.post("/upload_full_course_grade_table", response_model=List[json_classes.GradeRowResult], tags=["Courses"])
+async def upload_full_course_grade_table(
+    course_id: str,
+    file: UploadFile = File(...),
+    user_email: str = Depends(get_current_user),
+):
+    """
+    Set grades from a CSV file in the format of `download_full_course_grade_table`.
+
+    COLUMNS: student login, student display name (ignored), then assignment titles
+
+    Empty cells are ignored. Submissions that already have the grade are not changed,
+    so a downloaded table can be edited and uploaded back.
+
+    Returns the result for every grade like `grade_submissions`, with rows numbered by lines of the file,
+    the header being line 1.
+
+    Teacher role required.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.submissions.import_grade_table_csv(db_conn, db_cursor, course_id, file, user_email)
 
 
 @router.get("/get_full_course_grade_table_json", response_model=json_classes.GradeTable, tags=["Courses"])
@@ -112,8 +179,119 @@ async def get_full_course_grade_table_json(course_id: str, user_email: str = Dep
 
     Students only see themselves.
     """
-    with get_db() as (db_conn, db_cursor):
-        students = logic.courses.get_students_accessible_by(db_cursor, course_id, user_email)
-        gradables = logic.assignments.get_all_assignments(db_cursor, course_id, user_email)
-        grades = logic.courses.get_grade_table(db_cursor, course_id, students, gradables, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        students = await logic.courses.get_students_accessible_by(db_cursor, course_id, user_email)
+        gradables = await logic.assignments.get_all_assignments(db_cursor, course_id, user_email)
+        grades = await logic.courses.get_grade_table(db_cursor, course_id, students, gradables, user_email)
         return {"rows": [{"email": email, "grades": graderow} for email, graderow in zip(students, grades)]}
+
+
+@router.get("/get_grade_summaries", response_model=List[json_classes.GradeSummary], tags=["Courses"])
+async def get_grade_summaries(course_id: str, user_email: str = Depends(get_current_user)):
+    """
+    Get the summary of grades of every student: the number of graded submissions, the average grade,
+    and the time of the last change of their grades.
+
+    The summaries are kept up to date on grading, so this is cheaper than loading the grade table.
+
+    Teacher OR parent OR student role required, with the same visibility as `get_full_course_grade_table_json`.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.grading.get_grade_summaries(db_cursor, course_id, user_email)
+
+
+@router.get("/get_grade_categories", response_model=List[json_classes.GradeCategory], tags=["Courses"])
+async def get_grade_categories(course_id: str, user_email: str = Depends(get_current_user)):
+    """
+    Get the assignment categories of the course with their weights in the final course grade.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.grading.get_grade_categories(db_cursor, course_id, user_email)
+
+
+@router.post("/set_grade_category", response_model=json_classes.Success, tags=["Courses"])
+async def set_grade_category(
+    course_id: str,
+    name: str,
+    weight: float,
+    user_email: str = Depends(get_current_user),
+):
+    """
+    Create the assignment category with provided name and weight, or change the weight of an existing one.
+
+    Weights are relative: a category of weight 2 counts twice as much as a category of weight 1.
+
+    Teacher role required.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.grading.set_grade_category(db_conn, db_cursor, course_id, name, weight, user_email)
+
+
+@router.post("/remove_grade_category", response_model=json_classes.Success, tags=["Courses"])
+async def remove_grade_category(course_id: str, name: str, user_email: str = Depends(get_current_user)):
+    """
+    Remove the assignment category. Its assignments become uncategorized.
+
+    Teacher role required.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.grading.remove_grade_category(db_conn, db_cursor, course_id, name, user_email)
+
+
+@router.post("/set_assignment_category", response_model=json_classes.Success, tags=["Courses"])
+async def set_assignment_category(
+    course_id: str,
+    assignment_id: str,
+    category: Union[str, None] = None,
+    user_email: str = Depends(get_current_user),
+):
+    """
+    Put the assignment into the category, or make it uncategorized if no category is provided.
+
+    Teacher role required.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.grading.set_assignment_category(db_conn, db_cursor, course_id, assignment_id, category, user_email)
+
+
+@router.get("/get_course_final_grades", response_model=json_classes.FinalGradeTable, tags=["Courses"])
+async def get_course_final_grades(
+    course_id: str,
+    missing_as_zero: bool = False,
+    user_email: str = Depends(get_current_user),
+):
+    """
+    Get the final course grades of students, weighted by assignment categories.
+
+    The grade in a category is the average of its counted grades. The final grade is the weighted average
+    of the grades in categories, leaving out the categories where the student has no counted grades.
+    Uncategorized assignments make up one more category of weight 1, listed last with the name `null`.
+
+    Submissions that are not graded yet are not counted. Assignments that the student did not submit
+    are not counted either, or count as 0 with `missing_as_zero`.
+
+    Returns the categories, and for every student their final grade and grades in the categories,
+    `null` where there are no counted grades.
+
+    Teacher OR parent OR student role required, with the same visibility as `get_full_course_grade_table_json`.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.grading.get_course_final_grades(db_cursor, course_id, missing_as_zero, user_email)
+
+
+@router.get("/get_assignment_grade_statistics", response_model=List[json_classes.AssignmentGradeStatistics], tags=["Courses"])
+async def get_assignment_grade_statistics(
+    course_id: str,
+    missing_as_zero: bool = False,
+    user_email: str = Depends(get_current_user),
+):
+    """
+    Get the statistics of every assignment of the course over all enrolled students:
+    numbers of submitted, graded, and missing submissions, and mean, median, and standard deviation of grades.
+
+    Grades are counted in the same way as in `get_course_final_grades`.
+
+    Teacher role required.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic.grading.get_assignment_grade_statistics(db_cursor, course_id, missing_as_zero, user_email)
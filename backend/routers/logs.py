@@ -0,0 +1,33 @@
+from datetime import datetime
+from typing import Union
+from fastapi import APIRouter, Depends, Query
+
+from auth import get_current_user, get_db
+from logic.logging import get_logs as logic_get_logs
+import json_classes
+
+router = APIRouter()
+
+
+@router.get("/get_logs", response_model=json_classes.LogPage, tags=["Logs"])
+async def get_logs(
+    tag: Union[str, None] = None,
+    actor: Union[str, None] = None,
+    course_id: Union[str, None] = None,
+    since: Union[datetime, None] = None,
+    until: Union[datetime, None] = None,
+    cursor: Union[str, None] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    user_email: str = Depends(get_current_user),
+):
+    """
+    Get the audit logs, from the newest, optionally filtered by tag, actor email, course_id
+    and the time range from `since` to `until` (UTC, ISO 8601).
+
+    Return at most `limit` entries and `next_cursor`; pass it as `cursor` to get the next page.
+    `next_cursor` is null on the last page.
+
+    Admin role required.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_logs(db_cursor, tag, actor, course_id, since, until, cursor, limit, user_email)
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, UploadFile, File
-from typing import List
+from fastapi import APIRouter, Depends, UploadFile, File, Header
+from typing import List, Union
 
 from auth import get_current_user, get_db, get_storage_db
 import json_classes
@@ -29,8 +29,8 @@ async def create_material(
 
     Returns the (course_id, material_id) for the new material in case of success.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_create_material(db_conn, db_cursor, course_id, title, description, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_create_material(db_conn, db_cursor, course_id, title, description, user_email)
 
 
 @router.post("/remove_material", response_model=json_classes.Success, tags=["Materials"])
@@ -40,8 +40,8 @@ async def remove_material(course_id: str, material_id: str, user_email: str = De
 
     Teacher role required.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_remove_material(db_conn, db_cursor, course_id, material_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_remove_material(db_conn, db_cursor, course_id, material_id, user_email)
 
 
 @router.get("/get_material", response_model=json_classes.Material, tags=["Materials"])
@@ -55,8 +55,8 @@ async def get_material(course_id: str, material_id: str, user_email: str = Depen
 
     The format of creation time is TIME_FORMAT.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_material(db_cursor, course_id, material_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_material(db_cursor, course_id, material_id, user_email)
 
 
 @router.post("/create_material_attachment", response_model=json_classes.MaterialAttachmentMetadata, tags=["Materials"])
@@ -75,7 +75,7 @@ async def create_material_attachment(
 
     The format of upload_time is TIME_FORMAT.
     """
-    with get_db() as (db_conn, db_cursor), get_storage_db() as (storage_db_conn, storage_db_cursor):
+    async with get_db() as (db_conn, db_cursor), get_storage_db() as (storage_db_conn, storage_db_cursor):
         return await logic_create_material_attachment(db_conn, db_cursor, storage_db_conn, storage_db_cursor, course_id, material_id, file, user_email)
 
 
@@ -88,14 +88,26 @@ async def get_material_attachments(course_id: str, material_id: str, user_email:
 
     The format of upload_time is TIME_FORMAT.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_material_attachments(db_cursor, course_id, material_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_material_attachments(db_cursor, course_id, material_id, user_email)
 
 
 @router.get("/download_material_attachment", tags=["Materials"])
-async def download_material_attachment(course_id: str, material_id: str, file_id: str, user_email: str = Depends(get_current_user)):
+async def download_material_attachment(
+    course_id: str,
+    material_id: str,
+    file_id: str,
+    range_header: Union[str, None] = Header(default=None, alias="Range"),
+    if_none_match: Union[str, None] = Header(default=None, alias="If-None-Match"),
+    user_email: str = Depends(get_current_user),
+):
     """
     Download the course material attachment by provided course_id, material_id, file_id.
+
+    Supports the `Range` header with a single byte range, answering 206 Partial Content.
+
+    Attachments never change, so the response carries an `ETag` and may be cached by the client.
+    A request with a matching `If-None-Match` is answered with 304 Not Modified.
     """
-    with get_db() as (db_conn, db_cursor), get_storage_db() as (storage_db_conn, storage_db_cursor):
-        return logic_download_material_attachment(db_cursor, storage_db_cursor, course_id, material_id, file_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_download_material_attachment(db_cursor, course_id, material_id, file_id, range_header, if_none_match, user_email)
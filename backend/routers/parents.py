@@ -22,8 +22,8 @@ async def get_students_parents(course_id: str, student_email: str, user_email: s
     """
 
     # connection to database
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_students_parents(db_cursor, course_id, student_email, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_students_parents(db_cursor, course_id, student_email, user_email)
 
 
 @router.post("/invite_parent", response_model=json_classes.Success, tags=["Parents"])
@@ -40,8 +40,8 @@ async def invite_parent(
     """
 
     # connection to database
-    with get_db() as (db_conn, db_cursor):
-        return logic_invite_parent(db_conn, db_cursor, course_id, student_email, parent_email, teacher_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_invite_parent(db_conn, db_cursor, course_id, student_email, parent_email, teacher_email)
 
 
 @router.post("/remove_parent", response_model=json_classes.Success, tags=["Parents"])
@@ -60,8 +60,8 @@ async def remove_parent(
     """
 
     # connection to database
-    with get_db() as (db_conn, db_cursor):
-        return logic_remove_parent(db_conn, db_cursor, course_id, student_email, parent_email, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_remove_parent(db_conn, db_cursor, course_id, student_email, parent_email, user_email)
 
 
 @router.get("/get_parents_children", response_model=List[json_classes.User], tags=["Parents"])
@@ -73,5 +73,5 @@ async def get_parents_children(course_id: str, user_email: str = Depends(get_cur
     """
 
     # connection to database
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_parents_children(db_cursor, course_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_parents_children(db_cursor, course_id, user_email)
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends
+
+from auth import get_current_user, get_db
+from logic.storage import (
+    run_garbage_collection as logic_run_garbage_collection,
+    get_garbage_collection_stats as logic_get_garbage_collection_stats,
+)
+import json_classes
+
+router = APIRouter()
+
+
+@router.post("/collect_storage_garbage", response_model=json_classes.GarbageCollectionRun, tags=["Storage"])
+async def collect_storage_garbage(dry_run: bool = True, user_email: str = Depends(get_current_user)):
+    """
+    Delete the stored contents that no attachment refers to anymore, and return the statistics of the collection.
+
+    With `dry_run` (the default), nothing is deleted, and `orphaned_blobs` and `orphaned_bytes`
+    tell what would be. Contents uploaded within the grace period are never deleted.
+
+    The collection also runs periodically in the background.
+
+    Admin role required.
+    """
+    return await logic_run_garbage_collection(dry_run, user_email)
+
+
+@router.get("/get_storage_garbage_stats", response_model=json_classes.GarbageCollectionStats, tags=["Storage"])
+async def get_storage_garbage_stats(user_email: str = Depends(get_current_user)):
+    """
+    Get the settings of the garbage collection, the totals of all collections made so far by any worker,
+    and the last collection.
+
+    Every collection is also logged with the `storage gc` tag.
+
+    Admin role required.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_garbage_collection_stats(db_cursor, user_email)
@@ -1,5 +1,5 @@
 from typing import List
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, UploadFile, File
 
 from auth import get_current_user, get_db
 import json_classes
@@ -8,6 +8,10 @@ from logic.students import (
     invite_student as logic_invite_student,
     remove_student as logic_remove_student,
 )
+from logic.roster import (
+    enroll_roster_json as logic_enroll_roster_json,
+    enroll_roster_csv as logic_enroll_roster_csv,
+)
 
 router = APIRouter()
 
@@ -19,8 +23,8 @@ async def get_enrolled_students(course_id: str, user_email: str = Depends(get_cu
 
     Return the email and name of each student.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_enrolled_students(db_cursor, course_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_enrolled_students(db_cursor, course_id, user_email)
 
 
 @router.post("/invite_student", response_model=json_classes.Success, tags=["Students"])
@@ -30,8 +34,8 @@ async def invite_student(course_id: str, student_email: str, teacher_email: str
 
     Teacher role required.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_invite_student(db_conn, db_cursor, course_id, student_email, teacher_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_invite_student(db_conn, db_cursor, course_id, student_email, teacher_email)
 
 
 @router.post("/remove_student", response_model=json_classes.Success, tags=["Students"])
@@ -43,5 +47,44 @@ async def remove_student(course_id: str, student_email: str, user_email: str = D
 
     Student can only remove themselves.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_remove_student(db_conn, db_cursor, course_id, student_email, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_remove_student(db_conn, db_cursor, course_id, student_email, user_email)
+
+
+@router.post("/enroll_roster", response_model=json_classes.RosterReport, tags=["Students"])
+async def enroll_roster(course_id: str, roster: json_classes.Roster, teacher_email: str = Depends(get_current_user)):
+    """
+    Add many students to the course with provided course_id, and invite parents for them, at once.
+
+    `students` is the list of emails of students, and `parents` is the list of (student_email, parent_email)
+    pairs. A parent can be invited for a student enrolled in the same roster.
+
+    Every row is checked like in `invite_student` and `invite_parent`. The valid rows are added,
+    and the result is reported for each row: its number in its list, starting from 1, the emails,
+    the status ("added", "skipped" if it is already there, or "failed"), and the details.
+
+    Teacher role required.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_enroll_roster_json(db_conn, db_cursor, course_id, roster, teacher_email)
+
+
+@router.post("/enroll_roster_csv", response_model=json_classes.RosterReport, tags=["Students"])
+async def enroll_roster_csv(
+    course_id: str,
+    file: UploadFile = File(...),
+    teacher_email: str = Depends(get_current_user),
+):
+    """
+    Add many students and their parents to the course like `enroll_roster`, from a CSV file.
+
+    The file has a header line with a `student_email` column and an optional `parent_email` column.
+    Every line enrolls the student and invites the parent for them, if it is given;
+    a student with several parents takes several lines.
+
+    Rows in the report are numbered by lines of the file, the header being line 1.
+
+    Teacher role required.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_enroll_roster_csv(db_conn, db_cursor, course_id, file, teacher_email)
@@ -1,5 +1,5 @@
-from fastapi import APIRouter, Depends, UploadFile, File
-from typing import List
+from fastapi import APIRouter, Depends, UploadFile, File, Header
+from typing import List, Union
 
 from auth import get_current_user, get_db, get_storage_db
 import json_classes
@@ -8,9 +8,11 @@ from logic.submissions import (
     get_assignment_submissions as logic_get_assignment_submissions,
     get_submission as logic_get_submission,
     grade_submission as logic_grade_submission,
+    grade_submissions as logic_grade_submissions,
     create_submission_attachment as logic_create_submission_attachment,
     get_submission_attachments as logic_get_submission_attachments,
     download_submission_attachment as logic_download_submission_attachment,
+    download_assignment_submissions as logic_download_assignment_submissions,
 )
 
 
@@ -33,8 +35,8 @@ async def submit_assignment(
     """
 
     # connection to database
-    with get_db() as (db_conn, db_cursor):
-        return logic_submit_assignment(db_conn, db_cursor, course_id, assignment_id, comment, student_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_submit_assignment(db_conn, db_cursor, course_id, assignment_id, comment, student_email)
 
 
 @router.get("/get_assignment_submissions", response_model=List[json_classes.Submission], tags=["Submissions"])
@@ -54,8 +56,8 @@ async def get_assignment_submissions(course_id: str, assignment_id: str, user_em
     """
 
     # connection to database
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_assignment_submissions(db_cursor, course_id, assignment_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_assignment_submissions(db_cursor, course_id, assignment_id, user_email)
 
 
 @router.get("/get_submission", response_model=json_classes.Submission, tags=["Submissions"])
@@ -80,8 +82,8 @@ async def get_submission(
     """
 
     # connection to database
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_submission(db_cursor, course_id, assignment_id, student_email, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_submission(db_cursor, course_id, assignment_id, student_email, user_email)
 
 
 @router.post("/grade_submission", response_model=json_classes.Success, tags=["Submissions"])
@@ -99,8 +101,8 @@ async def grade_submission(
     """
 
     # connection to database
-    with get_db() as (db_conn, db_cursor):
-        return logic_grade_submission(
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_grade_submission(
             db_conn,
             db_cursor,
             course_id,
@@ -111,6 +113,28 @@ async def grade_submission(
         )
 
 
+@router.post("/grade_submissions", response_model=List[json_classes.GradeRowResult], tags=["Submissions"])
+async def grade_submissions(
+    course_id: str,
+    assignment_id: str,
+    batch: json_classes.GradeBatch,
+    user_email: str = Depends(get_current_user),
+):
+    """
+    Allows teacher to grade many submissions of the assignment at once.
+
+    `grades` is the list of (student_email, grade) pairs.
+
+    Returns the result for every pair: its number in the list, starting from 1, the student_email,
+    assignment_id and grade, the status ("graded", "skipped" if the submission already has the grade
+    or the student is listed twice, or "failed"), and the details.
+
+    Teacher role required.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_grade_submissions(db_conn, db_cursor, course_id, assignment_id, batch.grades, user_email)
+
+
 @router.post("/create_submission_attachment", response_model=json_classes.SubmissionAttachmentMetadata, tags=["Submissions"])
 async def create_submission_attachment(
     course_id: str,
@@ -128,7 +152,7 @@ async def create_submission_attachment(
 
     The format of upload_time is TIME_FORMAT.
     """
-    with get_db() as (db_conn, db_cursor), get_storage_db() as (storage_db_conn, storage_db_cursor):
+    async with get_db() as (db_conn, db_cursor), get_storage_db() as (storage_db_conn, storage_db_cursor):
         return await logic_create_submission_attachment(db_conn, db_cursor, storage_db_conn, storage_db_cursor, course_id, assignment_id, student_email, file, user_email)
 
 
@@ -141,14 +165,43 @@ async def get_submission_attachments(course_id: str, assignment_id: str, student
 
     The format of upload_time is TIME_FORMAT.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_submission_attachments(db_cursor, course_id, assignment_id, student_email, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_submission_attachments(db_cursor, course_id, assignment_id, student_email, user_email)
 
 
 @router.get("/download_submission_attachment", tags=["Submissions"])
-async def download_submission_attachment(course_id: str, assignment_id: str, student_email: str, file_id: str, user_email: str = Depends(get_current_user)):
+async def download_submission_attachment(
+    course_id: str,
+    assignment_id: str,
+    student_email: str,
+    file_id: str,
+    range_header: Union[str, None] = Header(default=None, alias="Range"),
+    if_none_match: Union[str, None] = Header(default=None, alias="If-None-Match"),
+    user_email: str = Depends(get_current_user),
+):
     """
     Download the attachment to the course assignment submission by provided course_id, assignment_id, student_email, file_id.
+
+    Supports the `Range` header with a single byte range, answering 206 Partial Content.
+
+    Attachments never change, so the response carries an `ETag` and may be cached by the client.
+    A request with a matching `If-None-Match` is answered with 304 Not Modified.
+    """
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_download_submission_attachment(db_cursor, course_id, assignment_id, student_email, file_id, range_header, if_none_match, user_email)
+
+
+@router.get("/download_assignment_submissions", tags=["Submissions"])
+async def download_assignment_submissions(course_id: str, assignment_id: str, user_email: str = Depends(get_current_user)):
+    """
+    Download a ZIP archive with the attachments of all submissions of the assignment.
+
+    The attachments of every student are in a directory named by the student's email.
+    Files with the same name are numbered: "report.pdf", "report (2).pdf", and so on.
+
+    The archive is streamed while it is built, so its size is not known in advance.
+
+    Teacher role required.
     """
-    with get_db() as (db_conn, db_cursor), get_storage_db() as (storage_db_conn, storage_db_cursor):
-        return logic_download_submission_attachment(db_cursor, storage_db_cursor, course_id, assignment_id, student_email, file_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_download_assignment_submissions(db_cursor, course_id, assignment_id, user_email)
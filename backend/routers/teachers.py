@@ -17,8 +17,8 @@ async def get_course_teachers(course_id: str, user_email: str = Depends(get_curr
     """
     Get the list of teachers teaching the course with the provided course_id.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_course_teachers(db_cursor, course_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_course_teachers(db_cursor, course_id, user_email)
 
 
 @router.post("/invite_teacher", response_model=json_classes.Success, tags=["Teachers"])
@@ -32,8 +32,8 @@ async def invite_teacher(
 
     Teacher role required.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_invite_teacher(db_conn, db_cursor, course_id, new_teacher_email, teacher_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_invite_teacher(db_conn, db_cursor, course_id, new_teacher_email, teacher_email)
 
 
 @router.post("/remove_teacher", response_model=json_classes.Success, tags=["Teachers"])
@@ -51,5 +51,5 @@ async def remove_teacher(
 
     At least one teacher should stay in the course.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_remove_teacher(db_conn, db_cursor, course_id, removing_teacher_email, teacher_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_remove_teacher(db_conn, db_cursor, course_id, removing_teacher_email, teacher_email)
@@ -23,8 +23,8 @@ async def get_user_info(user_email: str = Depends(get_current_user)):
     """
     Get the info about the user.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_user_info(db_cursor, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_user_info(db_cursor, user_email)
 
 
 @router.get("/get_user_role", response_model=json_classes.CourseRole, tags=["Users"])
@@ -32,8 +32,8 @@ async def get_user_role(course_id: str, user_email: str = Depends(get_current_us
     """
     Get the user's role in the provided course.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_user_role(db_cursor, course_id, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_user_role(db_cursor, course_id, user_email)
 
 
 @router.post("/create_user", response_model=json_classes.Account, tags=["Users"])
@@ -45,10 +45,13 @@ async def create_user(user: json_classes.UserCreate):
 
     User password should have at least 8 symbols and contain digits, letters, and special symbols.
 
+    The email of a removed user can be registered again; what is left of that user is purged first,
+    which may make the request take longer.
+
     Returns email and JWT access token for 30 minutes.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_create_user(db_conn, db_cursor, user)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_create_user(db_conn, db_cursor, user)
 
 
 @router.post("/login", response_model=json_classes.Account, tags=["Users"])
@@ -58,8 +61,8 @@ async def login(user: json_classes.UserLogin):
 
     Returns email and JWT access token for 30 minutes.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_login(db_cursor, user)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_login(db_cursor, user)
 
 
 @router.post("/change_password", response_model=json_classes.Success, tags=["Users"])
@@ -67,8 +70,8 @@ async def change_password(user: json_classes.UserNewPassword):
     """
     Change the user password to a new one.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_change_password(db_conn, db_cursor, user)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_change_password(db_conn, db_cursor, user)
 
 
 @router.post("/remove_user", response_model=json_classes.Success, tags=["Users"])
@@ -83,9 +86,12 @@ async def remove_user(user_email: str = Depends(get_current_user)):
     The user's assignment submissions will be removed.
 
     Courses where the user is the only Teacher will be deleted.
+
+    The account disappears at once, and its submissions are removed in the background;
+    until then, the email cannot be registered again.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_remove_user(db_conn, db_cursor, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_remove_user(db_conn, db_cursor, user_email)
 
 
 @router.post("/give_admin_permissions", response_model=json_classes.Success, tags=["Users"])
@@ -95,8 +101,8 @@ async def give_admin_permissions(object_email: str, subject_email: str = Depends
 
     Admin role required.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_give_admin_permissions(db_conn, db_cursor, object_email, subject_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_give_admin_permissions(db_conn, db_cursor, object_email, subject_email)
 
 
 @router.get("/get_all_users", response_model=List[json_classes.User], tags=["Users"])
@@ -108,8 +114,8 @@ async def get_all_users(user_email: str = Depends(get_current_user)):
 
     Admin role required.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_all_users(db_cursor, user_email)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_all_users(db_cursor, user_email)
 
 
 @router.get("/get_admins", response_model=List[json_classes.User], tags=["Users"])
@@ -117,5 +123,5 @@ async def get_admins(user_email: str = Depends(get_current_user)):
     """
     Get the list of platform administrators.
     """
-    with get_db() as (db_conn, db_cursor):
-        return logic_get_admins(db_cursor)
+    async with get_db() as (db_conn, db_cursor):
+        return await logic_get_admins(db_cursor)
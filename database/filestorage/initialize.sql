@@ -1,7 +1,28 @@
 CREATE DATABASE edhub_storage;
 \c edhub_storage
 
-CREATE TABLE files(
-    id uuid PRIMARY KEY,
-    content bytea NOT NULL
+-- contents are stored once per distinct SHA-256 hash and shared by all the attachments with them;
+-- `backend` is the storage backend holding the contents;
+-- `referenced` is the time of the last upload of the contents, so that the garbage collector
+-- leaves alone the blobs whose uploads are not registered in the system database yet
+CREATE TABLE blobs(
+    hash bytea PRIMARY KEY,
+    size bigint NOT NULL,
+    refcount int NOT NULL,
+    backend text NOT NULL,
+    referenced timestamp NOT NULL DEFAULT now()
 );
+
+CREATE INDEX ON blobs(backend);
+
+-- contents of the blobs in the postgres backend are stored as consecutive chunks,
+-- so that uploads can be written and byte ranges can be read without holding the whole file in memory
+CREATE TABLE blob_chunks(
+    hash bytea NOT NULL REFERENCES blobs(hash) ON DELETE CASCADE,
+    pos bigint NOT NULL,
+    data bytea NOT NULL,
+    PRIMARY KEY (hash, pos)
+);
+
+-- chunks are mostly incompressible, skip trying
+ALTER TABLE blob_chunks ALTER COLUMN data SET STORAGE EXTERNAL;
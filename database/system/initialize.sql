@@ -1,18 +1,34 @@
 CREATE DATABASE edhub;
 \c edhub
 
+-- deleted users and courses are hidden at once, and purged in the background in small batches;
+-- `deleted` is the time of the deletion
 CREATE TABLE users(
     email text PRIMARY KEY CHECK (length(email) <= 254),
     publicname text NOT NULL CHECK (length(publicname) <= 128),
     isadmin bool NOT NULL DEFAULT 'f',
     timeregistered timestamp NOT NULL,
-    passwordhash text NOT NULL
+    passwordhash text NOT NULL,
+    deleted timestamp NULL
 );
 
+CREATE INDEX ON users(deleted) WHERE deleted IS NOT NULL;
+
 CREATE TABLE courses(
     courseid uuid PRIMARY KEY,
     name text NOT NULL CHECK (length(name) <= 128),
-    timecreated timestamp NOT NULL
+    timecreated timestamp NOT NULL,
+    deleted timestamp NULL
+);
+
+CREATE INDEX ON courses(deleted) WHERE deleted IS NOT NULL;
+
+-- weights of assignment categories in the final course grade, relative to each other
+CREATE TABLE grade_categories(
+    courseid uuid REFERENCES courses ON DELETE CASCADE,
+    name text NOT NULL CHECK (length(name) <= 100),
+    weight double precision NOT NULL CHECK (weight > 0),
+    PRIMARY KEY (courseid, name)
 );
 
 CREATE TABLE course_materials(
@@ -25,6 +41,9 @@ CREATE TABLE course_materials(
     PRIMARY KEY (courseid, matid)
 );
 
+CREATE INDEX ON course_materials(courseid, timeadded, matid);
+CREATE INDEX ON course_materials(author) WHERE author IS NOT NULL;
+
 CREATE TABLE course_assignments(
     courseid uuid REFERENCES courses ON DELETE CASCADE,
     assid serial NOT NULL,
@@ -32,9 +51,14 @@ CREATE TABLE course_assignments(
     author text NULL REFERENCES users(email) ON DELETE SET NULL,
     name text NOT NULL CHECK (length(name) <= 100),
     description text NOT NULL CHECK (length(description) <= 1000),
+    category text NULL,
+    FOREIGN KEY (courseid, category) REFERENCES grade_categories ON DELETE SET NULL (category),
     PRIMARY KEY (courseid, assid)
 );
 
+CREATE INDEX ON course_assignments(courseid, timeadded, assid);
+CREATE INDEX ON course_assignments(author) WHERE author IS NOT NULL;
+
 CREATE TABLE course_assignments_submissions(
     courseid uuid REFERENCES courses ON DELETE CASCADE,
     assid int NOT NULL,
@@ -48,18 +72,37 @@ CREATE TABLE course_assignments_submissions(
     PRIMARY KEY (courseid, assid, email)
 );
 
+CREATE INDEX ON course_assignments_submissions(email);
+CREATE INDEX ON course_assignments_submissions(gradedby) WHERE gradedby IS NOT NULL;
+
 CREATE TABLE teaches(
     email text REFERENCES users ON DELETE CASCADE,
     courseid uuid REFERENCES courses ON DELETE CASCADE,
     PRIMARY KEY (email, courseid)
 );
 
+CREATE INDEX ON teaches(courseid);
+
 CREATE TABLE student_at(
     email text REFERENCES users ON DELETE CASCADE,
     courseid uuid REFERENCES courses ON DELETE CASCADE,
     PRIMARY KEY (email, courseid)
 );
 
+CREATE INDEX ON student_at(courseid);
+
+-- grades of every student in the course, kept up to date on every change of their grades
+CREATE TABLE grade_summaries(
+    courseid uuid NOT NULL,
+    email text NOT NULL,
+    gradedcount int NOT NULL DEFAULT 0 CHECK (gradedcount >= 0),
+    gradesum bigint NOT NULL DEFAULT 0,
+    average double precision GENERATED ALWAYS AS (gradesum::double precision / NULLIF(gradedcount, 0)) STORED,
+    lastgraded timestamp NULL,
+    FOREIGN KEY (email, courseid) REFERENCES student_at ON DELETE CASCADE,
+    PRIMARY KEY (courseid, email)
+);
+
 CREATE TABLE parent_of_at_course(
     parentemail text REFERENCES users ON DELETE CASCADE,
     studentemail text REFERENCES users ON DELETE CASCADE,
@@ -68,39 +111,65 @@ CREATE TABLE parent_of_at_course(
     PRIMARY KEY (parentemail, studentemail, courseid)
 );
 
+CREATE INDEX ON parent_of_at_course(courseid, studentemail);
+
+-- partitioned by days in UTC; the backend creates upcoming partitions and drops expired ones,
+-- along with a default partition for events outside of them
 CREATE TABLE logs(
+    id bigserial,
     t timestamp NOT NULL,
     tag text NOT NULL,
-    msg text NOT NULL
-);
-
-CREATE TABLE material_files(
+    msg text NOT NULL,
+    actor text,
     courseid uuid,
+    objectid text
+) PARTITION BY RANGE (t);
+
+-- logs are listed from the newest, with (t, id) as the pagination key
+CREATE INDEX ON logs(t, id);
+CREATE INDEX ON logs(courseid, t, id) WHERE courseid IS NOT NULL;
+CREATE INDEX ON logs(actor, t, id) WHERE actor IS NOT NULL;
+CREATE INDEX ON logs(tag, t, id);
+
+-- every attachment, keyed by its id, together with the material, assignment or submission owning it
+CREATE TABLE files(
+    fileid uuid PRIMARY KEY,
+    courseid uuid NOT NULL,
     matid int,
-    fileid uuid,
+    assid int,
+    email text,
+    blobhash bytea NOT NULL,
     filename text NOT NULL CHECK (length(filename) <= 256),
     uploadtime timestamp NOT NULL,
     FOREIGN KEY (courseid, matid) REFERENCES course_materials ON DELETE CASCADE,
-    PRIMARY KEY (courseid, matid, fileid)
+    FOREIGN KEY (courseid, assid) REFERENCES course_assignments ON DELETE CASCADE,
+    FOREIGN KEY (courseid, assid, email) REFERENCES course_assignments_submissions ON DELETE CASCADE,
+    -- files of a material, of an assignment, or of a submission to an assignment if email is set
+    CHECK ((matid IS NULL) <> (assid IS NULL)),
+    CHECK (email IS NULL OR assid IS NOT NULL)
 );
 
-CREATE TABLE assignment_files(
-    courseid uuid,
-    assid int,
-    fileid uuid,
-    filename text NOT NULL CHECK (length(filename) <= 256),
-    uploadtime timestamp NOT NULL,
-    FOREIGN KEY (courseid, assid) REFERENCES course_assignments ON DELETE CASCADE,
-    PRIMARY KEY (courseid, assid, fileid)
+CREATE INDEX ON files(courseid, matid) WHERE matid IS NOT NULL;
+CREATE INDEX ON files(courseid, assid, email) WHERE assid IS NOT NULL;
+-- the storage garbage collector counts the files referring to every blob
+CREATE INDEX ON files(blobhash);
+
+-- every storage garbage collection over all workers, for the statistics shown to admins
+CREATE TABLE storage_gc_runs(
+    id serial PRIMARY KEY,
+    started timestamp NOT NULL,
+    finished timestamp NOT NULL,
+    dryrun bool NOT NULL,
+    scannedblobs bigint NOT NULL,
+    orphanedblobs bigint NOT NULL,
+    orphanedbytes bigint NOT NULL,
+    miscountedblobs bigint NOT NULL,
+    deletedblobs bigint NOT NULL,
+    reclaimedbytes bigint NOT NULL
 );
 
-CREATE TABLE submissions_files(
-    courseid uuid,
-    assid int,
-    email text,
-    fileid uuid,
-    filename text NOT NULL CHECK (length(filename) <= 256),
-    uploadtime timestamp NOT NULL,
-    FOREIGN KEY (courseid, assid, email) REFERENCES course_assignments_submissions ON DELETE CASCADE,
-    PRIMARY KEY (courseid, assid, email, fileid)
+CREATE TABLE signing_keys(
+    kid text PRIMARY KEY,
+    secret text NOT NULL,
+    timecreated timestamp NOT NULL
 );
@@ -8,8 +8,6 @@ export default function CourseFeed() {
   const { id } = useParams()
   const [materials, setMaterials] = useState([])
   const [assignments, setAssignments] = useState([])
-  const [assignmentDetails, setAssignmentDetails] = useState({})
-  const [materialDetails, setMaterialDetails] = useState({})
   const navigate = useNavigate()
 
   const fetchFeed = async () => {
@@ -20,43 +18,13 @@ export default function CourseFeed() {
     }
 
     try {
-      const res = await axios.get("/api/get_course_feed", {
+      const res = await axios.get("/api/get_course_feed_expanded", {
         headers: { Authorization: `Bearer ${token}` },
         params: { course_id: id },
       })
       const feed = res.data
-      const matList = feed.filter(item => item.type === "mat")
-      const assList = feed.filter(item => item.type === "ass")
-      setMaterials(matList)
-      setAssignments(assList)
-
-      const [assignmentDetailResults, materialDetailResults] = await Promise.all([
-        Promise.all(assList.map(async (ass) => {
-          try {
-            const res = await axios.get("/api/get_assignment", {
-              headers: { Authorization: `Bearer ${token}` },
-              params: { assignment_id: ass.post_id, course_id: id },
-            })
-            return [ass.post_id, res.data]
-          } catch {
-            return [ass.post_id, { title: "Loading error", description: "" }]
-          }
-        })),
-        Promise.all(matList.map(async (mat) => {
-          try {
-            const res = await axios.get("/api/get_material", {
-              headers: { Authorization: `Bearer ${token}` },
-              params: { material_id: mat.post_id, course_id: id },
-            })
-            return [mat.post_id, res.data]
-          } catch {
-            return [mat.post_id, { title: "Loading error", description: "" }]
-          }
-        })),
-      ])
-
-      setAssignmentDetails(Object.fromEntries(assignmentDetailResults))
-      setMaterialDetails(Object.fromEntries(materialDetailResults))
+      setMaterials(feed.filter(item => item.type === "mat"))
+      setAssignments(feed.filter(item => item.type === "ass"))
 
     } catch (err) {
       console.error("Error fetching feed:", err)
@@ -84,8 +52,8 @@ export default function CourseFeed() {
                 key={mat.post_id}
                 onClick={() => navigate(`/courses/${id}/materials/${mat.post_id}`)}
               >
-                <h3>{materialDetails[mat.post_id]?.title}</h3>
-                <p>Created: {materialDetails[mat.post_id]?.creation_time}</p>
+                <h3>{mat.title}</h3>
+                <p>Created: {mat.timeadded}</p>
               </div>
             ))}
           </div>
@@ -100,8 +68,8 @@ export default function CourseFeed() {
                 key={ass.post_id}
                 onClick={() => navigate(`/courses/${id}/assignments/${ass.post_id}`)}
               >
-                <h3>{assignmentDetails[ass.post_id]?.title}</h3>
-                <p>Created: {assignmentDetails[ass.post_id]?.creation_time}</p>
+                <h3>{ass.title}</h3>
+                <p>Created: {ass.timeadded}</p>
               </div>
             ))}
           </div>
@@ -14,22 +14,15 @@ export default function Header({ children }) {
   const fetchCourses = async () => {
     const token = localStorage.getItem("access_token")
     try {
-      const res = await axios.get("/api/available_courses", {
+      const res = await axios.get("/api/get_my_courses", {
+        params: { memberships_only: true },
         headers: { Authorization: `Bearer ${token}` },
       })
 
-      const detailed = await Promise.all(
-        res.data.map(async (c) => {
-          const info = await axios.get("/api/get_course_info", {
-            headers: { Authorization: `Bearer ${token}` },
-            params: { course_id: c.course_id },
-          })
-          return {
-            course_id: c.course_id,
-            title: info.data.title,
-          }
-        })
-      )
+      const detailed = res.data.map((c) => ({
+        course_id: c.course_id,
+        title: c.title,
+      }))
 
       setCourses(detailed)
     } catch (err) {
@@ -8,7 +8,6 @@ export default function SingleCourseFeed() {
   const { id } = useParams()
   const navigate = useNavigate()
   const [posts, setPosts] = useState([])
-  const [postDetails, setPostDetails] = useState({})
 
   useEffect(() => {
     const fetchFeed = async () => {
@@ -19,51 +18,11 @@ export default function SingleCourseFeed() {
       }
 
       try {
-        const res = await axios.get("/api/get_course_feed", {
+        const res = await axios.get("/api/get_course_feed_expanded", {
           headers: { Authorization: `Bearer ${token}` },
           params: { course_id: id },
         })
-
-        const feed = res.data
-        setPosts(feed)
-
-        const [assignmentDetailResults, materialDetailResults] = await Promise.all([
-          Promise.all(
-            feed
-              .filter(item => item.type === "ass")
-              .map(async (ass) => {
-                try {
-                  const res = await axios.get("/api/get_assignment", {
-                    headers: { Authorization: `Bearer ${token}` },
-                    params: { assignment_id: ass.post_id, course_id: id },
-                  })
-                  return [`ass-${ass.post_id}`, res.data]
-                } catch {
-                  return [`ass-${ass.post_id}`, { title: "Error loading", creation_time: "N/A" }]
-                }
-              })
-          ),
-          Promise.all(
-            feed
-              .filter(item => item.type === "mat")
-              .map(async (mat) => {
-                try {
-                  const res = await axios.get("/api/get_material", {
-                    headers: { Authorization: `Bearer ${token}` },
-                    params: { material_id: mat.post_id, course_id: id },
-                  })
-                  return [`mat-${mat.post_id}`, res.data]
-                } catch {
-                  return [`mat-${mat.post_id}`, { title: "Error loading", creation_time: "N/A" }]
-                }
-              })
-          ),
-        ])
-
-        setPostDetails({
-          ...Object.fromEntries(assignmentDetailResults),
-          ...Object.fromEntries(materialDetailResults),
-        })
+        setPosts(res.data)
       } catch (err) {
         console.error("Error fetching feed:", err)
         if (err.response?.status === 401) {
@@ -86,7 +45,6 @@ export default function SingleCourseFeed() {
           )}
           {posts.map(post => {
             const key = `${post.type}-${post.post_id}`
-            const detail = postDetails[key]
             return (
               <div
                 key={key}
@@ -101,7 +59,7 @@ export default function SingleCourseFeed() {
                 style={{ display: "flex", justifyContent: "space-between", alignItems: "center" }}
               >
                 <div className="vertical-card-header">
-                  <h3>{detail?.title}</h3>
+                  <h3>{post.title}</h3>
                 </div>
                 <div style={{ minWidth: 110, textAlign: "right" }}>
                   {post.type === "mat" ? (
@@ -36,8 +36,8 @@ export default function AssignmentPage() {
   const [assignmentAttachments, setAssignmentAttachments] = useState([])
 
   const onFileChange = (event) =>{
-    if(event.target.files[0]?.size/1000000>5){
-        alert("Files should be smaller than 5 MB")
+    if(event.target.files[0]?.size/1000000>50){
+        alert("Files should be smaller than 50 MB")
         setSelectedFile(null)
         if (fileInputRef.current) {
           fileInputRef.current.value = "";
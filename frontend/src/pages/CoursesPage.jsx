@@ -13,51 +13,20 @@ export default function CoursesPage() {
   const fetchCourses = async () => {
     const token = localStorage.getItem("access_token")
     try {
-      const admins = await axios.get("/api/get_admins", {
+      const res = await axios.get("/api/get_my_courses", {
         headers: { Authorization: `Bearer ${token}` },
       });
-      const user = await axios.get("/api/get_user_info", {
-        headers: { Authorization: `Bearer ${token}` },
+      const full = res.data.map((c) => {
+        let user_role = "unknown"
+        if (c.is_admin) user_role = "admin"
+        else if (c.is_student) user_role = "student"
+        else if (c.is_parent) user_role = "parent"
+        else if (c.is_teacher) user_role = "teacher"
+        return {
+          ...c,
+          user_role,
+        }
       });
-      // if (admins.data.includes(user.data)) {
-      //   const res = await axios.get("/api/available_courses", {
-      //     headers: { Authorization: `Bearer ${token}` },
-      //   });
-      // }else{
-      //   const res = await axios.get("/api/available_courses", {
-      //     headers: { Authorization: `Bearer ${token}` },
-      //   });
-      // }
-      const isAdmin = admins.data.some(admin => admin.email === user.data.email);
-      const res = isAdmin
-      ? await axios.get("/api/get_all_courses", {
-          headers: { Authorization: `Bearer ${token}` },
-        })
-      : await axios.get("/api/available_courses", {
-          headers: { Authorization: `Bearer ${token}` },
-        });
-      const full = await Promise.all(
-        res.data.map(async (c) => {
-          const infoRes = await axios.get("/api/get_course_info", {
-            headers: { Authorization: `Bearer ${token}` },
-            params: { course_id: c.course_id },
-          });
-          const roleRes = await axios.get("/api/get_user_role", {
-            headers: { Authorization: `Bearer ${token}` },
-            params: { course_id: c.course_id },
-          });
-          const role = roleRes.data
-          let user_role = "unknown"
-          if (role.is_admin) user_role = "admin"
-          else if (role.is_student) user_role = "student"
-          else if (role.is_parent) user_role = "parent"
-          else if (role.is_teacher) user_role = "teacher"
-          return {
-            ...infoRes.data,
-            user_role,
-          }
-        })
-      );
       setCourses(full);
     } catch (err) {
       console.error(err)
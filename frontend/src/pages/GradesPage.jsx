@@ -61,10 +61,10 @@ export default function GradesPage() {
         const email = row[0] || '';
         const name = row[1] || email;
         parsedStudents.push({ email, name });
-        parsedGrades[email] = {};
-        assignmentTitles.forEach((title, idx) => {
+        // assignment titles may repeat, so grades are kept by column
+        parsedGrades[email] = assignmentTitles.map((title, idx) => {
           const gradeValue = (idx + 2 < row.length) ? row[idx + 2] : "—";
-          parsedGrades[email][title] = gradeValue || "—";
+          return gradeValue || "—";
         });
       }
 
@@ -128,7 +128,7 @@ export default function GradesPage() {
                   <td>{student.name || student.email}</td>
                   {assignments.map((title, j) => (
                     <td key={j}>
-                      {grades[student.email]?.[title] || <span className="grades-empty">—</span>}
+                      {grades[student.email]?.[j] || <span className="grades-empty">—</span>}
                     </td>
                   ))}
                 </tr>
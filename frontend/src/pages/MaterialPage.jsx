@@ -126,8 +126,8 @@ export default function MaterialPage() {
   };
 
   const onFileChange = (event) =>{
-    if(event.target.files[0]?.size/1000000>5){
-        alert("Files should be smaller than 5 MB")
+    if(event.target.files[0]?.size/1000000>50){
+        alert("Files should be smaller than 50 MB")
         setSelectedFile(null)
         if (fileInputRef.current) {
           fileInputRef.current.value = "";